@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_userloginhistory_delete_profilephotovalidation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userloginhistory',
+            index=models.Index(fields=['user', 'login_time', 'id'], name='loginhistory_user_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userloginhistory',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user'], name='loginhistory_user_active_idx'),
+        ),
+    ]
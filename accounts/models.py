@@ -224,6 +224,10 @@ class UserLoginHistory(models.Model):
     
     class Meta:
         ordering = ['-login_time']
+        indexes = [
+            models.Index(fields=['user', 'login_time', 'id'], name='loginhistory_user_new_idx'),
+            models.Index(fields=['user'], condition=models.Q(is_active=True), name='loginhistory_user_active_idx'),
+        ]
         verbose_name = "Login History"
         verbose_name_plural = "Login Histories"
     
@@ -0,0 +1,28 @@
+"""
+Test helpers shared by the apps' test suites
+"""
+
+from django.contrib.auth.signals import user_logged_in
+
+from .signals import create_login_history
+
+
+class NoLoginHistoryMixin:
+    """
+    Skip the login history row for test-client logins, which carry no REMOTE_ADDR
+
+    Usage:
+        class DashboardTests(NoLoginHistoryMixin, TestCase):
+            ...
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user_logged_in.disconnect(create_login_history)
+        cls.addClassCleanup(user_logged_in.connect, create_login_history)
+
+
+__all__ = [
+    'NoLoginHistoryMixin',
+]
@@ -7,6 +7,7 @@ from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.utils import timezone
+from barangay_portal.pagination import KeysetPaginator
 from .models import User, UserVerificationDocument, BarangayArea, ResidencyValidation, UserLoginHistory
 from .forms import UserRegistrationForm, UserProfileForm, UserLoginForm, CustomPasswordChangeForm
 import logging
@@ -645,9 +646,8 @@ def login_history_view(request):
     }
     
     # Pagination
-    paginator = Paginator(login_history.order_by('-login_time'), 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(login_history.order_by('-login_time'), 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     # Get all users for filter dropdown (if admin)
     all_users = []
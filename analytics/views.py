@@ -11,6 +11,7 @@ import json
 from complaints.models import Complaint, ComplaintCategory
 from feedback.models import Feedback
 from accounts.models import User
+from barangay_portal.performance import COMPLAINT_QUERY_PROFILES
 
 
 @login_required
@@ -271,15 +272,8 @@ def analytics_export(request):
     export_type = request.GET.get('type', 'overview')
     
     if export_type == 'complaints':
-        data = list(
-            Complaint.objects.select_related(
-                'category', 'complainant', 'assigned_to'
-            ).values(
-                'id', 'title', 'status', 'priority', 'created_at',
-                'category__name', 'complainant__username',
-                'assigned_to__username', 'resolution_date'
-            )
-        )
+        # Same columns as the 'export' query profile, as flat rows
+        data = list(Complaint.objects.values('id', *COMPLAINT_QUERY_PROFILES['export'].only))
     elif export_type == 'feedback':
         data = list(
             Feedback.objects.values(
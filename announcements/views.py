@@ -9,11 +9,13 @@ from django.utils import timezone
 from .models import Announcement, AnnouncementNotification
 from notifications.models import Notification
 from .forms import AnnouncementForm, AnnouncementFilterForm
+from barangay_portal.performance import cache_view
 
 def is_official(user):
     """Check if user is secretary or chairman"""
     return user.is_authenticated and user.role in ['secretary', 'chairman']
 
+@cache_view(timeout=600, key_prefix='announcements', tags=['announcements.Announcement', 'accounts.User'])
 def announcement_list(request):
     """Public list of active and approved announcements"""
     announcements = Announcement.objects.filter(
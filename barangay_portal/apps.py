@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class BarangayPortalConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'barangay_portal'
+    verbose_name = 'Barangay Portal'
+    
+    def ready(self):
+        from .db_tuning import connect_sqlite_tuning
+        from .performance import connect_cache_invalidation
+        connect_cache_invalidation()
+        connect_sqlite_tuning()
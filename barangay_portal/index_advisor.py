@@ -0,0 +1,177 @@
+"""
+Index advisor
+
+Finds the queries the database answers by reading a whole table. SQL is
+captured with a connection execute_wrapper, either while the test suite
+runs (``manage.py index_advisor``) or from a file recorded earlier with
+``--record`` (``manage.py index_advisor --replay queries.jsonl``).
+
+Each distinct statement (literals collapsed, as in the request profiler)
+is run once through the planner:
+
+    SQLite       EXPLAIN QUERY PLAN - "SCAN <table>" is a full table scan
+                 (as is walking a whole index without a LIMIT), "USE
+                 TEMP B-TREE FOR ORDER BY" a sort no index provides
+    PostgreSQL   EXPLAIN - "Seq Scan on <table>" and "Sort" nodes
+
+Only the plan is computed; nothing is executed. Without ANALYZE
+statistics SQLite chooses from the schema alone, so a scan reported
+against the small test database is a scan in production too.
+"""
+
+import json
+import re
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from .profiling import sql_signature
+
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+IGNORED_TABLES = (
+    'django_migrations', 'django_content_type', 'django_session', 'django_site',
+    'auth_permission', 'auth_group', 'auth_group_permissions',
+)
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?( USING (?:COVERING )?INDEX \w+)?$')
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+_SQLITE_TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+_POSTGRES_SORT = re.compile(r'^\s*(?:->\s*)?Sort\b')
+
+
+class QueryLog:
+    """Distinct statements seen, with how often and one set of parameters each"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, sql, params, alias='default', count=1):
+        if not EXPLAINABLE.match(sql):
+            return
+        signature = sql_signature(sql)
+        entry = self.entries.get(signature)
+        if entry is None:
+            entry = self.entries[signature] = {'sql': sql, 'params': list(params or ()), 'alias': alias, 'count': 0}
+        entry['count'] += count
+
+    def record(self, alias):
+        """An execute_wrapper adding every statement run on ``alias``"""
+        def wrapper(execute, sql, params, many, context):
+            if not many:
+                self.add(sql, params, alias)
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as output:
+            for entry in self.entries.values():
+                output.write(json.dumps(entry, default=str) + '\n')
+
+    @classmethod
+    def load(cls, path):
+        """Read a --record file; plain SQL, one statement per line, works too"""
+        log = cls()
+        with open(path, encoding='utf-8') as source:
+            for line in source:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('{'):
+                    entry = json.loads(line)
+                    log.add(entry['sql'], entry.get('params'), entry.get('alias', 'default'), entry.get('count', 1))
+                else:
+                    log.add(line, ())
+        return log
+
+
+@contextmanager
+def capture(log):
+    """
+    Record the SQL run on every connection into ``log``
+
+    Usage:
+        log = QueryLog()
+        with capture(log):
+            client.get('/complaints/')
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log.record(connection.alias)))
+        yield log
+
+
+def explain(connection, sql, params):
+    """The planner's plan for one statement, as lines of text"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def plan_problems(vendor, plan, tables, ignored_tables=IGNORED_TABLES, limited=False):
+    """
+    (tables read in full, sorts no index provides) in a plan
+
+    ``tables`` are the real table names, so subquery aliases are skipped.
+    Walking a whole index ("SCAN t USING INDEX i") reads every row too,
+    unless the statement is ``limited`` and stops early.
+    """
+    scans, sorts = [], []
+    for line in plan:
+        if vendor == 'sqlite':
+            scan = _SQLITE_SCAN.match(line.strip())
+            if scan and scan.group(2) and limited:
+                scan = None
+            sort = _SQLITE_TEMP_SORT.search(line)
+        else:
+            scan = _POSTGRES_SCAN.search(line)
+            sort = _POSTGRES_SORT.match(line)
+        if scan and scan.group(1) in tables and scan.group(1) not in ignored_tables and scan.group(1) not in scans:
+            scans.append(scan.group(1))
+        if sort:
+            sorts.append(sort.group(1) if vendor == 'sqlite' else 'ORDER BY')
+    return scans, sorts
+
+
+def analyze(log, ignored_tables=IGNORED_TABLES):
+    """
+    Explain every statement in ``log``; returns findings, most frequent first
+
+    Each finding has the statement's 'sql', 'count', 'scans' (tables read in
+    full), 'sorts' and the 'plan'. Statements the planner rejects (e.g. a
+    replay against a different schema) are reported with an 'error'.
+    """
+    findings = []
+    tables = {}
+    for entry in log.entries.values():
+        connection = connections[entry['alias']]
+        if connection.alias not in tables:
+            tables[connection.alias] = set(connection.introspection.table_names())
+        try:
+            plan = explain(connection, entry['sql'], entry['params'])
+        except Exception as e:
+            findings.append({**entry, 'scans': [], 'sorts': [], 'plan': [], 'error': str(e)})
+            continue
+        scans, sorts = plan_problems(
+            connection.vendor, plan, tables[connection.alias], ignored_tables, limited=bool(_LIMIT.search(entry['sql'])),
+        )
+        if scans or sorts:
+            findings.append({**entry, 'scans': scans, 'sorts': sorts, 'plan': plan})
+    return sorted(findings, key=lambda finding: finding['count'], reverse=True)
+
+
+def scans_by_table(findings):
+    """{table: statements executed that read it in full}"""
+    tables = {}
+    for finding in findings:
+        for table in finding['scans']:
+            tables[table] = tables.get(table, 0) + finding['count']
+    return dict(sorted(tables.items(), key=lambda item: item[1], reverse=True))
@@ -0,0 +1,297 @@
+"""
+Concurrent load against the database
+
+``run_load`` starts N threads, each with its own database connection (as
+N gunicorn workers would have), and has them run weighted actions for a
+fixed time. Results count successful actions with their latencies,
+"database is locked" failures and any other database errors:
+
+    with scratch_database():
+        result = run_load([('vote', 3, vote), ('read', 5, read)], workers=8, seconds=5, setup=make_resident)
+        result.throughput, result.lock_rate, result.percentile(95)
+
+Load runs against ``scratch_database()``, a freshly migrated copy of the
+configured database (a temporary file for SQLite, ``test_<name>`` for
+PostgreSQL), so benchmarks never touch real data.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.db import DatabaseError, OperationalError, connections
+from django.test import RequestFactory
+
+from .db_tuning import SQLITE_PRAGMAS
+
+
+LOCKED_MESSAGE = 'database is locked'
+
+
+@contextmanager
+def scratch_database(alias='default'):
+    """
+    Point ``alias`` at a new, migrated database for the duration; dropped afterwards
+
+    SQLite's test database is normally in memory, which threads cannot
+    share with real locking, so it goes to a temporary file instead.
+    """
+    connection = connections[alias]
+    old_test = connection.settings_dict.get('TEST', {})
+    directory = None
+    if connection.vendor == 'sqlite':
+        directory = tempfile.mkdtemp(prefix='loadtest-')
+        connection.settings_dict['TEST'] = {**old_test, 'NAME': os.path.join(directory, 'loadtest.sqlite3')}
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        connection.settings_dict['TEST'] = old_test
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def describe_database(connection):
+    """One line naming the engine and the settings that matter for concurrency"""
+    if connection.vendor != 'sqlite':
+        return (f"{connection.display_name} {connection.settings_dict['NAME']} "
+                f"(CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']}, "
+                f"CONN_HEALTH_CHECKS={connection.settings_dict['CONN_HEALTH_CHECKS']})")
+    with connection.cursor() as cursor:
+        pragmas = []
+        for name in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            pragmas.append(f"{name}={cursor.fetchone()[0]}")
+    return f"SQLite {connection.settings_dict['NAME']} ({', '.join(pragmas)})"
+
+
+class LoadResult:
+    """Outcome of one run_load: per-action latencies, lock failures and other errors"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.elapsed = 0.0
+        self.latencies = defaultdict(list)
+        self.locked = Counter()
+        self.errors = Counter()
+        self.error_samples = {}
+
+    def merge(self, other):
+        for name, samples in other.latencies.items():
+            self.latencies[name].extend(samples)
+        self.locked.update(other.locked)
+        self.errors.update(other.errors)
+        for name, message in other.error_samples.items():
+            self.error_samples.setdefault(name, message)
+
+    @property
+    def completed(self):
+        return sum(len(samples) for samples in self.latencies.values())
+
+    @property
+    def attempted(self):
+        return self.completed + sum(self.locked.values()) + sum(self.errors.values())
+
+    @property
+    def throughput(self):
+        """Completed actions per second"""
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def lock_rate(self):
+        """Share of attempted actions that failed with "database is locked" """
+        return sum(self.locked.values()) / self.attempted if self.attempted else 0.0
+
+    def percentile(self, percent, action=None):
+        """Latency in milliseconds below which ``percent`` of actions completed"""
+        samples = sorted(self.latencies[action] if action else
+                         [sample for samples in self.latencies.values() for sample in samples])
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index] * 1000
+
+
+def run_load(actions, workers, seconds, setup=None, seed=0):
+    """
+    Run weighted ``actions`` from ``workers`` threads for ``seconds``
+
+    ``actions`` is a list of (name, weight, function). Each thread calls
+    ``setup(index)`` once for its state, then repeatedly picks an action
+    and calls ``function(state, rng)``.
+    """
+    names = [name for name, _, _ in actions]
+    weights = [weight for _, weight, _ in actions]
+    functions = {name: function for name, _, function in actions}
+    results = [LoadResult(workers) for _ in range(workers)]
+    failures = []
+    start = threading.Barrier(workers + 1)
+
+    def worker(index):
+        result = results[index]
+        rng = random.Random(seed * 1000 + index)
+        try:
+            state = setup(index) if setup else None
+            start.wait()
+            stop = time.perf_counter() + seconds
+            while time.perf_counter() < stop:
+                name = rng.choices(names, weights)[0]
+                began = time.perf_counter()
+                try:
+                    functions[name](state, rng)
+                except DatabaseError as e:
+                    if isinstance(e, OperationalError) and LOCKED_MESSAGE in str(e):
+                        result.locked[name] += 1
+                    else:
+                        result.errors[name] += 1
+                        result.error_samples.setdefault(name, str(e))
+                else:
+                    result.latencies[name].append(time.perf_counter() - began)
+        except Exception as e:
+            failures.append(e)
+            start.abort()
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        start.wait()
+    except threading.BrokenBarrierError:
+        pass
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+
+    if failures:
+        raise failures[0]
+    total = LoadResult(workers)
+    total.elapsed = time.perf_counter() - began
+    for result in results:
+        total.merge(result)
+    return total
+
+
+# ============================================================================
+# PORTAL ACTIONS
+# ============================================================================
+# What residents do that writes: each action runs the same model methods
+# and AJAX views the site does, so a load test sees the real transactions.
+
+def seed_portal():
+    """Rows the actions share: a category, an announcement, a suggestion and a photo"""
+    from accounts.models import User
+    from announcements.models import Announcement
+    from complaints.models import ComplaintCategory
+    from gallery.models import GalleryCategory, GalleryPhoto
+    from suggestions.models import Suggestion
+
+    author = User.objects.create_user('loadtest-secretary', role='secretary', is_approved=True)
+    # With a thumbnail set, GalleryPhoto.save() does not open the (missing) image
+    photo = GalleryPhoto.objects.create(
+        title='Load test photo', image='gallery/photos/loadtest.jpg', thumbnail='gallery/thumbnails/loadtest.jpg',
+        status='approved', uploaded_by=author,
+        category=GalleryCategory.objects.create(name='Load test', slug='load-test'),
+    )
+    return {
+        'category': ComplaintCategory.objects.create(name='Load test category'),
+        'announcement': Announcement.objects.create(title='Load test announcement', created_by=author),
+        'suggestion': Suggestion.objects.create(title='Load test suggestion', description='-', submitted_by=author),
+        'photo': photo,
+    }
+
+
+def resident_setup(fixtures, unread=5):
+    """run_load setup giving each worker its own resident, with ``unread`` notifications"""
+    def setup(index):
+        from accounts.models import User
+        from notifications.models import Notification
+
+        user, _ = User.objects.get_or_create(username=f'loadtest-resident-{index}')
+        Notification.objects.bulk_create([
+            Notification(recipient=user, notification_type='system_announcement', title='Paalala', message='-')
+            for _ in range(unread)
+        ])
+        return {**fixtures, 'user': user}
+    return setup
+
+
+def _post(view, state, *args):
+    request = RequestFactory().post('/')
+    request.user = state['user']
+    return view(request, *args)
+
+
+def file_complaint(state, rng):
+    from complaints.models import Complaint
+
+    Complaint.objects.create(
+        complainant=state['user'], category=state['category'], title='Baradong kanal',
+        description='Umaapaw ang kanal tuwing umuulan.', location=f"Purok {rng.randint(1, 7)}",
+    )
+
+
+def vote_suggestion(state, rng):
+    from suggestions.views import vote_suggestion
+
+    _post(vote_suggestion, state, state['suggestion'].pk)
+
+
+def like_photo(state, rng):
+    from gallery.views import like_photo
+
+    _post(like_photo, state, state['photo'].pk)
+
+
+def poll_notifications(state, rng):
+    from notifications.views import get_unread_notifications_count
+
+    request = RequestFactory().get('/')
+    request.user = state['user']
+    get_unread_notifications_count(request)
+
+
+def count_announcement_view(state, rng):
+    from announcements.models import Announcement
+
+    Announcement.objects.get(pk=state['announcement'].pk).increment_views()
+
+
+def read_complaint_list(state, rng):
+    from complaints.models import Complaint
+
+    list(Complaint.objects.select_related('category').order_by('-created_at')[:15])
+
+
+# A resident's session: mostly polling, with the writes the portal sees most
+RESIDENT_ACTIONS = [
+    ('file complaint', 1, file_complaint),
+    ('vote suggestion', 2, vote_suggestion),
+    ('like photo', 3, like_photo),
+    ('poll notifications', 6, poll_notifications),
+]
+
+
+__all__ = [
+    'LOCKED_MESSAGE',
+    'LoadResult',
+    'RESIDENT_ACTIONS',
+    'count_announcement_view',
+    'describe_database',
+    'file_complaint',
+    'like_photo',
+    'poll_notifications',
+    'read_complaint_list',
+    'resident_setup',
+    'run_load',
+    'scratch_database',
+    'seed_portal',
+    'vote_suggestion',
+]
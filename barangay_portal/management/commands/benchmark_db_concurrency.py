@@ -0,0 +1,46 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from barangay_portal.loadtest import (
+    count_announcement_view, describe_database, file_complaint, read_complaint_list, resident_setup, run_load,
+    scratch_database, seed_portal, vote_suggestion,
+)
+
+
+ACTIONS = [
+    ('file complaint', 1, file_complaint),
+    ('vote', 2, vote_suggestion),
+    ('count view', 3, count_announcement_view),
+    ('read list', 4, read_complaint_list),
+]
+
+
+class Command(BaseCommand):
+    help = ('Run concurrent complaint filing, suggestion voting, view counting and list reads against a '
+            'scratch copy of the configured database and report throughput, latency and lock errors')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16], help='Concurrent workers per run')
+        parser.add_argument('--seconds', type=float, default=5, help='Length of each run')
+
+    def handle(self, *args, **options):
+        # Complaint.save() logs every save at INFO
+        complaint_logger = logging.getLogger('complaints.models')
+        level = complaint_logger.level
+        complaint_logger.setLevel(logging.WARNING)
+        try:
+            with scratch_database() as connection:
+                self.stdout.write(describe_database(connection))
+                fixtures = seed_portal()
+                self.stdout.write(f"{'workers':>7} {'actions/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'locked':>7} {'errors':>7}")
+                for workers in options['workers']:
+                    result = run_load(ACTIONS, workers, options['seconds'], setup=resident_setup(fixtures))
+                    self.stdout.write(
+                        f"{workers:>7} {result.throughput:>10.1f} {result.percentile(50):>8.1f} {result.percentile(95):>8.1f} "
+                        f"{sum(result.locked.values()):>7} {sum(result.errors.values()):>7}"
+                    )
+                    for name, message in result.error_samples.items():
+                        self.stdout.write(self.style.WARNING(f"        {name}: {message}"))
+        finally:
+            complaint_logger.setLevel(level)
+
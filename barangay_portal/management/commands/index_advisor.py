@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import get_runner
+from barangay_portal.index_advisor import IGNORED_TABLES, QueryLog, analyze, capture, scans_by_table
+
+
+def advisor_runner(log):
+    """The project's test runner, capturing SQL and explaining it before the test databases go"""
+    TestRunner = get_runner(settings)
+
+    class AdvisorRunner(TestRunner):
+        findings = None
+
+        def run_suite(self, suite, **kwargs):
+            with capture(log):
+                return super().run_suite(suite, **kwargs)
+
+        def teardown_databases(self, old_config, **kwargs):
+            AdvisorRunner.findings = analyze(log, self.ignored_tables)
+            super().teardown_databases(old_config, **kwargs)
+
+    return AdvisorRunner
+
+
+class Command(BaseCommand):
+    help = 'Capture SQL from the test suite (or replay a recording), EXPLAIN it and report full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_labels', nargs='*', help='Test labels to run (default: the whole suite)')
+        parser.add_argument('--replay', help='Explain statements from a --record file against the configured database')
+        parser.add_argument('--record', help='Also write the captured statements to this file (JSON lines)')
+        parser.add_argument('--ignore-table', action='append', default=[], help='Table whose scans are fine (repeatable)')
+        parser.add_argument('--limit', type=int, default=20, help='Statements to show')
+        parser.add_argument('--plans', action='store_true', help='Print the full plan of each statement')
+
+    def handle(self, *args, **options):
+        ignored_tables = IGNORED_TABLES + tuple(options['ignore_table'])
+
+        if options['replay']:
+            try:
+                log = QueryLog.load(options['replay'])
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read {options['replay']}: {e}")
+            findings = analyze(log, ignored_tables)
+        else:
+            log = QueryLog()
+            Runner = advisor_runner(log)
+            Runner.ignored_tables = ignored_tables
+            # One process, so every statement goes through this log
+            runner = Runner(verbosity=0, interactive=False, parallel=1)
+            failures = runner.run_tests(options['test_labels'])
+            if failures:
+                self.stdout.write(self.style.WARNING(f"{failures} test(s) failed; their SQL is included anyway"))
+            findings = Runner.findings or []
+
+        if options['record']:
+            log.save(options['record'])
+            self.stdout.write(f"Recorded {len(log)} statement(s) to {options['record']}")
+
+        self.report(log, findings, options['limit'], options['plans'])
+
+    def report(self, log, findings, limit, plans):
+        errors = [finding for finding in findings if 'error' in finding]
+        findings = [finding for finding in findings if 'error' not in finding]
+        self.stdout.write(f"Explained {len(log)} distinct statement(s)")
+
+        tables = scans_by_table(findings)
+        if not findings:
+            self.stdout.write(self.style.SUCCESS("No full table scans or unindexed sorts"))
+        if tables:
+            self.stdout.write("\nFull table scans (statements executed):")
+            for table, count in tables.items():
+                self.stdout.write(f"  {table:<40} {count}")
+
+        if findings:
+            self.stdout.write(f"\nTop {min(limit, len(findings))} statement(s):")
+        for finding in findings[:limit]:
+            problems = [f"scans {', '.join(finding['scans'])}"] if finding['scans'] else []
+            problems += [f"temp b-tree for {sort}" for sort in finding['sorts']]
+            self.stdout.write(self.style.WARNING(f"\n[{finding['count']}x] {'; '.join(problems)}"))
+            self.stdout.write(f"  {finding['sql'][:300]}")
+            if plans:
+                for line in finding['plan']:
+                    self.stdout.write(f"    {line}")
+
+        for finding in errors:
+            self.stdout.write(self.style.ERROR(f"\nCould not explain: {finding['sql'][:200]}\n  {finding['error']}"))
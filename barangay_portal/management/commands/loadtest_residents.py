@@ -0,0 +1,60 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from barangay_portal.db_tuning import STOCK_SQLITE_PRAGMAS, sqlite_pragmas
+from barangay_portal.loadtest import RESIDENT_ACTIONS, describe_database, resident_setup, run_load, scratch_database, seed_portal
+
+
+class Command(BaseCommand):
+    help = ('Simulate concurrent residents filing complaints, voting, liking photos and polling notifications; '
+            'on SQLite, compare throughput and "database is locked" rates with stock and tuned pragmas')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--residents', type=int, nargs='+', default=[4, 16, 32], help='Concurrent residents per run')
+        parser.add_argument('--seconds', type=float, default=5, help='Length of each run')
+        parser.add_argument('--by-action', action='store_true', help='Also break each run down by action')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            # Both on a fresh file: journal_mode=WAL sticks to the file once set
+            modes = [('stock', STOCK_SQLITE_PRAGMAS), ('tuned', sqlite_pragmas())]
+        else:
+            modes = [(connection.vendor, None)]
+
+        # Complaint.save() logs every save at INFO
+        complaint_logger = logging.getLogger('complaints.models')
+        level = complaint_logger.level
+        complaint_logger.setLevel(logging.WARNING)
+        try:
+            results = [(mode, self.run(pragmas, options)) for mode, pragmas in modes]
+        finally:
+            complaint_logger.setLevel(level)
+
+        self.stdout.write(f"\n{'pragmas':<10} {'residents':>9} {'actions/s':>10} {'p95 ms':>8} {'locked':>7} {'lock rate':>10} {'errors':>7}")
+        for mode, runs in results:
+            for result in runs:
+                self.stdout.write(
+                    f"{mode:<10} {result.workers:>9} {result.throughput:>10.1f} {result.percentile(95):>8.1f} "
+                    f"{sum(result.locked.values()):>7} {result.lock_rate:>10.2%} {sum(result.errors.values()):>7}"
+                )
+                if options['by_action']:
+                    for name, _, _ in RESIDENT_ACTIONS:
+                        self.stdout.write(
+                            f"  {name:<28} {len(result.latencies[name]) / result.elapsed:>10.1f} "
+                            f"{result.percentile(95, name):>8.1f} {result.locked[name]:>7} {'':>10} {result.errors[name]:>7}"
+                        )
+                for name, message in result.error_samples.items():
+                    self.stdout.write(self.style.WARNING(f"  {name}: {message}"))
+
+    def run(self, pragmas, options):
+        """One fresh scratch database, loaded with each resident count in turn"""
+        with override_settings(SQLITE_PRAGMAS=pragmas) if pragmas else override_settings():
+            with scratch_database() as scratch:
+                self.stdout.write(describe_database(scratch))
+                fixtures = seed_portal()
+                return [
+                    run_load(RESIDENT_ACTIONS, residents, options['seconds'], setup=resident_setup(fixtures))
+                    for residents in options['residents']
+                ]
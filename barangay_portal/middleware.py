@@ -0,0 +1,48 @@
+"""
+Async-capable wrappers for third-party middleware
+
+Django runs an async view through async_to_sync if any middleware above it
+is sync-only. WhiteNoise 6 is, so under ASGI every request (including
+chat_stream_api's stream) would hold a worker thread for its whole length.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that also runs async
+
+    Use in MIDDLEWARE instead of 'whitenoise.middleware.WhiteNoiseMiddleware':
+        'barangay_portal.middleware.WhiteNoiseMiddleware'
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Looks the path up on disk
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+__all__ = [
+    'WhiteNoiseMiddleware',
+]
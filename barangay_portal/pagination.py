@@ -0,0 +1,276 @@
+"""
+Keyset (cursor) pagination
+
+Django's Paginator runs a COUNT(*) for every page and fetches page n with
+OFFSET, which reads and throws away every row before it - the deeper the
+page, the slower. KeysetPaginator instead remembers where the last page
+ended and asks for the rows after it:
+
+    WHERE (created_at, id) < (<last created_at>, <last id>)
+    ORDER BY created_at DESC, id DESC LIMIT 21
+
+which the (created_at) indexes answer directly however far the user has
+scrolled. Pages are addressed by opaque ``?cursor=`` tokens instead of
+page numbers:
+
+    paginator = KeysetPaginator(Notification.objects.filter(recipient=user), 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+The ordering defaults to the queryset's (``-created_at`` when it has none)
+with the primary key appended as a tie-breaker. Orderings that are not
+plain non-null model fields (e.g. full-text search rank) cannot be keyed;
+their tokens carry an offset instead, so views need no special case.
+
+No count is run unless asked for: ``approximate_total=True`` gives pages an
+``approximate_total``, read from PostgreSQL's table statistics for whole
+tables and otherwise counted once and cached until the model changes.
+
+In templates, ``{% load keyset_pagination %}`` then
+``{% keyset_pagination page_obj %}`` renders the links, or
+``{% cursor_url page_obj.next_cursor %}`` builds one by hand.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+
+from .performance import generate_cache_key, get_tag_generations, register_cache_tags
+
+
+DEFAULT_ORDERING = ('-created_at',)
+CURSOR_PARAM = 'cursor'
+APPROXIMATE_COUNT_TIMEOUT = 300
+
+
+class InvalidCursor(ValueError):
+    """A cursor token that was tampered with or belongs to another ordering"""
+
+
+def _json_default(value):
+    # Full microseconds - DjangoJSONEncoder rounds datetimes to milliseconds,
+    # which would skip or repeat rows sharing the truncated part
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(data):
+    raw = json.dumps(data, default=_json_default, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(token)
+    if not isinstance(data, dict):
+        raise InvalidCursor(token)
+    return data
+
+
+def approximate_count(queryset, timeout=APPROXIMATE_COUNT_TIMEOUT):
+    """
+    Row count of ``queryset`` without a COUNT(*) per request
+
+    Whole tables on PostgreSQL use the planner's estimate (pg_class.reltuples,
+    refreshed by autovacuum). Anything else is counted once and cached under
+    the model's cache tag, so saving or deleting a row recounts it; bulk
+    ``update()``s that move rows between filters show up within ``timeout``.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 until the table has been analyzed
+        if row and row[0] >= 0:
+            return int(row[0])
+
+    labels = register_cache_tags([model])
+    sql, params = queryset.query.sql_with_params()
+    key = generate_cache_key(sql, params, get_tag_generations(labels), prefix='approxcount')
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, timeout)
+    return total
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; iterates like a Django Page"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} {self.paginator.queryset.model._meta.verbose_name_plural}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def approximate_total(self):
+        return self.paginator.approximate_total
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by cursor tokens instead of page numbers
+
+    Usage:
+        paginator = KeysetPaginator(complaints.order_by('-created_at'), 15, approximate_total=True)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+        page_obj.next_cursor, page_obj.approximate_total
+    """
+
+    def __init__(self, queryset, per_page, ordering=None, approximate_total=False):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.with_total = approximate_total
+
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering or DEFAULT_ORDERING)
+        self.keys = self._keys(ordering)
+        if self.keys is None:
+            # Not keyable - keep the queryset's own ordering and page by offset
+            self.ordering = ordering
+        else:
+            self.ordering = [f"{'-' if descending else ''}{field.name}" for field, descending in self.keys]
+
+    def _keys(self, ordering):
+        """[(field, descending)] ending in the primary key, or None if not keyable"""
+        meta = self.queryset.model._meta
+        keys = []
+        for term in ordering:
+            if isinstance(term, OrderBy) and isinstance(term.expression, F):
+                name, descending = term.expression.name, term.descending
+            elif isinstance(term, str):
+                name, descending = term.lstrip('-'), term.startswith('-')
+            else:
+                return None
+            if name == 'pk':
+                name = meta.pk.name
+            try:
+                field = meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.null or field.is_relation:
+                return None
+            keys.append((field, descending))
+            if field.primary_key or field.unique:
+                return keys
+        # Break ties on the primary key, in the same direction as the last key
+        return keys + [(meta.pk, keys[-1][1] if keys else True)]
+
+    @property
+    def approximate_total(self):
+        if not self.with_total:
+            return None
+        if not hasattr(self, '_approximate_total'):
+            self._approximate_total = approximate_count(self.queryset)
+        return self._approximate_total
+
+    def _values(self, obj):
+        return [getattr(obj, field.attname) for field, _ in self.keys]
+
+    def _after(self, values, backwards):
+        """Q for rows after ``values`` in the ordering (before, if ``backwards``)"""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.keys, values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{field.attname}__{lookup}': value})
+            equal &= Q(**{field.attname: value})
+        # The OR above is no index range; this redundant bound on the first
+        # key lets the index seek straight to the cursor
+        (field, descending), value = self.keys[0], values[0]
+        return Q(**{f"{field.attname}__{'lte' if descending != backwards else 'gte'}": value}) & condition
+
+    def _parse(self, data):
+        values = data.get('k')
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor(data)
+        try:
+            return [field.to_python(value) for (field, _), value in zip(self.keys, values)]
+        except ValidationError:
+            raise InvalidCursor(data)
+
+    def get_page(self, cursor=None):
+        """The page a cursor token points at; missing or invalid tokens give the first page"""
+        try:
+            data = decode_cursor(cursor) if cursor else {}
+            if self.keys is None:
+                return self._offset_page(max(0, int(data.get('o', 0))))
+            return self._keyset_page(self._parse(data) if data else None, data.get('d') == 'p')
+        except (InvalidCursor, TypeError, ValueError):
+            return self.get_page()
+
+    def _keyset_page(self, values, backwards):
+        queryset = self.queryset.order_by(*self.ordering)
+        if backwards:
+            queryset = queryset.reverse()
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            # The rows around the cursor were deleted meanwhile - start over
+            return self._keyset_page(None, False) if values is not None else KeysetPage(rows, self)
+
+        # Coming from a later page there is always a next one, and vice versa
+        has_next = more if not backwards else True
+        has_previous = (values is not None) if not backwards else more
+        return KeysetPage(
+            rows, self,
+            next_cursor=encode_cursor({'k': self._values(rows[-1])}) if has_next else None,
+            previous_cursor=encode_cursor({'k': self._values(rows[0]), 'd': 'p'}) if has_previous else None,
+        )
+
+    def _offset_page(self, offset):
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        more = len(rows) > self.per_page
+        return KeysetPage(
+            rows[:self.per_page], self,
+            next_cursor=encode_cursor({'o': offset + self.per_page}) if more else None,
+            previous_cursor=encode_cursor({'o': max(0, offset - self.per_page)}) if offset else None,
+        )
+
+
+__all__ = [
+    'CURSOR_PARAM',
+    'InvalidCursor',
+    'KeysetPage',
+    'KeysetPaginator',
+    'approximate_count',
+    'decode_cursor',
+    'encode_cursor',
+]
@@ -6,6 +6,7 @@ Provides caching, query optimization, and async processing helpers
 from functools import wraps
 from django.core.cache import cache
 from django.conf import settings
+from django.core import checks
 from django.db.models import Prefetch, Q
 from django.utils import timezone
 from datetime import timedelta
@@ -17,57 +18,160 @@ import json
 # CACHING DECORATORS
 # ============================================================================
 
-def cache_view(timeout=300, key_prefix='view'):
+def cache_view(timeout=300, key_prefix='view', tags=None, vary_on='session'):
     """
-    Cache a view's response
+    Cache a view's rendered response and answer repeat visits with 304
+    
+    Only the rendered bytes, status and safe headers are stored, never the
+    HttpResponse object. Every response carries a strong ETag, so a browser
+    that sends it back in If-None-Match gets ``304 Not Modified`` straight
+    from the cache without the template being rendered again.
+    
+    vary_on:
+        'session' - anonymous visitors share one entry per language,
+                    authenticated users get one entry per session (default;
+                    required when the page shows the user's name or CSRF token)
+        'role'    - one entry per (authenticated, role, language); only for
+                    views whose output depends on nothing more specific
+    
+    Responses are not cached when they set cookies, are not 200, or when the
+    request has flash messages waiting to be shown.
     
     Usage:
-        @cache_view(timeout=600, key_prefix='dashboard')
-        def my_view(request):
+        @cache_view(timeout=3600, key_prefix='announcements', tags=['announcements.Announcement'])
+        def announcement_list(request):
             ...
     """
+    if vary_on not in ('session', 'role'):
+        raise ValueError(f"cache_view vary_on must be 'session' or 'role', not {vary_on!r}")
+    tag_labels = register_cache_tags(tags)
+    
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            # Generate cache key from request path and user
+            if request.method not in ('GET', 'HEAD') or _has_pending_messages(request):
+                return view_func(request, *args, **kwargs)
+            
             cache_key = generate_cache_key(
                 request.path,
-                request.user.id if request.user.is_authenticated else None,
-                request.GET.dict(),
+                _cache_variant(request, vary_on),
+                sorted(request.GET.lists()),
+                get_tag_generations(tag_labels),
                 prefix=key_prefix
             )
             
-            # Try to get from cache
-            response = cache.get(cache_key)
-            if response is not None:
-                return response
+            # Serve from cache, or 304 if the browser already has these bytes
+            entry = cache.get(cache_key)
+            if entry is not None:
+                return _response_from_entry(request, entry)
             
-            # Generate response and cache it
             response = view_func(request, *args, **kwargs)
-            cache.set(cache_key, response, timeout)
-            return response
+            entry = _entry_from_response(request, response, vary_on)
+            if entry is None:
+                return response
+            
+            cache.set(cache_key, entry, timeout)
+            return _response_from_entry(request, entry)
         
         return wrapper
     return decorator
 
 
-def cache_query(timeout=300, key_prefix='query'):
+# Headers that are safe to replay to other requests sharing a cache entry
+CACHEABLE_RESPONSE_HEADERS = ('Content-Type', 'Content-Language', 'Content-Disposition', 'X-Frame-Options')
+
+
+def _cache_variant(request, vary_on):
+    from django.utils import translation
+    
+    language = getattr(request, 'LANGUAGE_CODE', None) or translation.get_language()
+    user = request.user
+    if not user.is_authenticated:
+        return ['anonymous', language]
+    if vary_on == 'role':
+        return ['role', getattr(user, 'role', None), user.is_staff, language]
+    return ['session', user.pk, request.session.session_key, language]
+
+
+def _has_pending_messages(request):
+    storage = getattr(request, '_messages', None)
+    if storage is None:
+        return False
+    return bool(storage._queued_messages) or storage.used or len(storage) > 0
+
+
+def _entry_from_response(request, response, vary_on):
+    """Snapshot a rendered response, or None if it must not be cached"""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    if 'no-store' in response.get('Cache-Control', ''):
+        return None
+    # Messages consumed while rendering would be replayed to later visitors
+    if _has_pending_messages(request):
+        return None
+    # A page shared between anonymous visitors must not embed a CSRF token
+    # when CSRF protection is actually enforced
+    if (not request.user.is_authenticated
+            and request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            and 'django.middleware.csrf.CsrfViewMiddleware' in settings.MIDDLEWARE):
+        return None
+    
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    content = response.content
+    return {
+        'content': content,
+        'status': response.status_code,
+        'headers': [(name, response[name]) for name in CACHEABLE_RESPONSE_HEADERS if response.has_header(name)],
+        'etag': '"%s"' % hashlib.md5(content).hexdigest(),
+        'private': request.user.is_authenticated,
+    }
+
+
+def _response_from_entry(request, entry):
+    from django.http import HttpResponse, HttpResponseNotModified
+    from django.utils.cache import patch_cache_control
+    
+    if_none_match = request.headers.get('If-None-Match', '')
+    if entry['etag'] in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for name, value in entry['headers']:
+            response[name] = value
+    
+    response['ETag'] = entry['etag']
+    # Browsers keep the copy but must revalidate it, which is answered with 304
+    if entry['private']:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cache_query(timeout=300, key_prefix='query', tags=None):
     """
     Cache a query function's result
     
+    Entries are keyed on the current generation of every tag, so saving or
+    deleting an instance of a tagged model makes them unreachable at once.
+    
     Usage:
-        @cache_query(timeout=600, key_prefix='complaints')
+        @cache_query(timeout=600, key_prefix='complaints', tags=['complaints.Complaint'])
         def get_user_complaints(user_id):
             return Complaint.objects.filter(user_id=user_id)
     """
+    tag_labels = register_cache_tags(tags)
+    
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Generate cache key from function name and arguments
+            # Generate cache key from function name, arguments and tag generations
             cache_key = generate_cache_key(
                 func.__name__,
                 args,
                 kwargs,
+                get_tag_generations(tag_labels),
                 prefix=key_prefix
             )
             
@@ -98,6 +202,9 @@ def invalidate_cache(pattern):
     """
     Invalidate cache keys matching a pattern
     
+    Only backends with ``delete_pattern`` (django-redis) support this; use
+    ``invalidate_tags`` for invalidation that works on every backend.
+    
     Usage:
         invalidate_cache('complaints:*')
     """
@@ -110,6 +217,124 @@ def invalidate_cache(pattern):
         pass
 
 
+# ============================================================================
+# TAG-BASED CACHE INVALIDATION
+# ============================================================================
+#
+# Every tag (a model label such as 'complaints.Complaint') has a generation
+# counter stored in the cache. Cached entries fold the generations of their
+# tags into the key, and post_save/post_delete bump the counter, so stale
+# entries are simply never read again and expire on their own. This only
+# needs get/add/incr and works the same on LocMem, file and Redis backends.
+
+TAG_GENERATION_PREFIX = 'cachegen'
+
+_cache_tags = set()
+_connected_tags = set()
+
+
+def _tag_label(tag):
+    """Normalise a model class or 'app_label.ModelName' string to a label"""
+    if isinstance(tag, str):
+        return tag.lower()
+    return tag._meta.label_lower
+
+
+def _generation_key(label):
+    return f"{TAG_GENERATION_PREFIX}:{label}"
+
+
+def _new_generation():
+    # Time-based seed so a counter evicted from the cache never restarts at a
+    # value that older entries were stored under
+    import time
+    return time.time_ns()
+
+
+def register_cache_tags(tags):
+    """
+    Declare model tags used by cached entries
+    
+    Receivers are connected once the app registry is ready; tags listed in
+    settings.CACHE_INVALIDATION_TAGS are connected in every process even if
+    the module declaring them is never imported there.
+    """
+    labels = tuple(sorted({_tag_label(tag) for tag in (tags or [])}))
+    _cache_tags.update(labels)
+    
+    from django.apps import apps
+    if apps.ready:
+        connect_cache_invalidation()
+    return labels
+
+
+def get_tag_generations(labels):
+    """Current generation for each tag label, creating missing counters"""
+    if not labels:
+        return {}
+    
+    keys = {label: _generation_key(label) for label in labels}
+    found = cache.get_many(list(keys.values()))
+    generations = {}
+    for label, key in keys.items():
+        generation = found.get(key)
+        if generation is None:
+            cache.add(key, _new_generation(), None)
+            generation = cache.get(key)
+        generations[label] = generation
+    return generations
+
+
+def invalidate_tags(*tags):
+    """
+    Invalidate every cached entry declaring any of the given tags
+    
+    Usage:
+        invalidate_tags('complaints.Complaint')
+        invalidate_tags(Complaint, Feedback)
+    """
+    for tag in tags:
+        key = _generation_key(_tag_label(tag))
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Counter missing or evicted - start a fresh generation
+            cache.set(key, _new_generation(), None)
+
+
+def _ignored_fields(sender):
+    ignored = getattr(settings, 'CACHE_INVALIDATION_IGNORED_FIELDS', {})
+    for tag, fields in ignored.items():
+        if _tag_label(tag) == sender._meta.label_lower:
+            return frozenset(fields)
+    return frozenset()
+
+
+def _invalidate_model_tag(sender, update_fields=None, **kwargs):
+    from django.db import transaction
+    
+    # e.g. update_last_login's save(update_fields=['last_login'])
+    if update_fields and set(update_fields) <= _ignored_fields(sender):
+        return
+    
+    invalidate_tags(sender)
+    # Bump again after commit so a reader that refilled the cache from the
+    # not-yet-committed state does not keep serving it
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: invalidate_tags(sender))
+
+
+def connect_cache_invalidation():
+    """Connect post_save/post_delete receivers for every registered tag"""
+    from django.db.models.signals import post_save, post_delete
+    
+    labels = _cache_tags | {_tag_label(tag) for tag in getattr(settings, 'CACHE_INVALIDATION_TAGS', [])}
+    for label in labels - _connected_tags:
+        post_save.connect(_invalidate_model_tag, sender=label, dispatch_uid=f'cache-tag-save:{label}')
+        post_delete.connect(_invalidate_model_tag, sender=label, dispatch_uid=f'cache-tag-delete:{label}')
+        _connected_tags.add(label)
+
+
 # ============================================================================
 # QUERY OPTIMIZATION HELPERS
 # ============================================================================
@@ -169,36 +394,195 @@ class OptimizedQueryMixin:
         return page_obj, page_obj.has_previous(), page_obj.has_next()
 
 
-def optimize_complaints_query(user, base_queryset=None):
+class QueryProfile:
     """
-    Optimized query for complaints with proper relations
-    Returns a queryset with all necessary relations preloaded
+    Named recipe for loading a model for one use case: the columns to
+    fetch (only), the forward relations to join (select_related), the
+    reverse relations to prefetch (each with its own QueryProfile) and
+    computed columns (annotate)
+
+    Usage:
+        profile = QueryProfile(
+            'complaints.Complaint',
+            only=['title', 'category__name'],
+            select_related=['category'],
+            prefetch={'comments': QueryProfile('complaints.ComplaintComment', only=['complaint', 'comment'])},
+        )
+        complaints = profile.apply(Complaint.objects.filter(status='pending'))
+
+    Profiles are checked against the models at startup (check_query_profiles).
     """
-    from complaints.models import Complaint, ComplaintComment
-    
-    if base_queryset is None:
-        qs = Complaint.objects.all()
-    else:
-        qs = base_queryset
-    
-    # Select related for single foreign keys
-    qs = qs.select_related(
-        'category',
-        'complainant',
-        'assigned_to',
-        'approved_by'
-    )
     
-    # Prefetch related for reverse relations
-    qs = qs.prefetch_related(
-        'attachments',
-        Prefetch('comments', queryset=ComplaintComment.objects.select_related('user'))
-    )
+    def __init__(self, model, only=None, select_related=(), prefetch=None, annotate=None):
+        self.model_label = model
+        self.only = list(only or [])
+        self.select_related = list(select_related)
+        self.prefetch = dict(prefetch or {})
+        self.annotate = dict(annotate or {})
+    
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_label)
+    
+    def apply(self, queryset=None):
+        if queryset is None:
+            queryset = self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*[
+                Prefetch(lookup, queryset=profile.apply())
+                for lookup, profile in self.prefetch.items()
+            ])
+        if self.only:
+            queryset = queryset.only(*self.only)
+        if self.annotate:
+            queryset = queryset.annotate(**{
+                name: expression() for name, expression in self.annotate.items()
+            })
+        return queryset
     
-    # Defer heavy text fields if not needed immediately
-    # qs = qs.defer('description')  # Uncomment if description not needed in list view
+    def _field(self, model, path):
+        """The last field on ``path`` (e.g. 'category__name'), and the relations crossed"""
+        from django.core.exceptions import FieldDoesNotExist
+        
+        relations = []
+        parts = path.split('__')
+        for index, name in enumerate(parts):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValueError(f"{model._meta.label} has no field '{name}' (in '{path}')")
+            if index < len(parts) - 1:
+                if not (field.many_to_one or field.one_to_one) or field.auto_created and not field.concrete:
+                    raise ValueError(f"'{name}' in '{path}' is not a forward foreign key")
+                relations.append('__'.join(parts[:index + 1]))
+                model = field.related_model
+        return field, relations
+    
+    def errors(self):
+        """Problems with this profile (and its prefetches), as strings"""
+        from django.core.exceptions import ImproperlyConfigured
+        
+        try:
+            model = self.model
+        except (LookupError, ValueError, ImproperlyConfigured) as e:
+            return [f"unknown model {self.model_label!r}: {e}"]
+        
+        errors = []
+        for path in self.select_related:
+            try:
+                field, _ = self._field(model, path)
+                if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                    errors.append(f"select_related '{path}' is not a forward foreign key")
+                elif self.only and not any(name == path or name.startswith(path + '__') for name in self.only):
+                    errors.append(f"select_related '{path}' needs '{path}' (or fields of it) in only()")
+            except ValueError as e:
+                errors.append(str(e))
+        
+        for path in self.only:
+            try:
+                _, relations = self._field(model, path)
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            for relation in relations:
+                if relation not in self.select_related:
+                    errors.append(f"only '{path}' crosses '{relation}', which is not in select_related")
+        
+        for lookup, profile in self.prefetch.items():
+            try:
+                field = model._meta.get_field(lookup)
+            except Exception:
+                errors.append(f"{model._meta.label} has no relation '{lookup}' to prefetch")
+                continue
+            if not (field.one_to_many or field.many_to_many):
+                errors.append(f"prefetch '{lookup}' is not a reverse or many-to-many relation")
+                continue
+            if profile.model_label.lower() != field.related_model._meta.label_lower:
+                errors.append(f"prefetch '{lookup}' loads {field.related_model._meta.label}, not {profile.model_label}")
+                continue
+            # Without the foreign key back, every prefetched row costs another query
+            back = field.field.name if field.one_to_many else None
+            if back and profile.only and back not in profile.only:
+                errors.append(f"prefetch '{lookup}' needs '{back}' in only()")
+            errors += [f"prefetch '{lookup}': {error}" for error in profile.errors()]
+        return errors
+
+
+def _description_excerpt():
+    from django.db.models.functions import Substr
+    # One character past the 120 shown, so truncatechars still adds the ellipsis
+    return Substr('description', 1, 121)
+
+
+USER_NAME_FIELDS = ['username', 'first_name', 'last_name']
+
+COMPLAINT_QUERY_PROFILES = {
+    # complaints/complaint_list.html cards: no description text, no comments
+    'list': QueryProfile(
+        'complaints.Complaint',
+        only=[
+            'title', 'status', 'priority', 'is_anonymous', 'is_approved', 'location', 'created_at',
+            'category__name',
+            *[f'complainant__{name}' for name in USER_NAME_FIELDS],
+            *[f'assigned_to__{name}' for name in USER_NAME_FIELDS],
+        ],
+        select_related=['category', 'complainant', 'assigned_to'],
+        annotate={'description_excerpt': _description_excerpt},
+    ),
+    # complaints/complaint_detail.html: every column, attachments and comment authors
+    'detail': QueryProfile(
+        'complaints.Complaint',
+        select_related=['category', 'complainant', 'assigned_to', 'approved_by', 'resolved_by'],
+        prefetch={
+            'attachments': QueryProfile('complaints.ComplaintAttachment'),
+            'comments': QueryProfile('complaints.ComplaintComment', select_related=['author']),
+        },
+    ),
+    # analytics_export: flat rows, no text bodies
+    'export': QueryProfile(
+        'complaints.Complaint',
+        only=[
+            'title', 'status', 'priority', 'created_at', 'resolved_at',
+            'category__name', 'complainant__username', 'assigned_to__username',
+        ],
+        select_related=['category', 'complainant', 'assigned_to'],
+    ),
+    # "Recent complaints" panels on the dashboards
+    'dashboard-recent': QueryProfile(
+        'complaints.Complaint',
+        only=['title', 'status', 'priority', 'created_at', 'category__name', 'complainant__username'],
+        select_related=['category', 'complainant'],
+    ),
+}
+
+
+def optimize_complaints_query(user, base_queryset=None, profile='detail'):
+    """
+    Complaints loaded for one use case (see COMPLAINT_QUERY_PROFILES)
     
-    return qs
+    Usage:
+        complaints = optimize_complaints_query(request.user, base_queryset, profile='list')
+    """
+    if profile not in COMPLAINT_QUERY_PROFILES:
+        raise ValueError(f"Unknown complaint query profile {profile!r}; choose from {sorted(COMPLAINT_QUERY_PROFILES)}")
+    return COMPLAINT_QUERY_PROFILES[profile].apply(base_queryset)
+
+
+@checks.register(checks.Tags.models)
+def check_query_profiles(app_configs=None, **kwargs):
+    """System check: every query profile matches the current models"""
+    return [
+        checks.Error(
+            f"Complaint query profile {name!r}: {error}",
+            obj='barangay_portal.performance.COMPLAINT_QUERY_PROFILES',
+            id='performance.E001',
+        )
+        for name, profile in COMPLAINT_QUERY_PROFILES.items()
+        for error in profile.errors()
+    ]
 
 
 def optimize_suggestions_query(base_queryset=None):
@@ -229,23 +613,27 @@ def optimize_gallery_query(base_queryset=None):
 # STATISTICS CACHING
 # ============================================================================
 
-@cache_query(timeout=600, key_prefix='stats')
+@cache_query(timeout=6 * 3600, key_prefix='stats', tags=[
+    'complaints.Complaint', 'feedback.Feedback', 'accounts.User', 'suggestions.Suggestion',
+])
 def get_dashboard_stats(user_id=None, user_role=None):
     """
     Get cached dashboard statistics
     
-    Cache for 10 minutes to reduce database load
+    Cached for 6 hours; saving or deleting any tagged model invalidates it
     """
     from complaints.models import Complaint
+    from complaints.stats import complaint_stats, counter_stats
     from feedback.models import Feedback
     from accounts.models import User
     from suggestions.models import Suggestion
     
+    complaint_summary = counter_stats()
     stats = {
-        'total_complaints': Complaint.objects.count(),
-        'pending_complaints': Complaint.objects.filter(status='pending').count(),
-        'in_progress_complaints': Complaint.objects.filter(status='in_progress').count(),
-        'resolved_complaints': Complaint.objects.filter(status='resolved').count(),
+        'total_complaints': complaint_summary.total,
+        'pending_complaints': complaint_summary.by_status['pending'],
+        'in_progress_complaints': complaint_summary.by_status['in_progress'],
+        'resolved_complaints': complaint_summary.by_status['resolved'],
         'total_feedback': Feedback.objects.count(),
         'total_suggestions': Suggestion.objects.count(),
         'total_residents': User.objects.filter(role='resident', is_approved=True).count(),
@@ -254,22 +642,26 @@ def get_dashboard_stats(user_id=None, user_role=None):
     
     # User-specific stats
     if user_id and user_role == 'resident':
+        my_summary = complaint_stats(Complaint.objects.filter(complainant_id=user_id))
         stats.update({
-            'my_complaints': Complaint.objects.filter(complainant_id=user_id).count(),
-            'my_resolved': Complaint.objects.filter(complainant_id=user_id, status='resolved').count(),
+            'my_complaints': my_summary.total,
+            'my_resolved': my_summary.by_status['resolved'],
         })
     
     return stats
 
 
-@cache_query(timeout=1800, key_prefix='analytics')
+@cache_query(timeout=6 * 3600, key_prefix='analytics', tags=[
+    'complaints.Complaint', 'complaints.ComplaintCategory',
+])
 def get_analytics_data(days=30):
     """
     Get cached analytics data for charts
     
-    Cache for 30 minutes
+    Cached for 6 hours; saving or deleting any tagged model invalidates it
     """
     from complaints.models import Complaint, ComplaintCategory
+    from complaints.stats import counter_stats
     from django.db.models import Count
     from django.db.models.functions import TruncDate
     
@@ -292,11 +684,11 @@ def get_analytics_data(days=30):
     )
     
     # Status distribution
-    status_stats = dict(
-        Complaint.objects.values('status')
-        .annotate(count=Count('id'))
-        .values_list('status', 'count')
-    )
+    status_stats = {
+        status: count
+        for status, count in counter_stats().by_status.items()
+        if count
+    }
     
     return {
         'categories': category_stats,
@@ -506,20 +898,13 @@ class ResponseTimeMiddleware:
 
 def optimize_db_settings():
     """
-    Get optimized database settings for better performance
+    Connection options for PostgreSQL (connect and statement timeouts)
     
-    Add to settings.py DATABASES configuration:
-        DATABASES = {
-            'default': {
-                ...
-                'OPTIONS': optimize_db_settings(),
-            }
-        }
+    settings.DATABASES already applies these through
+    barangay_portal.db_tuning.database_config when DATABASE_URL is set.
     """
-    return {
-        'connect_timeout': 10,
-        'options': '-c statement_timeout=30000',  # 30 seconds
-    }
+    from .db_tuning import POSTGRES_OPTIONS
+    return dict(POSTGRES_OPTIONS)
 
 
 # ============================================================================
@@ -531,7 +916,12 @@ __all__ = [
     'cache_query',
     'generate_cache_key',
     'invalidate_cache',
+    'invalidate_tags',
+    'register_cache_tags',
+    'connect_cache_invalidation',
     'OptimizedQueryMixin',
+    'QueryProfile',
+    'COMPLAINT_QUERY_PROFILES',
     'optimize_complaints_query',
     'optimize_suggestions_query',
     'optimize_gallery_query',
@@ -0,0 +1,313 @@
+"""
+Per-view request profiling
+
+ProfilingMiddleware records, for every request, under the resolved view
+name (e.g. ``complaints:complaint_list``):
+
+    wall_ms       time spent in the view and the middleware below this one
+    queries       database queries executed
+    sql_ms        time spent in those queries
+    duplicates    SQL signatures (literals collapsed) run at least
+                  PERF_DUPLICATE_THRESHOLD times - the usual N+1 pattern
+    template_ms   time spent rendering templates
+
+Profiles go into an in-memory ring buffer of PERF_RING_SIZE requests per
+process, shown to staff at /_perf/ and as JSON at /_perf/json/. Every
+response carries a Server-Timing header with the same numbers.
+
+PERF_BUDGETS sets limits per view name ('*' applies to every view):
+
+    PERF_BUDGETS = {
+        '*': {'queries': 60},
+        'complaints:complaint_list': {'queries': 20, 'duplicates': 5},
+    }
+
+Limits are 'queries', 'sql_ms', 'wall_ms', 'template_ms' and 'duplicates'
+(the most repeats of one signature). Over-budget requests are logged;
+with PERF_BUDGET_ENFORCE (on under the project's TEST_RUNNER) they raise
+BudgetExceeded, so a test that renders a view past its budget fails.
+
+The middleware runs sync or async to match the handler below it, so
+async views stay async. Streaming responses (e.g. chat_stream_api) are
+not profiled: their body is produced after the middleware returns, so
+the numbers would only cover the time to the first byte.
+
+Queries run in other threads (e.g. sync_to_async with
+thread_sensitive=False) are not attributed to the request.
+"""
+
+import contextvars
+import functools
+import logging
+import re
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RING_SIZE = 500
+DEFAULT_DUPLICATE_THRESHOLD = 3
+BUDGET_METRICS = ('queries', 'sql_ms', 'wall_ms', 'template_ms', 'duplicates')
+IGNORED_VIEWS = ('perf_dashboard', 'perf_json')
+
+_PLACEHOLDER_LISTS = re.compile(r'%s(?:\s*,\s*%s)+')
+_NUMBERS = re.compile(r'\b\d+\b')
+
+_current_profile = contextvars.ContextVar('current_profile', default=None)
+
+
+class BudgetExceeded(AssertionError):
+    """A view went over one of its PERF_BUDGETS limits"""
+
+
+def sql_signature(sql):
+    """SQL with literals and IN-lists collapsed, so repeated lookups compare equal"""
+    return _NUMBERS.sub('N', _PLACEHOLDER_LISTS.sub('%s...', sql))
+
+
+class RequestProfile:
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.view = None
+        self.status = None
+        self.started_at = time.time()
+        self.wall_ms = 0.0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.signatures = Counter()
+        self.over_budget = []
+
+    @property
+    def queries(self):
+        return sum(self.signatures.values())
+
+    def duplicates(self, threshold):
+        return [
+            {'sql': signature, 'count': count}
+            for signature, count in self.signatures.most_common()
+            if count >= threshold
+        ]
+
+    def max_repeats(self):
+        return max(self.signatures.values(), default=0)
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - start) * 1000
+            self.signatures[sql_signature(sql)] += 1
+
+    def as_dict(self, threshold):
+        return {
+            'view': self.view,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'started_at': self.started_at,
+            'wall_ms': round(self.wall_ms, 2),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_ms, 2),
+            'template_ms': round(self.template_ms, 2),
+            'duplicates': self.duplicates(threshold),
+            'over_budget': self.over_budget,
+        }
+
+
+class ProfileBuffer:
+    """Thread-safe ring buffer of recent request profiles"""
+
+    def __init__(self, size=DEFAULT_RING_SIZE):
+        self._profiles = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def resize(self, size):
+        with self._lock:
+            if self._profiles.maxlen != size:
+                self._profiles = deque(self._profiles, maxlen=size)
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def recent(self, view=None):
+        with self._lock:
+            profiles = list(self._profiles)
+        return [profile for profile in profiles if view is None or profile.view == view]
+
+    def summary(self):
+        """Per-view counts and wall/query/SQL/template statistics, slowest p95 first"""
+        by_view = {}
+        for profile in self.recent():
+            by_view.setdefault(profile.view, []).append(profile)
+
+        rows = []
+        for view, profiles in by_view.items():
+            walls = sorted(profile.wall_ms for profile in profiles)
+            queries = [profile.queries for profile in profiles]
+            rows.append({
+                'view': view,
+                'requests': len(profiles),
+                'p50_ms': round(statistics.median(walls), 1),
+                'p95_ms': round(walls[min(len(walls) - 1, int(len(walls) * 0.95))], 1),
+                'avg_queries': round(statistics.mean(queries), 1),
+                'max_queries': max(queries),
+                'avg_sql_ms': round(statistics.mean(profile.sql_ms for profile in profiles), 1),
+                'avg_template_ms': round(statistics.mean(profile.template_ms for profile in profiles), 1),
+                'max_repeats': max(profile.max_repeats() for profile in profiles),
+                'over_budget': sum(1 for profile in profiles if profile.over_budget),
+            })
+        return sorted(rows, key=lambda row: row['p95_ms'], reverse=True)
+
+
+profile_buffer = ProfileBuffer()
+
+
+def _install_template_timer():
+    """Time top-level template renders (includes and extends happen inside them)"""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'profiled', False):
+        return
+    render = Template.render
+
+    @functools.wraps(render)
+    def timed_render(self, *args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_ms += (time.perf_counter() - start) * 1000
+
+    timed_render.profiled = True
+    Template.render = timed_render
+
+
+def get_budget(view):
+    budgets = getattr(settings, 'PERF_BUDGETS', {})
+    return {**budgets.get('*', {}), **budgets.get(view, {})}
+
+
+def check_budget(profile):
+    """Names, values and limits of the budget metrics ``profile`` exceeded"""
+    values = {
+        'queries': profile.queries,
+        'sql_ms': profile.sql_ms,
+        'wall_ms': profile.wall_ms,
+        'template_ms': profile.template_ms,
+        'duplicates': profile.max_repeats(),
+    }
+    return [
+        {'metric': metric, 'value': round(values[metric], 2), 'limit': limit}
+        for metric, limit in get_budget(profile.view).items()
+        if metric in values and values[metric] > limit
+    ]
+
+
+class ProfilingMiddleware:
+    """
+    Records a RequestProfile per request and enforces PERF_BUDGETS
+
+    Add to MIDDLEWARE in settings.py, as early as possible:
+        'barangay_portal.profiling.ProfilingMiddleware'
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_PROFILING', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Async views stay on the event loop instead of going through async_to_sync
+            markcoroutinefunction(self)
+        self.threshold = getattr(settings, 'PERF_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD)
+        profile_buffer.resize(getattr(settings, 'PERF_RING_SIZE', DEFAULT_RING_SIZE))
+        _install_template_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = RequestProfile(request.method, request.path)
+        with self.timing(profile), self.wrap_queries(profile):
+            response = self.get_response(request)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile(request.method, request.path)
+        # Connections are per thread: an async view's ORM calls run in the
+        # thread sync_to_async uses for this request, so the wrappers go there
+        queries = await sync_to_async(self.wrap_queries)(profile)
+        try:
+            with self.timing(profile):
+                response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.close)()
+        return self.finish(request, response, profile)
+
+    @contextmanager
+    def timing(self, profile):
+        """Make ``profile`` current (for template time) and time the block"""
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.wall_ms = (time.perf_counter() - start) * 1000
+            _current_profile.reset(token)
+
+    def wrap_queries(self, profile):
+        """Record this thread's queries on ``profile`` until the returned ExitStack closes"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile.record_query))
+        return stack
+
+    def finish(self, request, response, profile):
+        """Name, record and budget-check the profile; returns the response"""
+        match = getattr(request, 'resolver_match', None)
+        profile.view = match.view_name if match else '<unresolved>'
+        profile.status = response.status_code
+        # A streaming response's body is produced after this returns, so its
+        # numbers would only cover the time to the headers
+        if response.streaming or profile.view.split(':')[-1] in IGNORED_VIEWS:
+            return response
+
+        response['Server-Timing'] = (
+            f'total;dur={profile.wall_ms:.1f}, db;dur={profile.sql_ms:.1f};desc="{profile.queries} queries", '
+            f'tpl;dur={profile.template_ms:.1f}'
+        )
+        profile.over_budget = check_budget(profile)
+        profile_buffer.add(profile)
+
+        if profile.over_budget:
+            report = ', '.join(f"{item['metric']} {item['value']} > {item['limit']}" for item in profile.over_budget)
+            message = f"{profile.view} ({profile.method} {profile.path}) over budget: {report}"
+            duplicates = profile.duplicates(self.threshold)
+            if duplicates:
+                message += f"; most repeated query ({duplicates[0]['count']}x): {duplicates[0]['sql']}"
+            if getattr(settings, 'PERF_BUDGET_ENFORCE', False):
+                raise BudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,39 @@
+from django import template
+
+from barangay_portal.pagination import CURSOR_PARAM
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """
+    The current URL, filters kept, pointing at ``cursor`` (the first page when empty)
+
+    Usage:
+        <a href="{% cursor_url page_obj.next_cursor %}">Next</a>
+    """
+    params = context['request'].GET.copy()
+    params.pop('page', None)
+    params.pop(CURSOR_PARAM, None)
+    if cursor:
+        params[CURSOR_PARAM] = cursor
+    query = params.urlencode()
+    return f'?{query}' if query else '?'
+
+
+@register.inclusion_tag('includes/keyset_pagination.html', takes_context=True)
+def keyset_pagination(context, page, label='Pagination'):
+    """
+    First/Previous/Next links for a KeysetPage
+
+    Usage:
+        {% load keyset_pagination %}
+        {% keyset_pagination page_obj %}
+    """
+    return {
+        'request': context['request'],
+        'page': page,
+        'label': label,
+    }
@@ -0,0 +1,29 @@
+"""
+Test runner turning request budgets into test failures
+
+Set as TEST_RUNNER, so ``manage.py test`` (and ``manage.py index_advisor``,
+which runs the suite through it) profiles every request whatever
+PERF_PROFILING says, and a view over its PERF_BUDGETS raises BudgetExceeded
+instead of only logging.
+"""
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """DiscoverRunner with PERF_PROFILING and PERF_BUDGET_ENFORCE on for the run"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._budgets = override_settings(PERF_PROFILING=True, PERF_BUDGET_ENFORCE=True)
+        self._budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._budgets.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+__all__ = [
+    'BudgetTestRunner',
+]
@@ -0,0 +1,92 @@
+"""
+Bilingual (English/Filipino) text normalization
+
+Shared by the complaint search index and the chatbot so that a word is
+tokenized and stemmed the same way when it is stored and when it is searched.
+The Filipino affixes are the ones ``BarangayAIEngine._detect_language`` treats
+as language indicators.
+"""
+
+import re
+import unicodedata
+
+
+FILIPINO_PREFIXES = ('mag', 'nag', 'pag', 'um', 'in')
+FILIPINO_SUFFIXES = ('han', 'an', 'in')
+ENGLISH_SUFFIXES = ('ing', 'ed', 'es', 's')
+
+# Minimum length a stem must keep so short words are not reduced to noise
+MIN_STEM_LENGTH = 3
+
+STOPWORDS = frozenset([
+    # English
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'was', 'with', 'my', 'our', 'i', 'me',
+    # Filipino
+    'ang', 'ng', 'nang', 'sa', 'mga', 'si', 'ni', 'kay', 'ay', 'at', 'na', 'ba',
+    'po', 'ho', 'nga', 'naman', 'din', 'rin', 'pa', 'lang', 'lamang', 'ko', 'mo',
+])
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def fold(text):
+    """Lowercase and strip diacritics (ñ -> n, é -> e)"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def stem(token):
+    """
+    Strip one Filipino prefix, then one Filipino or English suffix
+
+    Hyphenated verbs such as 'mag-file' keep only the part after the prefix.
+    """
+    if '-' in token:
+        head, _, tail = token.partition('-')
+        if head in FILIPINO_PREFIXES and tail:
+            token = tail.replace('-', '')
+        else:
+            token = token.replace('-', '')
+
+    for prefix in FILIPINO_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= MIN_STEM_LENGTH + 1:
+            token = token[len(prefix):]
+            break
+
+    for suffix in FILIPINO_SUFFIXES + ENGLISH_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH + 1:
+            token = token[:-len(suffix)]
+            break
+
+    return token
+
+
+def tokenize(text, keep_stopwords=False):
+    """Folded word tokens in order, hyphenated words kept whole"""
+    tokens = _TOKEN_RE.findall(fold(text))
+    if keep_stopwords:
+        return tokens
+    return [token for token in tokens if token not in STOPWORDS]
+
+
+def terms(text):
+    """
+    Index terms for a text: every token plus its stem when that differs
+
+    Usage:
+        terms('Nag-reklamo sa baradong kanal')
+        # ['nag-reklamo', 'reklamo', 'baradong', 'kanal']
+    """
+    result = []
+    for token in tokenize(text):
+        result.append(token)
+        stemmed = stem(token)
+        if stemmed != token:
+            result.append(stemmed)
+    return result
+
+
+def normalize(text):
+    """Stopword-free, stemmed, space-joined form of a text (for cache keys)"""
+    return ' '.join(stem(token) for token in tokenize(text))
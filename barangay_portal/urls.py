@@ -24,6 +24,8 @@ from . import views
 
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
+    path('_perf/', views.perf_dashboard, name='perf_dashboard'),
+    path('_perf/json/', views.perf_json, name='perf_json'),
 ]
 
 urlpatterns += i18n_patterns(
@@ -1,7 +1,10 @@
 from django.shortcuts import render, redirect
 from django.http import JsonResponse
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from complaints.models import Complaint
+from complaints.stats import counter_stats
 from feedback.models import Feedback
 from accounts.models import User
 from announcements.models import Announcement
@@ -13,15 +16,17 @@ def home(request):
     Home page view displaying barangay statistics and quick access features
     """
     # Get basic statistics
+    thirty_days_ago = datetime.now().date() - timedelta(days=30)
+    complaint_summary = counter_stats(extra={'recent': Q(day__gte=thirty_days_ago)})
+    
     total_residents = User.objects.filter(role='resident').count()
-    total_complaints = Complaint.objects.count()
-    resolved_complaints = Complaint.objects.filter(status='resolved').count()
-    pending_complaints = Complaint.objects.filter(status='pending').count()
+    total_complaints = complaint_summary.total
+    resolved_complaints = complaint_summary.by_status['resolved']
+    pending_complaints = complaint_summary.by_status['pending']
     total_feedback = Feedback.objects.count()
     
     # Recent activities (last 30 days)
-    thirty_days_ago = datetime.now().date() - timedelta(days=30)
-    recent_complaints = Complaint.objects.filter(created_at__gte=thirty_days_ago).count()
+    recent_complaints = complaint_summary.extra('recent')
     recent_feedback = Feedback.objects.filter(created_at__gte=thirty_days_ago).count()
     
     # Calculate resolution rate
@@ -54,10 +59,45 @@ def quick_stats_api(request):
     """
     API endpoint for quick statistics (for AJAX updates)
     """
+    complaint_summary = counter_stats()
     stats = {
-        'total_complaints': Complaint.objects.count(),
-        'pending_complaints': Complaint.objects.filter(status='pending').count(),
-        'resolved_complaints': Complaint.objects.filter(status='resolved').count(),
+        'total_complaints': complaint_summary.total,
+        'pending_complaints': complaint_summary.by_status['pending'],
+        'resolved_complaints': complaint_summary.by_status['resolved'],
         'total_feedback': Feedback.objects.count(),
     }
-    return JsonResponse(stats)
\ No newline at end of file
+    return JsonResponse(stats)
+
+RECENT_PROFILES = 50
+
+
+def _perf_data(request):
+    from chatbot.http_client import http_client
+    from .profiling import DEFAULT_DUPLICATE_THRESHOLD, profile_buffer
+
+    threshold = getattr(settings, 'PERF_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD)
+    view = request.GET.get('view') or None
+    recent = profile_buffer.recent(view)[-RECENT_PROFILES:]
+    return {
+        'views': profile_buffer.summary(),
+        'recent': [profile.as_dict(threshold) for profile in reversed(recent)],
+        'budgets': getattr(settings, 'PERF_BUDGETS', {}),
+        'external_apis': http_client.stats(),
+    }
+
+
+@staff_member_required
+def perf_dashboard(request):
+    """
+    Staff-only report of recent request profiles, per view
+    (see barangay_portal.profiling)
+    """
+    context = _perf_data(request)
+    context['selected_view'] = request.GET.get('view', '')
+    return render(request, 'performance/perf_dashboard.html', context)
+
+
+@staff_member_required
+def perf_json(request):
+    """Same data as perf_dashboard, as JSON"""
+    return JsonResponse(_perf_data(request))
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import ChatSession, ChatMessage, ChatbotKnowledgeBase, ChatbotAnalytics, ProactiveAlert, ChatImageUpload, APIConfiguration
+from .models import ChatSession, ChatMessage, ChatbotKnowledgeBase, ChatbotAnalytics, ProactiveAlert, ChatImageUpload, APIConfiguration, WeatherSnapshot, TranslatedText
+from .response_cache import response_cache
 
 
 @admin.register(ChatSession)
@@ -51,9 +52,9 @@ class ChatbotKnowledgeBaseAdmin(admin.ModelAdmin):
 
 @admin.register(ChatbotAnalytics)
 class ChatbotAnalyticsAdmin(admin.ModelAdmin):
-    list_display = ['date', 'total_sessions', 'total_messages', 'avg_session_length', 'satisfaction_rating']
+    list_display = ['date', 'total_sessions', 'total_messages', 'avg_session_length', 'most_common_category', 'helpful_count', 'not_helpful_count', 'satisfaction_rating']
     list_filter = ['date', 'most_common_category']
-    readonly_fields = ['date']
+    readonly_fields = ['date', 'rolled_up_through']
     
     def has_add_permission(self, request):
         return False  # Analytics are generated automatically
@@ -102,7 +103,7 @@ class ChatImageUploadAdmin(admin.ModelAdmin):
 
 @admin.register(APIConfiguration)
 class APIConfigurationAdmin(admin.ModelAdmin):
-    list_display = ['provider', 'is_active', 'rate_limit', 'requests_made_today', 'usage_percentage', 'updated_at']
+    list_display = ['provider', 'is_active', 'rate_limit', 'requests_today', 'usage_percentage', 'cache_hit_rate', 'updated_at']
     list_filter = ['provider', 'is_active', 'last_request_date']
     search_fields = ['provider']
     list_editable = ['is_active', 'rate_limit']
@@ -126,9 +127,13 @@ class APIConfigurationAdmin(admin.ModelAdmin):
     
     readonly_fields = ['requests_made_today', 'last_request_date', 'created_at', 'updated_at']
     
+    def requests_today(self, obj):
+        return obj.requests_today()
+    requests_today.short_description = "Requests Today"
+    
     def usage_percentage(self, obj):
         if obj.rate_limit > 0:
-            percentage = (obj.requests_made_today / obj.rate_limit) * 100
+            percentage = (obj.requests_today() / obj.rate_limit) * 100
             if percentage > 80:
                 return f"🔴 {percentage:.1f}%"
             elif percentage > 50:
@@ -137,3 +142,34 @@ class APIConfigurationAdmin(admin.ModelAdmin):
                 return f"🟢 {percentage:.1f}%"
         return "N/A"
     usage_percentage.short_description = "Usage Today"
+    
+    def cache_hit_rate(self, obj):
+        if obj.provider != 'openai':
+            return "-"
+        stats = response_cache.stats()
+        if not stats['lookups']:
+            return "No lookups today"
+        return f"{stats['hit_rate']:.0%} ({stats['hit']} exact, {stats['near_hit']} similar, {stats['miss']} missed)"
+    cache_hit_rate.short_description = "Reply Cache Today"
+
+
+@admin.register(WeatherSnapshot)
+class WeatherSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['source', 'fetched_at']
+    search_fields = ['source']
+    readonly_fields = ['source', 'data', 'fetched_at']
+    
+    def has_add_permission(self, request):
+        return False  # Written by manage.py poll_weather
+
+
+@admin.register(TranslatedText)
+class TranslatedTextAdmin(admin.ModelAdmin):
+    list_display = ['source_preview', 'target_language', 'created_at']
+    list_filter = ['target_language', 'created_at']
+    search_fields = ['source_text', 'translated_text']
+    readonly_fields = ['key', 'created_at']
+    
+    def source_preview(self, obj):
+        return obj.source_text[:75] + "..." if len(obj.source_text) > 75 else obj.source_text
+    source_preview.short_description = "Source Text"
@@ -1,17 +1,25 @@
+import logging
 import re
 import random
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
+from django.conf import settings
 from django.utils import timezone
-from .models import ChatbotKnowledgeBase, ChatSession, ChatMessage
+from .context import get_context_store
+from .knowledge_index import KeywordMatches, KnowledgeEntry, KnowledgeIndex, WordHits, get_knowledge_index
+from .retrieval import bm25_available
 from .api_services import smart_response_service, weather_service, translation_service
 
+logger = logging.getLogger(__name__)
+
 
 class BarangayAIEngine:
     """AI engine for Barangay Portal chatbot with Filipino and English support"""
     
+    _bm25_fallback_logged = False
+    
     def __init__(self):
         self.confidence_threshold = 0.25  # Lowered slightly for better coverage
-        self.conversation_context = {}  # Track conversation context per session
+        self.conversation_context = get_context_store()  # Track conversation context per session
         self.fallback_responses = {
             'en': [
                 "I apologize, but I'm not sure about that. Can you try rephrasing your question?",
@@ -77,9 +85,20 @@ class BarangayAIEngine:
                 r'\b(emergency|emerhensya|urgent|kailangan|tulong|rescue|saklolo)\b'
             ]
         }
+        
+        # One alternation per intent, compiled once for the life of the engine
+        self.intent_patterns = {
+            intent: re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+            for intent, patterns in self.common_patterns.items()
+        }
 
-    def process_message(self, message: str, language: str = 'en', user_context: Dict = None, session_id: str = None) -> Dict:
-        """Process user message and return AI response with context awareness"""
+    def process_message(self, message: str, language: str = 'en', user_context: Dict = None, session_id: str = None, on_delta: Callable[[str], None] = None) -> Dict:
+        """
+        Process user message and return AI response with context awareness
+        
+        ``on_delta`` receives the pieces of a reply produced incrementally
+        (OpenAI) as they arrive; replies found locally are returned whole.
+        """
         message_lower = message.lower().strip()
         
         # Auto-detect language from message if not explicitly set
@@ -88,28 +107,40 @@ class BarangayAIEngine:
         if detected_language and detected_language != language:
             language = detected_language
         
-        # Initialize session context if needed
-        if session_id and session_id not in self.conversation_context:
-            self.conversation_context[session_id] = {
-                'last_category': None,
-                'last_keywords': [],
-                'message_count': 0,
-                'topics_discussed': [],
-                'preferred_language': language  # Remember user's language preference
-            }
-        
-        # Update context
+        # Load (or start) the session context; it is written back to the
+        # store once the response has been chosen
+        context = None
         if session_id:
-            self.conversation_context[session_id]['message_count'] += 1
+            context = self.conversation_context.get(session_id)
+            if context is None:
+                context = {
+                    'last_category': None,
+                    'last_keywords': [],
+                    'message_count': 0,
+                    'topics_discussed': [],
+                    'preferred_language': language  # Remember user's language preference
+                }
+            
+            # Update context
+            context['message_count'] += 1
             # Update preferred language if user switches
             if language:
-                self.conversation_context[session_id]['preferred_language'] = language
+                context['preferred_language'] = language
+            self.conversation_context[session_id] = context
         
+        try:
+            return self._respond(message, message_lower, language, user_context, session_id, context, on_delta)
+        finally:
+            if context is not None:
+                self.conversation_context[session_id] = context
+
+    def _respond(self, message: str, message_lower: str, language: str, user_context: Dict, session_id: str, context: Dict, on_delta: Callable[[str], None] = None) -> Dict:
+        """Pick the response for a message, updating the session context in place"""
         # Check for greetings first
-        if self._matches_pattern(message_lower, self.common_patterns['greeting']):
+        if self._matches_pattern(message_lower, 'greeting'):
             response = self._get_personalized_greeting(language, user_context)
-            if session_id:
-                self.conversation_context[session_id]['last_category'] = 'greeting'
+            if context is not None:
+                context['last_category'] = 'greeting'
             return {
                 'response': response,
                 'confidence': 0.95,
@@ -119,7 +150,7 @@ class BarangayAIEngine:
             }
         
         # Check for thanks
-        if self._matches_pattern(message_lower, self.common_patterns['thanks']):
+        if self._matches_pattern(message_lower, 'thanks'):
             thanks_responses = {
                 'en': ["You're welcome! Is there anything else I can help you with?"],
                 'fil': ["Walang anuman! May iba pa bang maitutulong ko sa inyo?"]
@@ -136,17 +167,16 @@ class BarangayAIEngine:
         kb_result = self._search_knowledge_base(message_lower, language, session_id, user_context)
         if kb_result.get('confidence', 0) > self.confidence_threshold:
             # Update conversation context
-            if session_id and kb_result.get('category'):
-                ctx = self.conversation_context[session_id]
-                ctx['last_category'] = kb_result['category']
-                if kb_result['category'] not in ctx['topics_discussed']:
-                    ctx['topics_discussed'].append(kb_result['category'])
+            if context is not None and kb_result.get('category'):
+                context['last_category'] = kb_result['category']
+                if kb_result['category'] not in context['topics_discussed']:
+                    context['topics_discussed'].append(kb_result['category'])
             # Add detected language to response
             kb_result['detected_language'] = language
             return kb_result
         
         # Check for weather queries first (before knowledge base for real-time data)
-        if self._matches_pattern(message_lower, self.common_patterns['weather']):
+        if self._matches_pattern(message_lower, 'weather'):
             try:
                 from .api_services import weather_service
                 weather_alerts = weather_service.get_weather_alerts(
@@ -167,7 +197,7 @@ class BarangayAIEngine:
         # Try enhanced AI responses using external APIs
         try:
             enhanced_response = smart_response_service.get_enhanced_response(
-                message, language, user_context
+                message, language, user_context, on_delta=on_delta
             )
             if enhanced_response:
                 return {
@@ -198,35 +228,16 @@ class BarangayAIEngine:
 
     def _search_knowledge_base(self, message: str, language: str, session_id: str = None, user_context: Dict = None) -> Dict:
         """Search knowledge base for relevant answers with enhanced matching and context awareness"""
-        knowledge_items = ChatbotKnowledgeBase.objects.filter(is_active=True).order_by('-priority')
-        
-        best_match = None
-        best_score = 0
+        index = get_knowledge_index()
         
         # Get conversation context
         conv_context = self.conversation_context.get(session_id, {}) if session_id else {}
         last_category = conv_context.get('last_category')
         
-        # First pass: exact keyword matching with context boost
-        for item in knowledge_items:
-            score = self._calculate_relevance_score(message, item, last_category, user_context)
-            if score > best_score:
-                best_score = score
-                best_match = item
-        
-        # Second pass: fuzzy matching for better accuracy
-        if best_score < 0.5:
-            fuzzy_match, fuzzy_score = self._fuzzy_search_knowledge_base(message, knowledge_items, last_category)
-            if fuzzy_score > best_score:
-                best_match = fuzzy_match
-                best_score = fuzzy_score
-        
-        # Third pass: semantic similarity (check for synonyms and related terms)
-        if best_score < 0.4:
-            semantic_match, semantic_score = self._semantic_search(message, knowledge_items, language)
-            if semantic_score > best_score:
-                best_match = semantic_match
-                best_score = semantic_score
+        if self._retrieval_mode() == 'bm25':
+            best_match, best_score = self._bm25_search(message, index, last_category)
+        else:
+            best_match, best_score = self._heuristic_search(message, index, language, last_category, user_context)
         
         if best_match and best_score > 0.2:  # Lowered threshold even more for better coverage
             answer = best_match.answer_fil if language == 'fil' else best_match.answer_en
@@ -246,38 +257,86 @@ class BarangayAIEngine:
         
         return {'confidence': 0}
 
-    def _calculate_relevance_score(self, message: str, kb_item: ChatbotKnowledgeBase, last_category: str = None, user_context: Dict = None) -> float:
-        """Calculate relevance score between message and knowledge base item with context awareness"""
-        score = 0
+    def _retrieval_mode(self) -> str:
+        """'bm25' when selected by CHATBOT_RETRIEVAL and NumPy/SciPy are installed"""
+        mode = getattr(settings, 'CHATBOT_RETRIEVAL', 'heuristic')
+        if mode == 'bm25' and not bm25_available():
+            if not self._bm25_fallback_logged:
+                logger.warning("CHATBOT_RETRIEVAL is 'bm25' but numpy/scipy are not installed; using the heuristic scorer")
+                self._bm25_fallback_logged = True
+            return 'heuristic'
+        return mode
+
+    def _heuristic_search(self, message: str, index: KnowledgeIndex, language: str, last_category: str = None, user_context: Dict = None) -> tuple:
+        """Best entry by the three-pass keyword/fuzzy/synonym scorer"""
         message_words = set(message.lower().split())
+        keywords = index.keyword_matches(message, message_words)
+        candidates = index.candidates(index.word_hits(message_words), keywords)
+        
+        best_match = None
+        best_score = 0
+        
+        # First pass: exact keyword matching with context boost
+        for entry, hits in candidates:
+            score = self._calculate_relevance_score(message, entry, hits, keywords, last_category, user_context)
+            if score > best_score:
+                best_score = score
+                best_match = entry
+        
+        # Second pass: fuzzy matching for better accuracy
+        if best_score < 0.5:
+            fuzzy_match, fuzzy_score = self._fuzzy_search_knowledge_base(message_words, candidates, keywords, last_category)
+            if fuzzy_score > best_score:
+                best_match = fuzzy_match
+                best_score = fuzzy_score
+        
+        # Third pass: semantic similarity (check for synonyms and related terms)
+        if best_score < 0.4:
+            semantic_match, semantic_score = self._semantic_search(message, index, language)
+            if semantic_score > best_score:
+                best_match = semantic_match
+                best_score = semantic_score
+        
+        return best_match, best_score
+
+    def _bm25_search(self, message: str, index: KnowledgeIndex, last_category: str = None) -> tuple:
+        """Best entry by sparse BM25 retrieval, nudged towards the current topic"""
+        best_match = None
+        best_score = 0
+        for entry, confidence in index.bm25().search(message, k=5):
+            # Context boost - if continuing same topic
+            if last_category and entry.category == last_category:
+                confidence += 0.1
+            if confidence > best_score:
+                best_score = confidence
+                best_match = entry
+        return best_match, best_score
+
+    def _calculate_relevance_score(self, message: str, entry: KnowledgeEntry, hits: WordHits, keywords: KeywordMatches, last_category: str = None, user_context: Dict = None) -> float:
+        """Calculate relevance score between message and knowledge base entry with context awareness"""
+        score = 0
         
         # 1. Check question match (weighted more heavily)
-        question_words = set(kb_item.question.lower().split())
-        question_overlap = len(message_words.intersection(question_words))
-        if len(question_words) > 0:
-            question_match_ratio = question_overlap / len(question_words)
-            score += question_match_ratio * 0.35
+        if entry.question_words:
+            score += hits.question * entry.question_weight
             
             # Bonus for matching important words (longer words are usually more meaningful)
-            for word in message_words.intersection(question_words):
-                if len(word) > 4:  # Important words are usually longer
-                    score += 0.05
+            score += hits.long_question * 0.05
         
         # 2. Check keywords match (improved algorithm)
-        if kb_item.keywords:
-            keywords = [kw.strip().lower() for kw in kb_item.keywords.split(',')]
+        if entry.keywords:
             keyword_matches = 0
-            for keyword in keywords:
+            for keyword_id in entry.keyword_ids:
                 # Exact match - highest score
-                if keyword in message:
+                if keyword_id in keywords.exact:
                     score += 0.25
                     keyword_matches += 1
                 # Partial match - medium score
-                elif any(word in keyword or keyword in word for word in message_words if len(word) > 2):
+                elif keyword_id in keywords.partial:
                     score += 0.15
                     keyword_matches += 1
                 # Word-level match - lower score  
-                elif any(word in keyword.split() for word in message_words):
+                elif keyword_id in keywords.word:
                     score += 0.08
                     keyword_matches += 1
             
@@ -286,17 +345,17 @@ class BarangayAIEngine:
                 score += 0.1
         
         # 3. Category-specific boost
-        if self._matches_category(message, kb_item.category):
+        if self._matches_category(message, entry.category):
             score += 0.15
         
         # 4. Context boost - if continuing same topic
-        if last_category and kb_item.category == last_category:
+        if last_category and entry.category == last_category:
             score += 0.15
         
         # 5. Priority boost - higher priority items get small boost
-        if kb_item.priority >= 9:
+        if entry.priority >= 9:
             score += 0.05
-        elif kb_item.priority >= 7:
+        elif entry.priority >= 7:
             score += 0.03
         
         # 6. User context boost
@@ -304,32 +363,30 @@ class BarangayAIEngine:
             # Boost certain categories based on user role
             user_role = user_context.get('role', 'resident')
             if user_role == 'resident':
-                if kb_item.category in ['complaints', 'services', 'documents']:
+                if entry.category in ['complaints', 'services', 'documents']:
                     score += 0.05
             elif user_role in ['official', 'admin']:
-                if kb_item.category in ['general', 'emergency', 'navigation']:
+                if entry.category in ['general', 'emergency', 'navigation']:
                     score += 0.03
         
         # 7. Answer relevance check (lightweight)
-        answer_text = (kb_item.answer_en + ' ' + kb_item.answer_fil).lower()
-        answer_word_matches = len(message_words.intersection(set(answer_text.split())))
-        if answer_word_matches > 0:
-            score += min(answer_word_matches * 0.02, 0.1)  # Cap at 0.1
+        if hits.answer > 0:
+            score += min(hits.answer * 0.02, 0.1)  # Cap at 0.1
         
         return min(score, 1.0)
 
     def _matches_category(self, message: str, category: str) -> bool:
         """Check if message matches specific category patterns"""
-        category_patterns = {
-            'complaints': self.common_patterns['complaint'],
-            'services': self.common_patterns['services'],
-            'contact': self.common_patterns['contact'],
-            'hours': self.common_patterns['hours'],
-            'documents': self.common_patterns['documents'],
+        category_intents = {
+            'complaints': 'complaint',
+            'services': 'services',
+            'contact': 'contact',
+            'hours': 'hours',
+            'documents': 'documents',
         }
         
-        if category in category_patterns:
-            return self._matches_pattern(message, category_patterns[category])
+        if category in category_intents:
+            return self._matches_pattern(message, category_intents[category])
         return False
 
     def _pattern_based_response(self, message: str, language: str, user_context: Dict) -> Dict:
@@ -361,8 +418,8 @@ class BarangayAIEngine:
             }
         }
         
-        for pattern_name, patterns in self.common_patterns.items():
-            if self._matches_pattern(message, patterns) and pattern_name in responses:
+        for pattern_name in self.intent_patterns:
+            if pattern_name in responses and self._matches_pattern(message, pattern_name):
                 return {
                     'response': responses[pattern_name][language],
                     'confidence': 0.7,
@@ -372,12 +429,9 @@ class BarangayAIEngine:
         
         return {'confidence': 0}
 
-    def _matches_pattern(self, text: str, patterns: List[str]) -> bool:
-        """Check if text matches any of the given regex patterns"""
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        return False
+    def _matches_pattern(self, text: str, intent: str) -> bool:
+        """Check if text matches any of the regex patterns of an intent"""
+        return self.intent_patterns[intent].search(text) is not None
 
     def _get_quick_suggestions(self, language: str) -> List[str]:
         """Get quick suggestion buttons for user"""
@@ -438,63 +492,56 @@ class BarangayAIEngine:
         }
         return suggestions[language]
     
-    def _fuzzy_search_knowledge_base(self, message: str, knowledge_items, last_category: str = None) -> tuple:
+    def _fuzzy_search_knowledge_base(self, message_words: set, candidates: List[Tuple[KnowledgeEntry, WordHits]], keywords: KeywordMatches, last_category: str = None) -> tuple:
         """Fuzzy search for better knowledge base matching with context awareness"""
         best_match = None
         best_score = 0
         
-        message_words = set(message.lower().split())
-        
-        for item in knowledge_items:
+        for entry, hits in candidates:
             # Check similarity with question
-            question_words = set(item.question.lower().split())
-            if len(message_words) > 0 and len(question_words) > 0:
+            if len(message_words) > 0 and len(entry.question_words) > 0:
                 # Jaccard similarity
-                intersection = len(message_words.intersection(question_words))
-                union = len(message_words.union(question_words))
+                intersection = hits.question
+                union = len(message_words) + len(entry.question_words) - intersection
                 question_similarity = intersection / union if union > 0 else 0
                 
                 # Boost for longer matching words
-                long_word_matches = sum(1 for word in message_words.intersection(question_words) if len(word) > 4)
-                question_similarity += long_word_matches * 0.05
+                question_similarity += hits.long_question * 0.05
             else:
                 question_similarity = 0
             
             # Check similarity with keywords (improved)
             keyword_similarity = 0
-            if item.keywords:
-                keywords = [kw.strip().lower() for kw in item.keywords.split(',')]
-                exact_matches = sum(1 for kw in keywords if kw in message)
-                partial_matches = sum(1 for kw in keywords if any(word in kw or kw in word for word in message_words if len(word) > 2))
+            if entry.keywords:
+                exact_matches = sum(1 for keyword_id in entry.keyword_ids if keyword_id in keywords.exact)
+                partial_matches = sum(1 for keyword_id in entry.keyword_ids if keyword_id in keywords.partial)
                 
-                if len(keywords) > 0:
-                    keyword_similarity = (exact_matches * 0.8 + partial_matches * 0.4) / len(keywords)
+                if len(entry.keywords) > 0:
+                    keyword_similarity = (exact_matches * 0.8 + partial_matches * 0.4) / len(entry.keywords)
             
             # Check similarity with answer (partial - to catch edge cases)
-            answer_text = (item.answer_en + ' ' + item.answer_fil).lower()
-            answer_words = set(answer_text.split())
             if len(message_words) > 0:
-                answer_similarity = len(message_words.intersection(answer_words)) / len(message_words) * 0.2
+                answer_similarity = hits.answer / len(message_words) * 0.2
             else:
                 answer_similarity = 0
             
             # Context boost
-            context_boost = 0.15 if last_category and item.category == last_category else 0
+            context_boost = 0.15 if last_category and entry.category == last_category else 0
             
             # Combined similarity score with adjusted weights
             total_score = (question_similarity * 0.45) + (keyword_similarity * 0.45) + (answer_similarity * 0.1) + context_boost
             
             # Priority bonus
-            if item.priority >= 9:
+            if entry.priority >= 9:
                 total_score += 0.05
             
             if total_score > best_score:
                 best_score = total_score
-                best_match = item
+                best_match = entry
         
         return best_match, best_score
     
-    def _semantic_search(self, message: str, knowledge_items, language: str) -> tuple:
+    def _semantic_search(self, message: str, index: KnowledgeIndex, language: str) -> tuple:
         """Semantic search using common synonyms and related terms"""
         best_match = None
         best_score = 0
@@ -540,20 +587,22 @@ class BarangayAIEngine:
                     expanded_terms.update(syns)
         
         # Search with expanded terms
-        for item in knowledge_items:
-            item_text = f"{item.question} {item.keywords} {item.answer_en if language == 'en' else item.answer_fil}".lower()
+        expanded_terms = [term for term in expanded_terms if len(term) > 2]
+        text_language = 'en' if language == 'en' else 'fil'
+        for entry in index.text_candidates(expanded_terms, text_language):
+            item_text = entry.texts[text_language]
             
-            matches = sum(1 for term in expanded_terms if term in item_text and len(term) > 2)
+            matches = sum(1 for term in expanded_terms if term in item_text)
             if matches > 0:
                 score = min(matches * 0.15, 0.8)  # Cap at 0.8
                 
                 # Boost for category match
-                if self._matches_category(message_lower, item.category):
+                if self._matches_category(message_lower, entry.category):
                     score += 0.1
                 
                 if score > best_score:
                     best_score = score
-                    best_match = item
+                    best_match = entry
         
         return best_match, best_score
     
@@ -681,3 +730,8 @@ class BarangayAIEngine:
         else:
             # If tied or no strong indicators, return None (use provided language)
             return None
+
+
+# Shared by every request in the process so compiled patterns, response
+# tables and conversation context survive between messages
+ai_engine = BarangayAIEngine()
@@ -1,34 +1,108 @@
-import requests
 import json
 from django.conf import settings
 from django.utils import timezone
+from barangay_portal.performance import cache_query
+from .http_client import http_client
 from .models import APIConfiguration
+from .response_cache import response_cache
+from .translation_memory import translation_memory
+from .weather_cache import openweather_forecast, weather_cache, wttr_current, wttr_forecast
 import logging
 
 logger = logging.getLogger(__name__)
 
+OPENWEATHER_FORECAST_APP_ID = '439d4b804bc8187953eb36d2a8c26a02'
+
+# Weather sources read by the typhoon reports; see chatbot/weather_cache.py
+SAMAR_LOCATIONS = [
+    {
+        'name': 'Basey, Samar',
+        'source': wttr_current('Basey,Samar,Philippines'),
+        'lat': 11.2026,
+        'lon': 125.0003,
+        'priority': 1
+    },
+    {
+        'name': 'Tacloban, Leyte',
+        'source': wttr_current('Tacloban,Leyte,Philippines'),
+        'lat': 11.2447,
+        'lon': 125.0048,
+        'priority': 2
+    },
+    {
+        'name': 'Catbalogan, Samar',
+        'source': wttr_current('Catbalogan,Samar,Philippines'),
+        'lat': 11.7745,
+        'lon': 124.8842,
+        'priority': 2
+    }
+]
+
+VISAYAS_SOURCES = [
+    {'name': 'Manila (National Reference)', 'source': wttr_current('Manila,Philippines', ttl=30 * 60, timeout=6)},
+    {'name': 'Cebu (Central Visayas)', 'source': wttr_current('Cebu,Philippines', ttl=30 * 60, timeout=6)},
+    {'name': 'Iloilo (Western Visayas)', 'source': wttr_current('Iloilo,Philippines', ttl=30 * 60, timeout=6)},
+]
+
+SAMAR_FORECAST_SOURCES = [
+    {
+        'name': 'Basey 5-day forecast',
+        'source': openweather_forecast('Basey,Philippines', OPENWEATHER_FORECAST_APP_ID),
+        'type': 'daily_forecast'
+    },
+    {
+        'name': 'Tacloban forecast',
+        'source': openweather_forecast('Tacloban,Philippines', OPENWEATHER_FORECAST_APP_ID),
+        'type': 'daily_forecast'
+    },
+    {
+        'name': 'Samar extended forecast',
+        'source': wttr_forecast('Basey,Samar,Philippines'),
+        'type': 'extended_forecast'
+    }
+]
+
+TYPHOON_SOURCES = [
+    {'name': 'wttr.in Manila', 'source': wttr_current('Manila,Philippines', ttl=30 * 60, timeout=6)},
+    {'name': 'wttr.in Tacloban', 'source': wttr_current('Tacloban,Philippines', timeout=5)},
+]
+
+# Every source above plus the default city's current conditions, each once;
+# what poll_weather refreshes
+WEATHER_SOURCES = list({
+    source.name: source
+    for source in [wttr_current('Basey,Philippines', timeout=5)] + [
+        entry['source'] for entry in SAMAR_LOCATIONS + VISAYAS_SOURCES + SAMAR_FORECAST_SOURCES + TYPHOON_SOURCES
+    ]
+}.values())
+
+@cache_query(timeout=300, key_prefix='api_config', tags=['chatbot.APIConfiguration'])
+def _get_active_api_config(provider):
+    # False rather than None so a missing configuration is cached too
+    return APIConfiguration.objects.filter(provider=provider, is_active=True).first() or False
+
+
 class APIServiceManager:
     """Manage external API calls for the chatbot"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.timeout = 10  # 10 second timeout
-    
     def get_api_config(self, provider):
-        """Get API configuration for a provider"""
-        try:
-            return APIConfiguration.objects.get(provider=provider, is_active=True)
-        except APIConfiguration.DoesNotExist:
-            return None
+        """Get API configuration for a provider (cached until a configuration is saved)"""
+        return _get_active_api_config(provider) or None
     
-    def make_api_request(self, provider, url, method='GET', headers=None, data=None, params=None):
-        """Make a secure API request with rate limiting"""
+    def make_api_request(self, provider, url, method='GET', headers=None, data=None, params=None, stream=False):
+        """
+        Make a secure API request with rate limiting
+        
+        Returns the decoded JSON, or with ``stream=True`` the open response
+        for the caller to read incrementally and close.
+        """
         config = self.get_api_config(provider)
         if not config:
             logger.warning(f"No active API configuration found for {provider}")
             return None
         
-        if not config.can_make_request():
+        # Counts the request now, atomically, so concurrent calls cannot exceed the quota
+        if not config.acquire_request():
             logger.warning(f"Rate limit exceeded for {provider}")
             return None
         
@@ -37,22 +111,22 @@ class APIServiceManager:
             request_headers = headers or {}
             
             # Make the request
-            response = self.session.request(
-                method=method,
-                url=url,
+            response = http_client.request(
+                method,
+                url,
+                provider=provider,
                 headers=request_headers,
                 params=params,
                 json=data if method in ['POST', 'PUT'] else None,
-                timeout=10
+                timeout=10,
+                stream=stream
             )
             
-            # Track usage
-            config.increment_usage()
-            
             if response.status_code == 200:
-                return response.json()
+                return response if stream else response.json()
             else:
                 logger.error(f"API request failed for {provider}: {response.status_code}")
+                response.close()
                 return None
                 
         except Exception as e:
@@ -280,27 +354,16 @@ class WeatherService:
         return [random.choice(responses)]
     
     def _get_free_weather_data(self, city):
-        """Get weather data from free API that doesn't require API key"""
-        try:
-            import requests
-            # Using wttr.in - free weather API that doesn't require API key
-            url = f"https://wttr.in/{city},Philippines?format=j1"
-            
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                return response.json()
-        except Exception as e:
-            logger.error(f"Free weather API error: {e}")
-        return None
+        """Cached wttr.in current conditions (free, no API key needed)"""
+        return weather_cache.read(wttr_current(f'{city},Philippines', timeout=5))
     
     def _process_free_weather_data(self, data, language):
-        """Process free weather API data"""
+        """Process normalized current conditions from the weather cache"""
         try:
-            current = data['current_condition'][0]
-            weather_desc = current['weatherDesc'][0]['value'].lower()
-            temp_c = int(current['temp_C'])
-            humidity = int(current['humidity'])
-            wind_speed = int(current['windspeedKmph'])
+            weather_desc = data['weather_desc'].lower()
+            temp_c = data['temperature']
+            humidity = data['humidity']
+            wind_speed = data['wind_speed_kmh']
             
             alerts = []
             
@@ -373,7 +436,6 @@ class WeatherService:
     def _get_real_typhoon_status(self, language):
         """Get real typhoon status specifically for Samar/Basey area"""
         try:
-            import requests
             from datetime import datetime
             
             # Get REAL-TIME data specifically for Eastern Samar/Visayas region
@@ -397,118 +459,71 @@ class WeatherService:
         return self._get_samar_typhoon_response(language)
     
     def _check_samar_specific_conditions(self):
-        """Check weather conditions specifically around Samar area"""
-        import requests
-        
-        samar_locations = [
-            {
-                'name': 'Basey, Samar',
-                'url': 'https://wttr.in/Basey,Samar,Philippines?format=j1',
-                'lat': 11.2026,
-                'lon': 125.0003,
-                'priority': 1
-            },
-            {
-                'name': 'Tacloban, Leyte', 
-                'url': 'https://wttr.in/Tacloban,Leyte,Philippines?format=j1',
-                'lat': 11.2447,
-                'lon': 125.0048,
-                'priority': 2
-            },
-            {
-                'name': 'Catbalogan, Samar',
-                'url': 'https://wttr.in/Catbalogan,Samar,Philippines?format=j1', 
-                'lat': 11.7745,
-                'lon': 124.8842,
-                'priority': 2
-            }
-        ]
-        
+        """Check weather conditions specifically around Samar area (cached)"""
         local_conditions = []
         
-        for location in samar_locations:
-            try:
-                response = requests.get(location['url'], timeout=8)
-                if response.status_code == 200:
-                    data = response.json()
-                    current = data['current_condition'][0]
-                    
-                    # Get detailed local conditions
-                    condition_data = {
-                        'location': location['name'],
-                        'coordinates': {'lat': location['lat'], 'lon': location['lon']},
-                        'weather_desc': current['weatherDesc'][0]['value'],
-                        'wind_speed_kmh': int(current['windspeedKmph']),
-                        'wind_dir': current['winddirDegree'],
-                        'temperature': int(current['temp_C']),
-                        'humidity': int(current['humidity']),
-                        'pressure': int(current['pressure']),
-                        'visibility': int(current['visibility']),
-                        'priority': location['priority'],
-                        'timestamp': timezone.now().isoformat()
-                    }
-                    
-                    # Check for typhoon indicators
-                    is_typhoon_like = (
-                        condition_data['wind_speed_kmh'] > 60 or
-                        any(keyword in condition_data['weather_desc'].lower() 
-                            for keyword in ['storm', 'typhoon', 'cyclone', 'heavy rain'])
-                    )
-                    
-                    condition_data['typhoon_indicator'] = is_typhoon_like
-                    local_conditions.append(condition_data)
-                    
-            except Exception as e:
-                logger.error(f"Samar location {location['name']} error: {e}")
+        snapshots = weather_cache.read_many([location['source'] for location in SAMAR_LOCATIONS])
+        for location, current in zip(SAMAR_LOCATIONS, snapshots):
+            if current is None:
                 continue
+            
+            # Get detailed local conditions
+            condition_data = {
+                'location': location['name'],
+                'coordinates': {'lat': location['lat'], 'lon': location['lon']},
+                'weather_desc': current['weather_desc'],
+                'wind_speed_kmh': current['wind_speed_kmh'],
+                'wind_dir': current['wind_dir'],
+                'temperature': current['temperature'],
+                'humidity': current['humidity'],
+                'pressure': current['pressure'],
+                'visibility': current['visibility'],
+                'priority': location['priority'],
+                'timestamp': current['observed_at']
+            }
+            
+            # Check for typhoon indicators
+            is_typhoon_like = (
+                condition_data['wind_speed_kmh'] > 60 or
+                any(keyword in condition_data['weather_desc'].lower() 
+                    for keyword in ['storm', 'typhoon', 'cyclone', 'heavy rain'])
+            )
+            
+            condition_data['typhoon_indicator'] = is_typhoon_like
+            local_conditions.append(condition_data)
         
         return local_conditions
     
     def _check_visayas_region_alerts(self):
-        """Check for broader Visayas region weather alerts"""
-        import requests
-        
-        regional_sources = [
-            {
-                'name': 'Manila (National Reference)',
-                'url': 'https://wttr.in/Manila,Philippines?format=j1'
-            },
-            {
-                'name': 'Cebu (Central Visayas)',
-                'url': 'https://wttr.in/Cebu,Philippines?format=j1'
-            },
-            {
-                'name': 'Iloilo (Western Visayas)', 
-                'url': 'https://wttr.in/Iloilo,Philippines?format=j1'
-            }
-        ]
-        
+        """Check for broader Visayas region weather alerts (cached)"""
         regional_alerts = []
         
-        for source in regional_sources:
-            try:
-                response = requests.get(source['url'], timeout=6)
-                if response.status_code == 200:
-                    data = response.json()
-                    current = data['current_condition'][0]
-                    
-                    alert_data = {
-                        'region': source['name'],
-                        'weather_desc': current['weatherDesc'][0]['value'],
-                        'wind_speed': int(current['windspeedKmph']),
-                        'temperature': int(current['temp_C']),
-                        'has_storm_activity': any(keyword in current['weatherDesc'][0]['value'].lower() 
-                                                for keyword in ['storm', 'rain', 'thunder'])
-                    }
-                    
-                    regional_alerts.append(alert_data)
-                    
-            except Exception as e:
-                logger.error(f"Regional source {source['name']} error: {e}")
+        snapshots = weather_cache.read_many([source['source'] for source in VISAYAS_SOURCES])
+        for source, current in zip(VISAYAS_SOURCES, snapshots):
+            if current is None:
                 continue
+            
+            regional_alerts.append({
+                'region': source['name'],
+                'weather_desc': current['weather_desc'],
+                'wind_speed': current['wind_speed_kmh'],
+                'temperature': current['temperature'],
+                'has_storm_activity': any(keyword in current['weather_desc'].lower() 
+                                        for keyword in ['storm', 'rain', 'thunder'])
+            })
                 
         return regional_alerts
     
+    def get_weather_snapshot(self):
+        """Normalized cached weather: Samar conditions, regional alerts, forecast and storm risk"""
+        forecast = self._get_samar_forecast_data()
+        return {
+            'samar_conditions': self._check_samar_specific_conditions(),
+            'visayas_alerts': self._check_visayas_region_alerts(),
+            'forecast': forecast,
+            'storm_risk': self._analyze_approaching_storms(forecast),
+        }
+    
     def _generate_samar_specific_report(self, weather_data, language):
         """Generate location-specific typhoon report for Basey, Samar with FORECAST"""
         samar_conditions = weather_data.get('samar_conditions', [])
@@ -641,120 +656,17 @@ class WeatherService:
         return self._get_samar_typhoon_response(language)
     
     def _get_samar_forecast_data(self):
-        """Get 5-7 day forecast data for Samar region"""
-        import requests
-        from datetime import datetime, timedelta
-        
-        forecast_sources = [
-            {
-                'name': 'Basey 5-day forecast',
-                'url': 'https://api.openweathermap.org/data/2.5/forecast?q=Basey,Philippines&appid=439d4b804bc8187953eb36d2a8c26a02&units=metric',
-                'type': 'openweather'
-            },
-            {
-                'name': 'Tacloban forecast', 
-                'url': 'https://api.openweathermap.org/data/2.5/forecast?q=Tacloban,Philippines&appid=439d4b804bc8187953eb36d2a8c26a02&units=metric',
-                'type': 'openweather'
-            },
-            {
-                'name': 'Samar extended forecast',
-                'url': 'https://wttr.in/Basey,Samar,Philippines?format=j1',
-                'type': 'wttr_extended'
-            }
-        ]
-        
+        """Get 5-7 day forecast data for Samar region (cached)"""
         forecast_data = []
         
-        for source in forecast_sources:
-            try:
-                response = requests.get(source['url'], timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    if source['type'] == 'openweather':
-                        # Process OpenWeatherMap 5-day forecast
-                        forecast_list = data.get('list', [])
-                        
-                        # Group by days and get daily summaries
-                        daily_forecasts = {}
-                        for item in forecast_list:
-                            dt = datetime.fromtimestamp(item['dt'])
-                            day_key = dt.strftime('%Y-%m-%d')
-                            
-                            if day_key not in daily_forecasts:
-                                daily_forecasts[day_key] = {
-                                    'date': day_key,
-                                    'max_wind': 0,
-                                    'max_temp': item['main']['temp'],
-                                    'min_temp': item['main']['temp'],
-                                    'weather_conditions': [],
-                                    'precipitation': 0
-                                }
-                            
-                            # Update daily data
-                            wind_kmh = item['wind'].get('speed', 0) * 3.6
-                            if wind_kmh > daily_forecasts[day_key]['max_wind']:
-                                daily_forecasts[day_key]['max_wind'] = wind_kmh
-                            
-                            daily_forecasts[day_key]['max_temp'] = max(
-                                daily_forecasts[day_key]['max_temp'], 
-                                item['main']['temp']
-                            )
-                            daily_forecasts[day_key]['min_temp'] = min(
-                                daily_forecasts[day_key]['min_temp'],
-                                item['main']['temp'] 
-                            )
-                            
-                            weather_main = item['weather'][0]['main']
-                            if weather_main not in daily_forecasts[day_key]['weather_conditions']:
-                                daily_forecasts[day_key]['weather_conditions'].append(weather_main)
-                            
-                            if 'rain' in item:
-                                daily_forecasts[day_key]['precipitation'] += item['rain'].get('3h', 0)
-                        
-                        for day_data in daily_forecasts.values():
-                            forecast_data.append({
-                                'source': source['name'],
-                                'type': 'daily_forecast',
-                                'data': day_data
-                            })
-                    
-                    elif source['type'] == 'wttr_extended':
-                        # Process wttr.in extended forecast  
-                        weather_forecast = data.get('weather', [])
-                        
-                        for i, day_forecast in enumerate(weather_forecast[:5]):
-                            date_obj = datetime.now() + timedelta(days=i)
-                            
-                            max_wind = 0
-                            weather_conditions = []
-                            
-                            # Check hourly data for the day
-                            for hourly in day_forecast.get('hourly', []):
-                                wind_kmh = int(hourly.get('windspeedKmph', 0))
-                                weather_desc = hourly['weatherDesc'][0]['value']
-                                
-                                if wind_kmh > max_wind:
-                                    max_wind = wind_kmh
-                                
-                                if weather_desc not in weather_conditions:
-                                    weather_conditions.append(weather_desc)
-                            
-                            forecast_data.append({
-                                'source': source['name'],
-                                'type': 'extended_forecast',
-                                'data': {
-                                    'date': date_obj.strftime('%Y-%m-%d'),
-                                    'max_wind': max_wind,
-                                    'weather_conditions': weather_conditions,
-                                    'max_temp': int(day_forecast['maxtempC']),
-                                    'min_temp': int(day_forecast['mintempC'])
-                                }
-                            })
-                            
-            except Exception as e:
-                logger.error(f"Forecast source {source['name']} error: {e}")
-                continue
+        snapshots = weather_cache.read_many([source['source'] for source in SAMAR_FORECAST_SOURCES])
+        for source, days in zip(SAMAR_FORECAST_SOURCES, snapshots):
+            for day_data in days or []:
+                forecast_data.append({
+                    'source': source['name'],
+                    'type': source['type'],
+                    'data': day_data
+                })
         
         return forecast_data
     
@@ -889,7 +801,6 @@ class WeatherService:
     
     def _check_current_conditions(self):
         """Check current weather conditions"""
-        import requests
         
         current_sources = [
             {
@@ -913,7 +824,7 @@ class WeatherService:
         
         for source in current_sources:
             try:
-                response = requests.get(source['url'], timeout=5)
+                response = http_client.get(source['url'], timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     current = data['current_condition'][0]
@@ -936,7 +847,6 @@ class WeatherService:
     
     def _check_forecast_conditions(self):
         """Check forecast conditions for approaching storms"""
-        import requests
         from datetime import datetime, timedelta
         
         forecast_sources = [
@@ -956,7 +866,7 @@ class WeatherService:
         
         for source in forecast_sources:
             try:
-                response = requests.get(source['url'], timeout=5)
+                response = http_client.get(source['url'], timeout=5)
                 if response.status_code == 200:
                     data = response.json()
                     
@@ -1119,7 +1029,6 @@ class WeatherService:
     def _get_pagasa_data(self):
         """Try to get real typhoon data from working APIs"""
         try:
-            import requests
             from datetime import datetime
             
             # Try real working weather APIs
@@ -1140,7 +1049,7 @@ class WeatherService:
             
             for api_info in working_urls:
                 try:
-                    response = requests.get(api_info['url'], timeout=5)
+                    response = http_client.get(api_info['url'], timeout=5)
                     if response.status_code == 200:
                         data = response.json()
                         return {'data': data, 'type': api_info['type']}
@@ -1155,7 +1064,6 @@ class WeatherService:
     def _get_typhoon_tracking_data(self):
         """Get typhoon tracking data from real working sources"""
         try:
-            import requests
             
             # Real working typhoon/storm APIs
             real_apis = [
@@ -1177,7 +1085,7 @@ class WeatherService:
             for api_info in real_apis:
                 try:
                     headers = api_info.get('headers', {})
-                    response = requests.get(api_info['url'], timeout=5, headers=headers)
+                    response = http_client.get(api_info['url'], timeout=5, headers=headers)
                     if response.status_code == 200:
                         data = response.json()
                         return {'data': data, 'type': api_info['type']}
@@ -1403,36 +1311,63 @@ class WeatherService:
 
 
 class TranslationService:
-    """Translation API service"""
+    """Translation API service, backed by the translation memory"""
+    
+    # Google Translate v2 accepts up to 128 strings per request
+    batch_size = 100
     
     def __init__(self):
         self.api_manager = APIServiceManager()
     
     def translate_text(self, text, target_language):
         """Translate text to target language"""
-        config = self.api_manager.get_api_config('google_translate')
-        if not config:
-            return text  # Return original if no translation available
-        
-        # Google Translate API call
+        return self.translate_many([text], target_language)[0]
+    
+    def translate_many(self, texts, target_language):
+        """
+        Translate a list of texts, in order
+        
+        Remembered translations are reused; the rest are sent upstream in
+        batches. Texts that cannot be translated come back unchanged.
+        """
+        wanted = [text for text in dict.fromkeys(texts) if text and text.strip()]
+        translations = translation_memory.lookup(wanted, target_language) if wanted else {}
+        
+        missing = [text for text in wanted if text not in translations]
+        if missing:
+            config = self.api_manager.get_api_config('google_translate')
+            if config:
+                for i in range(0, len(missing), self.batch_size):
+                    translated = self._translate_batch(config, missing[i:i + self.batch_size], target_language)
+                    translation_memory.store(translated, target_language)
+                    translations.update(translated)
+        
+        return [translations.get(text, text) for text in texts]
+    
+    def _translate_batch(self, config, texts, target_language):
+        """One upstream call; returns {text: translation} for what came back"""
         url = "https://translation.googleapis.com/language/translate/v2"
         
-        params = {
-            'key': config.api_key,
-            'q': text,
+        # The texts go in the (JSON) body: a full batch of chat replies is far
+        # too long for a query string
+        data = {
+            'q': texts,
             'target': 'tl' if target_language == 'fil' else 'en',
             'format': 'text'
         }
         
-        result = self.api_manager.make_api_request('google_translate', url, method='POST', params=params)
-        
-        if result and 'data' in result:
-            try:
-                return result['data']['translations'][0]['translatedText']
-            except (KeyError, IndexError):
-                return text
+        result = self.api_manager.make_api_request(
+            'google_translate', url, method='POST', data=data, params={'key': config.api_key}
+        )
         
-        return text
+        try:
+            translated = [item['translatedText'] for item in result['data']['translations']]
+        except (KeyError, TypeError):
+            return {}
+        if len(translated) != len(texts):
+            logger.error(f"Translation batch returned {len(translated)} results for {len(texts)} texts")
+            return {}
+        return dict(zip(texts, translated))
 
 
 class SmartResponseService:
@@ -1443,8 +1378,13 @@ class SmartResponseService:
         self.weather_service = WeatherService()
         self.translation_service = TranslationService()
     
-    def get_enhanced_response(self, user_message, language='en', context=None):
-        """Get enhanced response using AI APIs"""
+    def get_enhanced_response(self, user_message, language='en', context=None, on_delta=None):
+        """
+        Get enhanced response using AI APIs
+        
+        With ``on_delta``, an OpenAI reply is streamed: each piece is passed
+        to ``on_delta`` as it arrives, and the whole reply is still returned.
+        """
         
         # Check for weather-related queries
         weather_keywords = [
@@ -1463,19 +1403,24 @@ class SmartResponseService:
                 return weather_alerts[0]['message']
         
         # Try OpenAI for smarter responses
-        openai_response = self._get_openai_response(user_message, language, context)
+        openai_response = self._get_openai_response(user_message, language, context, on_delta)
         if openai_response:
             return openai_response
         
         # Fallback to basic response
         return None
     
-    def _get_openai_response(self, message, language, context):
-        """Get response from OpenAI API"""
+    def _get_openai_response(self, message, language, context, on_delta=None):
+        """Get response from OpenAI API (streamed to ``on_delta`` when given)"""
         config = self.api_manager.get_api_config('openai')
         if not config:
             return None
         
+        # The reply depends only on the message and language, so similar questions share it
+        cached_reply = response_cache.get(message, language)
+        if cached_reply is not None:
+            return cached_reply
+        
         url = "https://api.openai.com/v1/chat/completions"
         
         system_prompt = (
@@ -1500,15 +1445,63 @@ class SmartResponseService:
             'temperature': 0.7
         }
         
+        if on_delta:
+            data['stream'] = True
+            response = self.api_manager.make_api_request(
+                'openai', url, method='POST', headers=headers, data=data, stream=True
+            )
+            if not response:
+                return None
+            reply, complete = self._read_openai_stream(response, on_delta)
+            if complete and reply:
+                response_cache.set(message, language, reply.strip())
+            return reply
+        
         result = self.api_manager.make_api_request('openai', url, method='POST', headers=headers, data=data)
         
         if result and 'choices' in result:
             try:
-                return result['choices'][0]['message']['content'].strip()
+                reply = result['choices'][0]['message']['content'].strip()
             except (KeyError, IndexError):
                 return None
+            response_cache.set(message, language, reply)
+            return reply
         
         return None
+    
+    def _read_openai_stream(self, response, on_delta):
+        """
+        (reply, complete) from OpenAI's server-sent events, passing each piece to ``on_delta``
+        
+        A stream cut off midway returns what was already shown, so the saved
+        reply matches what the resident read.
+        """
+        pieces = []
+        complete = False
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    complete = True
+                    break
+                try:
+                    text = json.loads(payload)['choices'][0]['delta'].get('content')
+                except (ValueError, KeyError, IndexError, AttributeError):
+                    continue
+                if text and not pieces:
+                    text = text.lstrip()
+                if text:
+                    pieces.append(text)
+                    on_delta(text)
+        except Exception as e:
+            logger.error(f"OpenAI stream interrupted: {str(e)}")
+        finally:
+            response.close()
+        
+        reply = ''.join(pieces)
+        return (reply if reply.strip() else None), complete
 
 
 # Service instances
@@ -1526,53 +1519,27 @@ class TyphoonMonitoringService:
     def get_current_typhoon_status(self, language='en'):
         """Get current typhoon status from multiple sources"""
         try:
-            import requests
             from datetime import datetime
             
-            # Try multiple typhoon tracking sources
-            typhoon_sources = [
-                {
-                    'url': 'https://www.jma.go.jp/bosai/forecast/data/forecast/130000.json',
-                    'name': 'Japan Meteorological Agency',
-                    'type': 'jma'
-                },
-                {
-                    'url': f'https://wttr.in/Manila,Philippines?format=j1',
-                    'name': 'wttr.in Manila',
-                    'type': 'wttr_manila'
-                },
-                {
-                    'url': f'https://wttr.in/Tacloban,Philippines?format=j1',
-                    'name': 'wttr.in Tacloban',  
-                    'type': 'wttr_tacloban'
-                }
-            ]
-            
             active_storms = []
             
-            for source in typhoon_sources:
-                try:
-                    response = requests.get(source['url'], timeout=5)
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        if source['type'].startswith('wttr'):
-                            # Check wttr.in data for storm conditions
-                            current = data['current_condition'][0]
-                            weather_desc = current['weatherDesc'][0]['value'].lower()
-                            wind_speed = int(current['windspeedKmph'])
-                            
-                            if any(word in weather_desc for word in ['storm', 'thunder', 'rain']) or wind_speed > 60:
-                                active_storms.append({
-                                    'location': source['name'],
-                                    'description': weather_desc,
-                                    'wind_speed': wind_speed,
-                                    'source': source['name']
-                                })
-                        
-                except Exception as e:
-                    logger.error(f"Typhoon source {source['name']} error: {e}")
+            # Cached wttr.in snapshots; the chat never waits on the network
+            snapshots = weather_cache.read_many([source['source'] for source in TYPHOON_SOURCES])
+            for source, current in zip(TYPHOON_SOURCES, snapshots):
+                if current is None:
                     continue
+                
+                # Check wttr.in data for storm conditions
+                weather_desc = current['weather_desc'].lower()
+                wind_speed = current['wind_speed_kmh']
+                
+                if any(word in weather_desc for word in ['storm', 'thunder', 'rain']) or wind_speed > 60:
+                    active_storms.append({
+                        'location': source['name'],
+                        'description': weather_desc,
+                        'wind_speed': wind_speed,
+                        'source': source['name']
+                    })
             
             # Generate response based on findings
             if active_storms:
@@ -0,0 +1,126 @@
+"""
+Per-session conversation context for the chatbot
+
+The engine is shared by every request in a process, so the context it keeps
+per chat session (last category, topics, preferred language) lives in a
+bounded store instead of an ever-growing dict:
+
+    memory  an in-process LRU capped at CHATBOT_CONTEXT_MAX_SESSIONS
+    cache   the Django cache, shared by every worker process
+
+Entries idle for CHATBOT_CONTEXT_TTL seconds are dropped in both. Select the
+store with the CHATBOT_CONTEXT_STORE setting.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_TTL = 30 * 60
+
+
+class MemoryContextStore:
+    """Thread-safe LRU of session contexts with idle expiry"""
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl=DEFAULT_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, default=None):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return default
+            expires_at, context = entry
+            if expires_at <= time.monotonic():
+                del self._entries[session_id]
+                return default
+            self._entries[session_id] = (time.monotonic() + self.ttl, context)
+            self._entries.move_to_end(session_id)
+            return context
+
+    def __getitem__(self, session_id):
+        context = self.get(session_id)
+        if context is None:
+            raise KeyError(session_id)
+        return context
+
+    def __setitem__(self, session_id, context):
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + self.ttl, context)
+            self._entries.move_to_end(session_id)
+            self._evict()
+
+    def __delitem__(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def __len__(self):
+        with self._lock:
+            self._evict()
+            return len(self._entries)
+
+    def _evict(self):
+        now = time.monotonic()
+        # Expiry times follow LRU order, so expired entries are at the front
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at > now and len(self._entries) <= self.max_sessions:
+                break
+            self._entries.popitem(last=False)
+
+
+class CacheContextStore:
+    """Session contexts in the Django cache, shared across processes"""
+
+    key_prefix = 'chatbot:context'
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+
+    def _key(self, session_id):
+        return f"{self.key_prefix}:{session_id}"
+
+    def get(self, session_id, default=None):
+        context = cache.get(self._key(session_id))
+        if context is None:
+            return default
+        # Refresh the idle timeout on every read
+        cache.touch(self._key(session_id), self.ttl)
+        return context
+
+    def __getitem__(self, session_id):
+        context = self.get(session_id)
+        if context is None:
+            raise KeyError(session_id)
+        return context
+
+    def __setitem__(self, session_id, context):
+        cache.set(self._key(session_id), context, self.ttl)
+
+    def __delitem__(self, session_id):
+        cache.delete(self._key(session_id))
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+
+def get_context_store():
+    """Build the store selected by the CHATBOT_CONTEXT_* settings"""
+    ttl = getattr(settings, 'CHATBOT_CONTEXT_TTL', DEFAULT_TTL)
+    if getattr(settings, 'CHATBOT_CONTEXT_STORE', 'memory') == 'cache':
+        return CacheContextStore(ttl=ttl)
+    return MemoryContextStore(
+        max_sessions=getattr(settings, 'CHATBOT_CONTEXT_MAX_SESSIONS', DEFAULT_MAX_SESSIONS),
+        ttl=ttl,
+    )
@@ -0,0 +1,251 @@
+"""
+Shared HTTP client for the chatbot's external APIs
+
+Every outbound call (wttr.in, OpenWeatherMap, OpenAI, Google Translate...)
+goes through ``http_client`` instead of a bare ``requests.get``:
+
+    pooling     one keep-alive ``requests.Session`` per host, so repeated
+                calls reuse TCP/TLS connections
+    timeouts    always explicit, as (connect, read); ``Session.timeout``
+                is not a requests setting and was silently ignored
+    retries     connection errors, timeouts and 429/5xx responses are
+                retried a bounded number of times with full-jitter
+                exponential backoff (idempotent methods only by default)
+    breaker     after ``failure_threshold`` consecutive failures a
+                provider's circuit opens and calls fail fast with
+                CircuitOpenError for ``reset_timeout`` seconds, after which
+                one trial call decides whether it closes again
+    metrics     per-provider request, error, retry and short-circuit counts
+                plus recent latencies, via ``http_client.stats()``
+
+Breakers and metrics are per process.
+"""
+
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 3.05
+DEFAULT_TIMEOUT = 10
+POOL_SIZE = 10
+RETRIES = 2
+BACKOFF = 0.25
+BACKOFF_CAP = 2.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+LATENCY_SAMPLES = 500
+
+
+class CircuitOpenError(requests.RequestException):
+    """A provider's circuit breaker is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                # Let exactly one trial call through
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        """Count a failure; True when this one opened the circuit"""
+        with self._lock:
+            self.failures += 1
+            was_closed = self.opened_at is None
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+            return was_closed and self.opened_at is not None
+
+
+class ProviderMetrics:
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'short_circuited': self.short_circuited,
+            'error_rate': self.errors / self.requests if self.requests else 0.0,
+            'p50_ms': round(percentiles[49] * 1000, 1) if percentiles else None,
+            'p95_ms': round(percentiles[94] * 1000, 1) if percentiles else None,
+        }
+
+
+class HTTPClient:
+    """
+    Pooled, retrying, circuit-breaking HTTP client
+
+    Usage:
+        response = http_client.get(url, provider='wttr', timeout=8)
+        response = http_client.request('POST', url, provider='openai', json=payload)
+
+    ``provider`` names the breaker and metrics bucket; it defaults to the
+    URL's host. Raises ``requests.RequestException`` (including
+    CircuitOpenError) when every attempt failed; a final non-2xx response
+    is returned as is.
+    """
+
+    def __init__(self, retries=RETRIES, backoff=BACKOFF, failure_threshold=5, reset_timeout=30, pool_size=POOL_SIZE):
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._breakers = {}
+        self._metrics = defaultdict(ProviderMetrics)
+        self._lock = threading.Lock()
+
+    def _session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # Retries are handled here, with backoff and breaker bookkeeping
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def breaker(self, provider):
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = self._breakers[provider] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _record(self, provider, **counts):
+        with self._lock:
+            metrics = self._metrics[provider]
+            latency = counts.pop('latency', None)
+            if latency is not None:
+                metrics.latencies.append(latency)
+            for name, value in counts.items():
+                setattr(metrics, name, getattr(metrics, name) + value)
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter: spreads retries from many workers instead of syncing them
+        time.sleep(random.uniform(0, min(BACKOFF_CAP, self.backoff * 2 ** attempt)))
+
+    def request(self, method, url, provider=None, timeout=DEFAULT_TIMEOUT, retries=None, **kwargs):
+        method = method.upper()
+        host = urlsplit(url).netloc
+        provider = provider or host
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            self._record(provider, short_circuited=1)
+            raise CircuitOpenError(f"Circuit open for {provider}")
+
+        session = self._session(host)
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=(CONNECT_TIMEOUT, timeout), **kwargs)
+            except requests.RequestException as e:
+                self._record(provider, requests=1, errors=1, latency=time.perf_counter() - start)
+                if attempt < retries and isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    self._record(provider, retries=1)
+                    self._sleep_before_retry(attempt)
+                    continue
+                self._failed(provider, breaker)
+                raise e
+            except Exception:
+                # Anything else (a bad URL, a bug in an adapter) still ends a half-open trial
+                self._record(provider, requests=1, errors=1, latency=time.perf_counter() - start)
+                self._failed(provider, breaker)
+                raise
+
+            failed = response.status_code in RETRY_STATUSES
+            self._record(provider, requests=1, errors=int(failed), latency=time.perf_counter() - start)
+            if failed and attempt < retries:
+                response.close()
+                self._record(provider, retries=1)
+                self._sleep_before_retry(attempt)
+                continue
+
+            if failed:
+                self._failed(provider, breaker)
+            else:
+                breaker.record_success()
+            return response
+
+    def _failed(self, provider, breaker):
+        if breaker.record_failure():
+            logger.warning(f"Circuit opened for {provider} after {breaker.failures} consecutive failures")
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def reset(self):
+        """Close every breaker and clear the metrics"""
+        with self._lock:
+            self._breakers.clear()
+            self._metrics.clear()
+
+    def stats(self):
+        """Metrics and breaker state per provider"""
+        with self._lock:
+            providers = set(self._metrics) | set(self._breakers)
+            stats = {provider: self._metrics[provider].as_dict() for provider in providers}
+            for provider, breaker in self._breakers.items():
+                stats[provider]['circuit'] = breaker.state
+        return stats
+
+
+http_client = HTTPClient()
@@ -0,0 +1,275 @@
+"""
+Compiled in-memory index of the chatbot knowledge base
+
+``BarangayAIEngine`` used to re-query every active ``ChatbotKnowledgeBase``
+row and re-split its question, keywords and answers on every message. The
+index does that work once per process:
+
+    word postings       word -> entries using it in their question or
+                        answers, with the entry's precomputed question weight
+    keyword postings    keyword word -> keywords, keyword -> owning entries
+    substring indexes   trigram indexes over the keywords and over the words
+                        of each language's text, for the "keyword in message",
+                        "word in keyword" and synonym checks of the scorer
+
+A message only touches the entries that share a word or substring with it;
+those are then scored exactly as before. The index carries the generation of
+the 'chatbot.chatbotknowledgebase' cache tag, so any save or delete of a
+knowledge base row makes the next lookup rebuild it.
+"""
+
+import threading
+from collections import Counter, defaultdict
+
+from barangay_portal.performance import get_tag_generations, register_cache_tags
+
+
+KNOWLEDGE_BASE_TAG = register_cache_tags(['chatbot.ChatbotKnowledgeBase'])[0]
+
+# Weight of the question-word overlap ratio in the first-pass score
+QUESTION_WEIGHT = 0.35
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SubstringIndex:
+    """
+    Trigram index answering substring queries over a list of strings
+
+    Strings shorter than three characters have no trigrams and are always
+    checked directly.
+    """
+
+    def __init__(self, strings):
+        self.strings = list(strings)
+        self.grams = defaultdict(list)
+        self.gram_counts = []
+        self.short = []
+        for string_id, string in enumerate(self.strings):
+            grams = _trigrams(string)
+            self.gram_counts.append(len(grams))
+            if not grams:
+                self.short.append(string_id)
+            for gram in grams:
+                self.grams[gram].append(string_id)
+
+    def containing(self, text):
+        """Ids of strings that contain ``text``"""
+        grams = _trigrams(text)
+        if not grams:
+            return [i for i, string in enumerate(self.strings) if text in string]
+
+        postings = sorted((self.grams.get(gram, ()) for gram in grams), key=len)
+        found = set(postings[0])
+        for posting in postings[1:]:
+            if not found:
+                break
+            found.intersection_update(posting)
+        return [i for i in found if text in self.strings[i]]
+
+    def within(self, text):
+        """Ids of strings that occur inside ``text``"""
+        counts = Counter()
+        for gram in _trigrams(text):
+            counts.update(self.grams.get(gram, ()))
+        found = [i for i, count in counts.items() if count == self.gram_counts[i]]
+        return [i for i in found + self.short if self.strings[i] in text]
+
+
+class KnowledgeEntry:
+    """A knowledge base row with its text pre-split for scoring"""
+
+    __slots__ = (
+        'id', 'category', 'priority', 'question', 'answer_en', 'answer_fil',
+        'keywords', 'keyword_ids', 'question_words', 'question_weight', 'answer_words', 'texts',
+    )
+
+    def __init__(self, item):
+        self.id = item.id
+        self.category = item.category
+        self.priority = item.priority
+        self.question = item.question
+        self.answer_en = item.answer_en
+        self.answer_fil = item.answer_fil
+        self.keywords = [kw.strip().lower() for kw in item.keywords.split(',')] if item.keywords else []
+        # Positions of the keywords in KnowledgeIndex.keywords, set by the index
+        self.keyword_ids = []
+        self.question_words = set(item.question.lower().split())
+        self.question_weight = QUESTION_WEIGHT / len(self.question_words) if self.question_words else 0
+        self.answer_words = set(f"{item.answer_en} {item.answer_fil}".lower().split())
+        # Text searched by the synonym pass, per answer language
+        self.texts = {
+            'en': f"{item.question} {item.keywords} {item.answer_en}".lower(),
+            'fil': f"{item.question} {item.keywords} {item.answer_fil}".lower(),
+        }
+
+
+class WordHits:
+    """How many message words an entry shares with its question and answers"""
+
+    __slots__ = ('question', 'long_question', 'answer')
+
+    def __init__(self):
+        self.question = 0
+        self.long_question = 0
+        self.answer = 0
+
+
+NO_HITS = WordHits()
+
+
+class KeywordMatches:
+    """
+    Keyword ids matched by a message, one set per scoring tier
+
+        exact    the keyword occurs in the message
+        partial  a message word (3+ letters) is in the keyword, or vice versa
+        word     a message word is one of the keyword's words
+    """
+
+    __slots__ = ('exact', 'partial', 'word')
+
+    def __init__(self, exact, partial, word):
+        self.exact = exact
+        self.partial = partial
+        self.word = word
+
+    def all(self):
+        return self.exact | self.partial | self.word
+
+
+class KnowledgeIndex:
+    """
+    Inverted index over the active knowledge base entries
+
+    Usage:
+        index = get_knowledge_index()
+        keywords = index.keyword_matches(message, message_words)
+        for entry, hits in index.candidates(index.word_hits(message_words), keywords):
+            ...
+    """
+
+    def __init__(self, items, version=None):
+        self.version = version
+        self._bm25 = None
+        # Kept in priority order so ties resolve as the old ordered scan did
+        self.entries = [KnowledgeEntry(item) for item in items]
+
+        self.word_postings = defaultdict(list)
+        keyword_ids = {}
+        self.keyword_owners = []
+        self.keyword_word_postings = defaultdict(list)
+        vocabularies = {'en': defaultdict(set), 'fil': defaultdict(set)}
+        for position, entry in enumerate(self.entries):
+            for word in entry.question_words | entry.answer_words:
+                self.word_postings[word].append((
+                    position,
+                    word in entry.question_words,
+                    word in entry.answer_words,
+                ))
+            for keyword in entry.keywords:
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(keyword_ids)
+                    self.keyword_owners.append(set())
+                    for word in set(keyword.split()):
+                        self.keyword_word_postings[word].append(keyword_ids[keyword])
+                entry.keyword_ids.append(keyword_ids[keyword])
+                self.keyword_owners[keyword_ids[keyword]].add(position)
+            for language, text in entry.texts.items():
+                for word in text.split():
+                    vocabularies[language][word].add(position)
+
+        self.keywords = SubstringIndex(keyword_ids)
+        self.vocabulary_owners = {}
+        self.vocabularies = {}
+        for language, owners in vocabularies.items():
+            self.vocabulary_owners[language] = list(owners.values())
+            self.vocabularies[language] = SubstringIndex(owners)
+
+    @classmethod
+    def build(cls, version=None):
+        from .models import ChatbotKnowledgeBase
+
+        items = ChatbotKnowledgeBase.objects.filter(is_active=True).order_by('-priority', 'pk')
+        return cls(items, version=version)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def bm25(self):
+        """BM25 retriever over the same entries, built on first use"""
+        if self._bm25 is None:
+            from .retrieval import BM25Retriever
+            self._bm25 = BM25Retriever(self.entries)
+        return self._bm25
+
+    def word_hits(self, message_words):
+        """Question/answer overlap counts for every entry sharing a message word"""
+        hits = defaultdict(WordHits)
+        for word in message_words:
+            for position, in_question, in_answer in self.word_postings.get(word, ()):
+                entry_hits = hits[position]
+                if in_question:
+                    entry_hits.question += 1
+                    if len(word) > 4:
+                        entry_hits.long_question += 1
+                if in_answer:
+                    entry_hits.answer += 1
+        return hits
+
+    def keyword_matches(self, message, message_words):
+        """Resolve every keyword tier for a message in one pass over the index"""
+        partial = set()
+        word = set()
+        for message_word in message_words:
+            if len(message_word) > 2:
+                partial.update(self.keywords.containing(message_word))
+                partial.update(self.keywords.within(message_word))
+            word.update(self.keyword_word_postings.get(message_word, ()))
+        return KeywordMatches(set(self.keywords.within(message)), partial, word)
+
+    def candidates(self, hits, keyword_matches):
+        """
+        Entries that can score on the message's words or keywords
+
+        Covers every entry whose question or answers share a word with the
+        message and every entry owning a matched keyword. Returns
+        (entry, WordHits) pairs.
+        """
+        positions = set(hits)
+        for keyword_id in keyword_matches.all():
+            positions.update(self.keyword_owners[keyword_id])
+        return [(self.entries[position], hits.get(position, NO_HITS)) for position in sorted(positions)]
+
+    def text_candidates(self, terms, language):
+        """Entries whose ``language`` text contains any of the given terms"""
+        vocabulary = self.vocabularies[language]
+        owners = self.vocabulary_owners[language]
+        positions = set()
+        for term in terms:
+            # A substring of the text lies inside one whitespace-separated
+            # word per piece, so the longest piece narrows the lookup
+            piece = max(term.split() or [term], key=len)
+            for word_id in vocabulary.containing(piece):
+                positions.update(owners[word_id])
+        return [self.entries[position] for position in sorted(positions)]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index():
+    """The process-wide index, rebuilt when the knowledge base has changed"""
+    global _index
+
+    version = get_tag_generations([KNOWLEDGE_BASE_TAG])[KNOWLEDGE_BASE_TAG]
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = KnowledgeIndex.build(version)
+            index = _index
+    return index
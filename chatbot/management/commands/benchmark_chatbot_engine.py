@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from chatbot.ai_engine import BarangayAIEngine, ai_engine
+from chatbot.models import ChatbotKnowledgeBase
+
+
+# Messages answered by greetings, thanks or the knowledge base, so no
+# external API is called while timing
+MESSAGES = [
+    'hello', 'How do I file a complaint?', 'magkano ang barangay clearance',
+    'what are the office hours', 'paano mag-register', 'contact number ng barangay',
+    'requirements for certificate of residency', 'salamat po',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure chatbot engine throughput (messages/second) for a shared vs per-request engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Messages per run')
+        parser.add_argument('--sessions', type=int, default=50, help='Distinct chat sessions to spread messages over')
+
+    def handle(self, *args, **options):
+        if not ChatbotKnowledgeBase.objects.filter(is_active=True).exists():
+            self.stdout.write(self.style.WARNING("Knowledge base is empty - run populate_chatbot_knowledge first"))
+            return
+
+        total = options['messages']
+        sessions = [f'benchmark-{i}' for i in range(options['sessions'])]
+        # Warm the knowledge base index so both runs measure steady state
+        ai_engine.process_message(MESSAGES[0])
+
+        for label, get_engine in (
+            ('per-request engine', BarangayAIEngine),
+            ('shared engine', lambda: ai_engine),
+        ):
+            start = time.perf_counter()
+            for i in range(total):
+                get_engine().process_message(
+                    MESSAGES[i % len(MESSAGES)], session_id=sessions[i % len(sessions)],
+                )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{label:<20} {total / elapsed:>10.0f} messages/s")
+
+        for session_id in sessions:
+            del ai_engine.conversation_context[session_id]
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from barangay_portal.performance import invalidate_tags
+from chatbot.ai_engine import BarangayAIEngine
+from chatbot.knowledge_index import KNOWLEDGE_BASE_TAG, get_knowledge_index
+from chatbot.models import ChatbotKnowledgeBase
+
+
+WORDS = (
+    'barangay clearance certificate residency indigency permit business complaint '
+    'reklamo dokumento bayad oras opisina office hours contact telepono emergency '
+    'register account verify track status basura ingay tubig baha kalsada ilaw '
+    'schedule requirements fee valid id proof address saan paano magkano kailan'
+).split()
+# Filler vocabulary so entries differ the way a real, growing KB would
+VOCABULARY = WORDS + [f'salita{i}' for i in range(2000)]
+CATEGORIES = [code for code, _ in ChatbotKnowledgeBase.CATEGORY_CHOICES]
+QUERIES = [
+    'how much is barangay clearance', 'paano mag-file ng reklamo', 'office hours',
+    'requirements for certificate of residency', 'emergency contact number po',
+    'track my complaint status', 'magkano ang bayad sa permit', 'zzzz',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure chatbot knowledge base match latency as the KB grows (synthetic entries are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per query')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['sizes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Synthetic knowledge base entries rolled back")
+
+    def run(self, sizes, repeat):
+        rng = random.Random(42)
+        engine = BarangayAIEngine()
+        ChatbotKnowledgeBase.objects.all().delete()
+        created = 0
+
+        self.stdout.write(f"{'entries':>8} {'build ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for size in sorted(sizes):
+            ChatbotKnowledgeBase.objects.bulk_create([
+                ChatbotKnowledgeBase(
+                    category=rng.choice(CATEGORIES),
+                    question=' '.join(rng.choices(VOCABULARY, k=8)) + '?',
+                    answer_en=' '.join(rng.choices(VOCABULARY, k=60)),
+                    answer_fil=' '.join(rng.choices(VOCABULARY, k=60)),
+                    keywords=', '.join(' '.join(rng.choices(VOCABULARY, k=rng.randint(1, 2))) for _ in range(8)),
+                    priority=rng.randint(1, 10),
+                )
+                for _ in range(size - created)
+            ], batch_size=1000)
+            created = size
+
+            # bulk_create skips the save signals, so bump the version by hand
+            invalidate_tags(KNOWLEDGE_BASE_TAG)
+            start = time.perf_counter()
+            get_knowledge_index()
+            build_ms = (time.perf_counter() - start) * 1000
+
+            samples = []
+            for _ in range(repeat):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    engine._search_knowledge_base(query, 'en')
+                    samples.append((time.perf_counter() - start) * 1000)
+            percentiles = statistics.quantiles(samples, n=100)
+            self.stdout.write(f"{size:>8} {build_ms:>9.1f} {percentiles[49]:>8.2f} {percentiles[98]:>8.2f}")
@@ -0,0 +1,86 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.ai_engine import ai_engine
+from chatbot.knowledge_index import get_knowledge_index
+from chatbot.retrieval import bm25_available
+
+
+DEFAULT_QUERIES = Path(__file__).resolve().parents[2] / 'evaluation' / 'kb_queries.jsonl'
+
+# The engine answers from the knowledge base only above this score
+ANSWER_THRESHOLD = 0.2
+
+
+class Command(BaseCommand):
+    help = 'Compare heuristic and BM25 knowledge base retrieval on a labelled query file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries', default=str(DEFAULT_QUERIES),
+            help='JSON lines of {"query", "language", "expected"}; expected is the '
+                 'knowledge base question text, or null when nothing should match',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--show-misses', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive")
+
+        index = get_knowledge_index()
+        if not len(index):
+            raise CommandError("Knowledge base is empty - run populate_chatbot_knowledge first")
+
+        ids_by_question = {entry.question.strip().lower(): entry.id for entry in index.entries}
+        cases = []
+        with open(options['queries'], encoding='utf-8') as queries:
+            for line_number, line in enumerate(queries, 1):
+                if not line.strip():
+                    continue
+                case = json.loads(line)
+                expected = case.get('expected')
+                if expected is not None and expected.strip().lower() not in ids_by_question:
+                    raise CommandError(f"Line {line_number}: no knowledge base question {expected!r}")
+                cases.append((
+                    case['query'].lower().strip(),
+                    case.get('language', 'en'),
+                    ids_by_question[expected.strip().lower()] if expected is not None else None,
+                ))
+
+        scorers = [('heuristic', lambda query, language: ai_engine._heuristic_search(query, index, language))]
+        if bm25_available():
+            index.bm25()
+            scorers.append(('bm25', lambda query, language: ai_engine._bm25_search(query, index)))
+        else:
+            self.stdout.write(self.style.WARNING("numpy/scipy not installed - evaluating the heuristic scorer only"))
+
+        self.stdout.write(f"{len(cases)} queries, {len(index)} knowledge base entries")
+        self.stdout.write(f"{'scorer':<10} {'accuracy':>9} {'answered':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, search in scorers:
+            correct = answered = 0
+            samples = []
+            misses = []
+            for query, language, expected_id in cases:
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    match, score = search(query, language)
+                    samples.append((time.perf_counter() - start) * 1000)
+                found_id = match.id if match and score > ANSWER_THRESHOLD else None
+                answered += found_id is not None
+                if found_id == expected_id:
+                    correct += 1
+                else:
+                    misses.append((query, expected_id, found_id))
+
+            percentiles = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+            self.stdout.write(
+                f"{name:<10} {correct / len(cases):>9.1%} {answered:>9} "
+                f"{percentiles[49]:>8.3f} {percentiles[98]:>8.3f}"
+            )
+            if options['show_misses']:
+                for query, expected_id, found_id in misses:
+                    self.stdout.write(f"    {query!r}: expected {expected_id}, got {found_id}")
@@ -0,0 +1,137 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from chatbot.api_services import WEATHER_SOURCES, weather_service
+from chatbot.models import ProactiveAlert
+from chatbot.weather_cache import FETCH_DEADLINE, weather_cache
+
+
+# Alerts stay up this long after the last poll that saw the condition
+ALERT_LIFETIME = timedelta(hours=6)
+
+# (minimum wind km/h, title, ProactiveAlert priority) - same bands as the chat report
+WIND_ALERTS = [
+    (120, 'SUPER TYPHOON ALERT', 4),
+    (85, 'TYPHOON ALERT', 4),
+    (60, 'TROPICAL STORM', 3),
+]
+FORECAST_ALERT_PRIORITY = {'HIGH': 3, 'MODERATE': 2}
+
+
+class Command(BaseCommand):
+    help = 'Refresh weather snapshots for the chatbot and raise proactive alerts when thresholds are crossed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep polling every N seconds (default: poll once, e.g. from cron)',
+        )
+        parser.add_argument('--deadline', type=float, default=FETCH_DEADLINE, help='Seconds to wait for all sources')
+        parser.add_argument('--created-by', help='Username recorded on raised alerts (default: first superuser)')
+        parser.add_argument('--no-alerts', action='store_true', help='Only refresh snapshots')
+
+    def handle(self, *args, **options):
+        author = None
+        if not options['no_alerts']:
+            author = self._alert_author(options['created_by'])
+
+        while True:
+            self.poll(options['deadline'], author)
+            if not options['interval']:
+                break
+            close_old_connections()
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
+
+    def poll(self, deadline, author):
+        start = time.perf_counter()
+        results = weather_cache.refresh_many(WEATHER_SOURCES, deadline=deadline, persist=True)
+        snapshot = weather_service.get_weather_snapshot()
+        weather_cache.persist({'storm-risk': snapshot['storm_risk']})
+
+        raised = self.raise_alerts(snapshot, author) if author else []
+        style = self.style.SUCCESS if len(results) == len(WEATHER_SOURCES) else self.style.WARNING
+        self.stdout.write(style(
+            f"{timezone.now():%Y-%m-%d %H:%M:%S} polled {len(results)}/{len(WEATHER_SOURCES)} sources "
+            f"in {time.perf_counter() - start:.1f}s; {len(snapshot['storm_risk'])} storm risk(s), "
+            f"{len(raised)} alert(s) raised"
+        ))
+        for title in raised:
+            self.stdout.write(f"  {title}")
+
+    def raise_alerts(self, snapshot, author):
+        """Create or extend weather ProactiveAlerts; returns titles of new ones"""
+        raised = []
+        conditions = snapshot['samar_conditions']
+        basey = next((c for c in conditions if 'basey' in c['location'].lower()), None)
+        if basey is None and conditions:
+            basey = conditions[0]
+
+        if basey:
+            wind = basey['wind_speed_kmh']
+            for minimum, status, priority in WIND_ALERTS:
+                if wind > minimum:
+                    title = f"{status} - {basey['location']}"
+                    messages = {
+                        'en': f"{status}: {wind} km/h winds and {basey['weather_desc']} in {basey['location']}. "
+                              "Prepare for evacuation and monitor PAGASA updates.",
+                        'fil': f"{status}: {wind} km/h na hangin at {basey['weather_desc']} sa {basey['location']}. "
+                               "Mag-prepare sa evacuation at i-monitor ang PAGASA updates.",
+                    }
+                    if self._raise(title, messages, priority, author):
+                        raised.append(title)
+                    break
+
+        for storm in snapshot['storm_risk']:
+            priority = FORECAST_ALERT_PRIORITY.get(storm['risk_level'])
+            if priority is None:
+                continue
+            title = f"{storm['risk_level']} weather risk - {storm['date']}"
+            messages = {
+                'en': f"{storm['description']} expected {storm['date']}: up to {storm['max_wind']} km/h winds "
+                      f"({storm['source']}). Prepare your emergency kit.",
+                'fil': f"{storm['description']} inaasahan sa {storm['date']}: hanggang {storm['max_wind']} km/h "
+                       f"na hangin ({storm['source']}). Ihanda ang emergency kit.",
+            }
+            if self._raise(title, messages, priority, author):
+                raised.append(title)
+
+        return raised
+
+    def _raise(self, title, messages, priority, author):
+        """One alert per language; an alert already up is only extended"""
+        now = timezone.now()
+        expires_at = now + ALERT_LIFETIME
+        created = False
+        for language, message in messages.items():
+            updated = ProactiveAlert.objects.filter(
+                Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+                alert_type='weather', is_active=True, title=title, target_language=language,
+            ).update(message=message, priority=priority, expires_at=expires_at)
+            if not updated:
+                ProactiveAlert.objects.create(
+                    title=title, message=message, alert_type='weather', priority=priority,
+                    target_language=language, expires_at=expires_at, created_by=author,
+                )
+                created = True
+        return created
+
+    def _alert_author(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {username!r}")
+
+        author = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if author is None:
+            self.stdout.write(self.style.WARNING("No superuser to record on alerts - pass --created-by; alerts disabled"))
+        return author
@@ -0,0 +1,84 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from chatbot.models import ChatMessage, ChatSession
+from chatbot.retention import (
+    BATCH_SIZE, DEFAULT_RETENTION_DAYS, archive_messages, database_used_bytes, delete_empty_sessions,
+    end_idle_sessions, get_archive_dir,
+)
+from chatbot.rollup import rollup_chat_analytics
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = 'End idle chat sessions and archive/delete chat history past the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-minutes', type=int,
+            help='End active sessions idle this long (default: CHATBOT_CONTEXT_TTL)',
+        )
+        parser.add_argument(
+            '--days', type=int,
+            help=f'Keep this many days of messages (default: CHATBOT_HISTORY_RETENTION_DAYS or {DEFAULT_RETENTION_DAYS})',
+        )
+        parser.add_argument('--archive-dir', help='Where monthly archives go (default: CHATBOT_ARCHIVE_DIR)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per delete')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be done')
+
+    def handle(self, *args, **options):
+        idle_minutes = options['idle_minutes']
+        if idle_minutes is None:
+            idle_minutes = getattr(settings, 'CHATBOT_CONTEXT_TTL', 1800) // 60
+        days = options['days']
+        if days is None:
+            days = getattr(settings, 'CHATBOT_HISTORY_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+        if days < 1 or idle_minutes < 1 or options['batch_size'] < 1:
+            raise CommandError("--days, --idle-minutes and --batch-size must be positive")
+
+        now = timezone.now()
+        idle_before = now - timedelta(minutes=idle_minutes)
+        # Whole local days, so no day's rollup is left half archived
+        before = timezone.make_aware(
+            datetime.combine(timezone.localdate(now) - timedelta(days=days), time.min),
+            timezone.get_current_timezone(),
+        )
+        archive_dir = options['archive_dir'] or get_archive_dir()
+
+        if options['dry_run']:
+            idle = ChatSession.objects.filter(is_active=True, started_at__lt=idle_before).count()
+            old = ChatMessage.objects.filter(timestamp__lt=before).count()
+            self.stdout.write(
+                f"Would end up to {idle} idle session(s) and archive {old} message(s) "
+                f"from before {before:%Y-%m-%d} into {archive_dir}"
+            )
+            return
+
+        ended = end_idle_sessions(idle_before, options['batch_size'])
+        self.stdout.write(f"Ended {ended} session(s) idle for {idle_minutes}+ minutes")
+
+        # Roll the days up before their messages leave the database
+        rollup_chat_analytics()
+
+        used_before = database_used_bytes()
+        archived, written, files = archive_messages(before, archive_dir, options['batch_size'])
+        sessions = delete_empty_sessions(before, options['batch_size'])
+        used_after = database_used_bytes()
+
+        for path, count in sorted(files.items()):
+            self.stdout.write(f"  {path}: +{count} message(s)")
+        summary = (
+            f"Archived and deleted {archived} message(s) from before {before:%Y-%m-%d}, "
+            f"deleted {sessions} empty session(s); {_format_bytes(written)} of archives written"
+        )
+        if used_before is not None:
+            summary += f", {_format_bytes(used_before - used_after)} freed in the database (VACUUM returns it to the OS)"
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from chatbot.rollup import LOOKBACK, get_watermark, rollup_chat_analytics
+
+
+class Command(BaseCommand):
+    help = 'Roll chat sessions, messages and feedback up into daily ChatbotAnalytics rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute every day not yet archived instead of only those with activity since the last run',
+        )
+
+    def handle(self, *args, **options):
+        watermark = None if options['full'] else get_watermark()
+        rows = rollup_chat_analytics(full=options['full'])
+
+        if watermark:
+            scope = f"since {timezone.localtime(watermark - LOOKBACK):%Y-%m-%d %H:%M}"
+        else:
+            scope = "in the full chat history"
+        if not rows:
+            self.stdout.write(self.style.WARNING(f"No chat activity {scope}"))
+            return
+        days = ', '.join(row.date.isoformat() for row in rows)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {len(rows)} day(s) with activity {scope}: {days}"))
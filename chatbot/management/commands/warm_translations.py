@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.ai_engine import ai_engine
+from chatbot.api_services import translation_service
+from chatbot.models import ChatbotKnowledgeBase
+from chatbot.translation_memory import translation_memory
+
+
+class Command(BaseCommand):
+    help = 'Pre-translate knowledge base answers and canned chatbot replies into the translation memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language', choices=['en', 'fil'], action='append',
+            help='Target language to warm (repeatable; default: both)',
+        )
+
+    def handle(self, *args, **options):
+        if not translation_service.api_manager.get_api_config('google_translate'):
+            raise CommandError("No active google_translate API configuration - run setup_api_configs first")
+
+        # Each text is warmed into the other language
+        sources = {'en': [], 'fil': []}
+        for answer_en, answer_fil in ChatbotKnowledgeBase.objects.filter(is_active=True).values_list('answer_en', 'answer_fil'):
+            sources['en'].append(answer_en)
+            sources['fil'].append(answer_fil)
+        for language in sources:
+            sources[language] += ai_engine.fallback_responses[language]
+
+        for target in options['language'] or ['fil', 'en']:
+            texts = list(dict.fromkeys(sources['en' if target == 'fil' else 'fil']))
+            known = translation_memory.lookup(texts, target)
+            results = translation_service.translate_many(texts, target)
+            translated = sum(
+                1 for text, result in zip(texts, results) if text not in known and result != text
+            )
+            untranslated = len(texts) - len(known) - translated
+            style = self.style.SUCCESS if not untranslated else self.style.WARNING
+            self.stdout.write(style(
+                f"{target}: {len(texts)} texts - {len(known)} already remembered, "
+                f"{translated} translated, {untranslated} not translated"
+            ))
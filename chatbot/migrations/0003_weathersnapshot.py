@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_apiconfiguration_proactivealert_chatimageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='WeatherSource name, e.g. wttr-current:Basey,Samar,Philippines', max_length=150, unique=True)),
+                ('data', models.JSONField()),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['source'],
+            },
+        ),
+    ]
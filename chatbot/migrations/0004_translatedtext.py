@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:43
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0003_weathersnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslatedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 of target language and source text', max_length=64, unique=True)),
+                ('target_language', models.CharField(choices=[('en', 'English'), ('fil', 'Filipino')], max_length=10)),
+                ('source_text', models.TextField()),
+                ('translated_text', models.TextField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0004_translatedtext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatbotanalytics',
+            name='helpful_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatbotanalytics',
+            name='not_helpful_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatbotanalytics',
+            name='rolled_up_through',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='category',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['timestamp'], name='chatbot_cha_timesta_d01b0b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['started_at'], name='chatbot_cha_started_e57b54_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['ended_at'], name='chatbot_cha_ended_a_ee557f_idx'),
+        ),
+    ]
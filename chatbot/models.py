@@ -16,6 +16,10 @@ class ChatSession(models.Model):
     
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['started_at']),
+            models.Index(fields=['ended_at']),
+        ]
         
     def __str__(self):
         user_display = self.user.username if self.user else "Anonymous"
@@ -35,9 +39,13 @@ class ChatMessage(models.Model):
     content = models.TextField()
     timestamp = models.DateTimeField(default=timezone.now)
     is_helpful = models.BooleanField(null=True, blank=True)  # User feedback
+    category = models.CharField(max_length=20, blank=True)  # AI engine category of bot replies
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['timestamp']),
+        ]
         
     def __str__(self):
         return f"{self.get_message_type_display()}: {self.content[:50]}..."
@@ -82,6 +90,9 @@ class ChatbotAnalytics(models.Model):
     avg_session_length = models.FloatField(default=0.0)  # in minutes
     most_common_category = models.CharField(max_length=20, blank=True)
     satisfaction_rating = models.FloatField(default=0.0)  # 0-5 scale
+    helpful_count = models.IntegerField(default=0)
+    not_helpful_count = models.IntegerField(default=0)
+    rolled_up_through = models.DateTimeField(null=True, blank=True)  # Rollup watermark
     
     class Meta:
         unique_together = ['date']
@@ -170,21 +181,48 @@ class APIConfiguration(models.Model):
         return f"{self.get_provider_display()} - {'Active' if self.is_active else 'Inactive'}"
     
     def can_make_request(self):
-        """Check if we can make another API request"""
-        today = timezone.now().date()
-        if self.last_request_date != today:
-            self.requests_made_today = 0
-            self.last_request_date = today
-            self.save()
-        
-        return self.requests_made_today < self.rate_limit
+        """Check if we can make another API request (without using one)"""
+        from .rate_limit import get_rate_limit_store
+        return get_rate_limit_store().usage(self) < self.rate_limit
+    
+    def acquire_request(self):
+        """Atomically check the daily quota and count one request against it"""
+        from .rate_limit import get_rate_limit_store
+        return get_rate_limit_store().acquire(self)
     
     def increment_usage(self):
         """Increment the usage counter"""
-        today = timezone.now().date()
-        if self.last_request_date != today:
-            self.requests_made_today = 1
-            self.last_request_date = today
-        else:
-            self.requests_made_today += 1
-        self.save()
+        from .rate_limit import get_rate_limit_store
+        get_rate_limit_store().record(self)
+    
+    def requests_today(self):
+        """Requests counted today by the configured rate limit store"""
+        from .rate_limit import get_rate_limit_store
+        return get_rate_limit_store().usage(self)
+
+class WeatherSnapshot(models.Model):
+    """Latest normalized data from one weather source, written by poll_weather"""
+    source = models.CharField(max_length=150, unique=True, help_text="WeatherSource name, e.g. wttr-current:Basey,Samar,Philippines")
+    data = models.JSONField()
+    fetched_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['source']
+        
+    def __str__(self):
+        return f"{self.source} @ {self.fetched_at:%Y-%m-%d %H:%M}"
+
+
+class TranslatedText(models.Model):
+    """Translation memory: one upstream translation, reused for identical text"""
+    key = models.CharField(max_length=64, unique=True, help_text="SHA-256 of target language and source text")
+    target_language = models.CharField(max_length=10, choices=[('en', 'English'), ('fil', 'Filipino')])
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        
+    def __str__(self):
+        return f"[{self.target_language}] {self.source_text[:50]}"
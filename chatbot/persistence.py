@@ -0,0 +1,86 @@
+"""
+Chat persistence
+
+One chat turn used to cost a session lookup, an INSERT for the resident's
+message, up to two full ``session.save()`` calls and another INSERT for
+the reply. Here a turn is written once the reply is known:
+
+    session    one SELECT for an existing session, or one INSERT for a new
+               one (already in the requested language)
+    messages   the resident's message and the reply in a single
+               ``bulk_create``, in one transaction
+    language   an UPDATE of just ``language``, only when the resident
+               switched language mid-session
+
+The resident's message keeps the time it was received, so message order
+and response-time analytics are unchanged.
+"""
+
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChatMessage, ChatSession
+
+
+def get_or_start_session(session_id, user, language):
+    """The active session ``session_id``, or a new one for ``user``"""
+    session = None
+    if session_id:
+        session = ChatSession.objects.filter(session_id=session_id, is_active=True).first()
+    if session is None:
+        session = ChatSession.objects.create(
+            user=user,
+            session_id=str(uuid.uuid4()),
+            language=language
+        )
+    return session
+
+
+async def aget_or_start_session(session_id, user, language):
+    """Async get_or_start_session, for async views"""
+    session = None
+    if session_id:
+        session = await ChatSession.objects.filter(session_id=session_id, is_active=True).afirst()
+    if session is None:
+        session = await ChatSession.objects.acreate(
+            user=user,
+            session_id=str(uuid.uuid4()),
+            language=language
+        )
+    return session
+
+
+def record_turn(session, message, reply, language, received_at=None, category=''):
+    """
+    Save one exchange and return the bot's ChatMessage
+
+    Usage:
+        received_at = timezone.now()
+        response = ai_engine.process_message(message, language)
+        bot_message = record_turn(
+            session, message, response['response'], language, received_at, response['category']
+        )
+    """
+    user_message = ChatMessage(
+        session=session,
+        message_type='user',
+        content=message,
+        timestamp=received_at or timezone.now()
+    )
+    bot_message = ChatMessage(session=session, message_type='bot', content=reply, category=category)
+
+    # Joins the caller's transaction (ATOMIC_REQUESTS, tests) without a savepoint
+    with transaction.atomic(savepoint=False):
+        ChatMessage.objects.bulk_create([user_message, bot_message])
+
+        # The session always ends up in the language the resident chose
+        if session.language != language:
+            session.language = language
+            session.save(update_fields=['language'])
+
+    if bot_message.pk is None:
+        # Backends that cannot return ids from a bulk insert (MySQL)
+        bot_message.pk = session.messages.filter(message_type='bot').values_list('pk', flat=True).last()
+    return bot_message
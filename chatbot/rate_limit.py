@@ -0,0 +1,99 @@
+"""
+Per-provider request quotas for the chatbot's external APIs
+
+APIConfiguration.rate_limit is a daily quota (requests_made_today resets at
+midnight). It used to be enforced by reading the configuration row and
+save()-ing it back on every call, which costs two writes per request and
+loses counts when requests overlap. Both stores below count atomically:
+
+    cache   a counter per provider and day, bumped with cache.incr; no
+            database access. Use it with a cache shared by every worker
+            (Redis, Memcached) so all processes draw on one quota.
+    db      one conditional UPDATE ... SET requests_made_today = F() + 1,
+            the fallback for per-process caches such as LocMem.
+
+Select the store with the CHATBOT_RATE_LIMIT_STORE setting.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import APIConfiguration
+
+
+# Counters outlive their day a little so late readers still see them
+COUNTER_TIMEOUT = 2 * 24 * 60 * 60
+
+
+class CacheRateLimitStore:
+    """Daily request counters in the Django cache"""
+
+    key_prefix = 'chatbot:ratelimit'
+
+    def _key(self, config):
+        return f"{self.key_prefix}:{config.provider}:{timezone.localdate().isoformat()}"
+
+    def _incr(self, key):
+        # add() only creates a missing counter; incr() is atomic in every backend
+        cache.add(key, 0, COUNTER_TIMEOUT)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The counter expired between add() and incr()
+            cache.add(key, 0, COUNTER_TIMEOUT)
+            return cache.incr(key)
+
+    def acquire(self, config):
+        """Count one request if the quota allows it"""
+        key = self._key(config)
+        if self._incr(key) > config.rate_limit:
+            # Give the slot back; the counter never settles above the limit
+            cache.decr(key)
+            return False
+        return True
+
+    def record(self, config):
+        self._incr(self._key(config))
+
+    def usage(self, config):
+        return cache.get(self._key(config), 0)
+
+
+class DatabaseRateLimitStore:
+    """Daily request counters on the APIConfiguration row, updated with F()"""
+
+    def _increment(self, today):
+        return {
+            'requests_made_today': Case(
+                When(last_request_date=today, then=F('requests_made_today') + 1),
+                default=Value(1),
+            ),
+            'last_request_date': today,
+        }
+
+    def acquire(self, config):
+        """Count one request if the quota allows it"""
+        today = timezone.localdate()
+        # Check and increment in one UPDATE, so concurrent callers cannot overshoot
+        return bool(
+            APIConfiguration.objects.filter(pk=config.pk)
+            .filter(~Q(last_request_date=today) | Q(requests_made_today__lt=F('rate_limit')))
+            .update(**self._increment(today))
+        )
+
+    def record(self, config):
+        APIConfiguration.objects.filter(pk=config.pk).update(**self._increment(timezone.localdate()))
+
+    def usage(self, config):
+        return APIConfiguration.objects.filter(
+            pk=config.pk, last_request_date=timezone.localdate(),
+        ).values_list('requests_made_today', flat=True).first() or 0
+
+
+def get_rate_limit_store():
+    """The store selected by CHATBOT_RATE_LIMIT_STORE ('cache' or 'db')"""
+    if getattr(settings, 'CHATBOT_RATE_LIMIT_STORE', 'db') == 'cache':
+        return CacheRateLimitStore()
+    return DatabaseRateLimitStore()
@@ -0,0 +1,178 @@
+"""
+Cache of AI-generated chatbot replies
+
+OpenAI replies depend only on the message and the reply language (the
+system prompt is fixed), so residents asking the same thing in slightly
+different words can share one reply. Messages are reduced with
+``barangay_portal.text.normalize`` (case, punctuation, stopwords and
+Filipino/English affixes removed) and the reply is cached for
+CHATBOT_RESPONSE_CACHE_TTL seconds under that key.
+
+With CHATBOT_RESPONSE_CACHE_SIMILARITY above 0, a message with no exact
+entry may also reuse the reply of the most similar cached message (TF-IDF
+cosine over normalized terms) when the similarity reaches that threshold.
+The similarity index is per process; the replies live in the Django cache.
+
+Hits, near hits and misses are counted per day; ``stats()`` feeds the
+admin.
+"""
+
+import hashlib
+import math
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from barangay_portal.text import normalize
+
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_INDEX_SIZE = 1000
+STATS_TIMEOUT = 8 * 24 * 60 * 60
+OUTCOMES = ('hit', 'near_hit', 'miss')
+
+
+class SimilarityIndex:
+    """Bounded TF-IDF index of normalized messages with an inverted term list"""
+
+    def __init__(self, max_entries=DEFAULT_INDEX_SIZE):
+        self.max_entries = max_entries
+        self._terms = OrderedDict()
+        self._postings = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def add(self, normalized):
+        with self._lock:
+            if normalized in self._terms:
+                self._terms.move_to_end(normalized)
+                return
+            self._terms[normalized] = Counter(normalized.split())
+            for term in self._terms[normalized]:
+                self._postings[term].add(normalized)
+            while len(self._terms) > self.max_entries:
+                self._remove(next(iter(self._terms)))
+
+    def discard(self, normalized):
+        with self._lock:
+            if normalized in self._terms:
+                self._remove(normalized)
+
+    def _remove(self, normalized):
+        for term in self._terms.pop(normalized):
+            self._postings[term].discard(normalized)
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def _vector(self, counts, documents):
+        vector = {
+            term: count * (math.log((documents + 1) / (len(self._postings.get(term, ())) + 1)) + 1)
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return vector, norm
+
+    def nearest(self, normalized):
+        """(most similar indexed message, cosine similarity), or (None, 0.0)"""
+        query_terms = Counter(normalized.split())
+        with self._lock:
+            candidates = set().union(*(self._postings.get(term, ()) for term in query_terms))
+            if not candidates:
+                return None, 0.0
+            documents = len(self._terms)
+            query, query_norm = self._vector(query_terms, documents)
+            best, best_score = None, 0.0
+            for candidate in candidates:
+                vector, norm = self._vector(self._terms[candidate], documents)
+                dot = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+                score = dot / (query_norm * norm) if query_norm and norm else 0.0
+                if score > best_score:
+                    best, best_score = candidate, score
+            return best, best_score
+
+
+class ResponseCache:
+    """
+    Normalized-message cache of AI replies
+
+    Usage:
+        reply = response_cache.get(message, language)
+        if reply is None:
+            reply = ask_openai(message)
+            response_cache.set(message, language, reply)
+    """
+
+    key_prefix = 'chatbot:response'
+
+    def __init__(self):
+        self._indexes = defaultdict(SimilarityIndex)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'CHATBOT_RESPONSE_CACHE_TTL', DEFAULT_TTL)
+
+    @property
+    def similarity(self):
+        return getattr(settings, 'CHATBOT_RESPONSE_CACHE_SIMILARITY', 0.0)
+
+    def _key(self, normalized, language):
+        digest = hashlib.sha1(f"{language}\0{normalized}".encode('utf-8')).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def get(self, message, language):
+        normalized = normalize(message)
+        if not self.ttl or not normalized:
+            return None
+
+        reply = cache.get(self._key(normalized, language))
+        if reply is not None:
+            self._count('hit')
+            return reply
+
+        if self.similarity > 0:
+            index = self._indexes[language]
+            neighbour, score = index.nearest(normalized)
+            if neighbour is not None and score >= self.similarity:
+                reply = cache.get(self._key(neighbour, language))
+                if reply is not None:
+                    self._count('near_hit')
+                    return reply
+                # Expired in the cache; stop offering it
+                index.discard(neighbour)
+
+        self._count('miss')
+        return None
+
+    def set(self, message, language, reply):
+        normalized = normalize(message)
+        if not self.ttl or not normalized or not reply:
+            return
+        cache.set(self._key(normalized, language), reply, self.ttl)
+        if self.similarity > 0:
+            self._indexes[language].add(normalized)
+
+    def _stats_key(self, outcome, day=None):
+        return f"{self.key_prefix}:stats:{(day or timezone.localdate()).isoformat()}:{outcome}"
+
+    def _count(self, outcome):
+        key = self._stats_key(outcome)
+        cache.add(key, 0, STATS_TIMEOUT)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, STATS_TIMEOUT)
+
+    def stats(self, day=None):
+        """Counts and hit rate (exact and near hits) for one day, default today"""
+        keys = {outcome: self._stats_key(outcome, day) for outcome in OUTCOMES}
+        found = cache.get_many(list(keys.values()))
+        counts = {outcome: found.get(key, 0) for outcome, key in keys.items()}
+        lookups = sum(counts.values())
+        counts['lookups'] = lookups
+        counts['hit_rate'] = (counts['hit'] + counts['near_hit']) / lookups if lookups else 0.0
+        return counts
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,150 @@
+"""
+Retention for chat history
+
+Browsers rarely call end_session, so sessions stay active forever and
+ChatSession/ChatMessage grow without bound. ``manage.py prune_chat_history``
+runs the steps below:
+
+    end idle     active sessions with no message for the idle period are
+                 ended, with ended_at set to their last activity
+    archive      messages older than the retention period are appended to
+                 gzip-compressed JSON Lines files, one per month
+                 (<archive dir>/chat-YYYY-MM.jsonl.gz), then deleted
+    prune        ended sessions past retention with no messages or uploads
+                 left are deleted
+
+Rows are handled in primary-key batches, each deleted in its own short
+transaction, so the tables are never locked for long. An archive batch is
+flushed to disk before its rows are deleted; a run interrupted in between
+may archive a few messages twice (records carry the message id).
+"""
+
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ChatMessage, ChatSession
+
+
+BATCH_SIZE = 1000
+DEFAULT_RETENTION_DAYS = 180
+
+
+def get_archive_dir():
+    return Path(getattr(settings, 'CHATBOT_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'chat'))
+
+
+def _last_activity():
+    last_message = ChatMessage.objects.filter(session=OuterRef('pk')).order_by('-timestamp').values('timestamp')[:1]
+    return Coalesce(Subquery(last_message), F('started_at'))
+
+
+def end_idle_sessions(idle_before, batch_size=BATCH_SIZE):
+    """End active sessions with no activity since ``idle_before``; returns how many"""
+    idle = (
+        ChatSession.objects.filter(is_active=True, started_at__lt=idle_before)
+        .annotate(last_activity=_last_activity())
+        .filter(last_activity__lt=idle_before)
+    )
+    ended = 0
+    while True:
+        batch = list(idle.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return ended
+        ended += ChatSession.objects.filter(pk__in=batch).update(is_active=False, ended_at=_last_activity())
+
+
+def _archive_record(row):
+    return {
+        'id': row['pk'],
+        'session_id': row['session__session_id'],
+        'user_id': row['session__user_id'],
+        'language': row['session__language'],
+        'message_type': row['message_type'],
+        'category': row['category'],
+        'content': row['content'],
+        'timestamp': row['timestamp'].isoformat(),
+        'is_helpful': row['is_helpful'],
+    }
+
+
+def _append(path, lines):
+    """Append one gzip member to ``path`` and sync it; returns compressed bytes written"""
+    size = path.stat().st_size if path.exists() else 0
+    with open(path, 'ab') as archive:
+        with gzip.GzipFile(fileobj=archive, mode='wb') as member:
+            member.write(''.join(lines).encode('utf-8'))
+        archive.flush()
+        os.fsync(archive.fileno())
+    return path.stat().st_size - size
+
+
+def archive_messages(before, archive_dir=None, batch_size=BATCH_SIZE):
+    """
+    Move messages older than ``before`` into monthly archives
+
+    Returns (messages archived, compressed bytes written, {archive path: messages}).
+    """
+    archive_dir = Path(archive_dir or get_archive_dir())
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    old = ChatMessage.objects.filter(timestamp__lt=before).order_by('pk').values(
+        'pk', 'session__session_id', 'session__user_id', 'session__language',
+        'message_type', 'category', 'content', 'timestamp', 'is_helpful',
+    )
+
+    archived, written, files = 0, 0, {}
+    last_pk = 0
+    while True:
+        batch = list(old.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return archived, written, files
+
+        months = {}
+        for row in batch:
+            month = timezone.localtime(row['timestamp']).strftime('%Y-%m')
+            months.setdefault(month, []).append(json.dumps(_archive_record(row), ensure_ascii=False) + '\n')
+        for month, lines in months.items():
+            path = archive_dir / f'chat-{month}.jsonl.gz'
+            written += _append(path, lines)
+            files[path] = files.get(path, 0) + len(lines)
+
+        ids = [row['pk'] for row in batch]
+        with transaction.atomic():
+            ChatMessage.objects.filter(pk__in=ids).delete()
+        archived += len(ids)
+        last_pk = ids[-1]
+
+
+def delete_empty_sessions(before, batch_size=BATCH_SIZE):
+    """Delete ended sessions started before ``before`` with nothing left in them"""
+    empty = ChatSession.objects.filter(
+        is_active=False, started_at__lt=before, messages__isnull=True, uploaded_images__isnull=True,
+    )
+    deleted = 0
+    while True:
+        batch = list(empty.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        with transaction.atomic():
+            deleted += ChatSession.objects.filter(pk__in=batch).delete()[1].get(ChatSession._meta.label, 0)
+
+
+def database_used_bytes():
+    """Bytes of live data in the database file (SQLite only; None elsewhere)"""
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA page_size')
+        page_size = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+        cursor.execute('PRAGMA freelist_count')
+        free_pages = cursor.fetchone()[0]
+    return (page_count - free_pages) * page_size
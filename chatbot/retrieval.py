@@ -0,0 +1,129 @@
+"""
+Sparse BM25 retrieval over the chatbot knowledge base
+
+An alternative to the heuristic three-pass scorer in ``BarangayAIEngine``,
+selected with ``CHATBOT_RETRIEVAL = 'bm25'``. Every entry's question,
+keywords and both answers are tokenized and stemmed with
+``barangay_portal.text`` into one row of a sparse document-term matrix
+holding precomputed BM25 weights, so a query is a single sparse mat-vec
+product followed by a top-k selection.
+
+Requires NumPy and SciPy. When they are not installed ``bm25_available()``
+is False and the engine keeps using the heuristic scorer.
+"""
+
+import math
+from collections import Counter
+
+from django.core.exceptions import ImproperlyConfigured
+
+from barangay_portal.text import stem, tokenize
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+
+# Term-frequency multiplier per field (a simple BM25F)
+FIELD_WEIGHTS = (
+    ('question', 3.0),
+    ('keywords', 3.0),
+    ('answer_en', 1.0),
+    ('answer_fil', 1.0),
+)
+K1 = 1.2
+B = 0.75
+
+
+def bm25_available():
+    return np is not None
+
+
+def analyze(text):
+    """Stemmed, stopword-free terms of a text"""
+    return [stem(token) for token in tokenize(text)]
+
+
+def _field_text(entry, field):
+    value = getattr(entry, field)
+    # KnowledgeEntry keeps keywords pre-split
+    return ', '.join(value) if isinstance(value, list) else value
+
+
+class BM25Retriever:
+    """
+    BM25 document-term matrix over knowledge base entries
+
+    Usage:
+        retriever = BM25Retriever(index.entries)
+        for entry, confidence in retriever.search('magkano ang clearance'):
+            ...
+
+    ``confidence`` is the BM25 score divided by the best score any entry
+    could reach for the query, so it is comparable to the 0-1 scale of the
+    heuristic scorer.
+    """
+
+    def __init__(self, entries, k1=K1, b=B):
+        if not bm25_available():
+            raise ImproperlyConfigured("BM25 retrieval requires numpy and scipy")
+
+        self.entries = list(entries)
+        self.k1 = k1
+        self.vocabulary = {}
+        rows, cols, frequencies, lengths = [], [], [], []
+        for row, entry in enumerate(self.entries):
+            counts = Counter()
+            for field, weight in FIELD_WEIGHTS:
+                for term in analyze(_field_text(entry, field)):
+                    counts[term] += weight
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                frequencies.append(frequency)
+
+        documents = len(self.entries)
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        frequencies = np.array(frequencies, dtype=np.float64)
+        lengths = np.array(lengths, dtype=np.float64)
+        average_length = lengths.mean() if documents else 1.0
+
+        document_frequency = np.bincount(cols, minlength=len(self.vocabulary))
+        self.idf = np.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+        self.unseen_idf = math.log(1 + (documents + 0.5) / 0.5)
+
+        length_norm = k1 * (1 - b + b * lengths[rows] / (average_length or 1.0))
+        weights = self.idf[cols] * frequencies * (k1 + 1) / (frequencies + length_norm)
+        # Column-major so a query only reads the columns of its own terms
+        self.matrix = sparse.csc_matrix((weights, (rows, cols)), shape=(documents, len(self.vocabulary)))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, text, k=5):
+        """Best ``k`` (entry, confidence) pairs for a query, best first"""
+        terms = set(analyze(text))
+        columns = [self.vocabulary[term] for term in terms if term in self.vocabulary]
+        if not columns or not self.entries:
+            return []
+
+        # Each term contributes at most idf * (k1 + 1); unknown terms count
+        # against the query with the idf of a term no entry uses
+        ideal = (self.k1 + 1) * (
+            float(self.idf[columns].sum()) + self.unseen_idf * (len(terms) - len(columns))
+        )
+        query = sparse.csc_matrix(
+            (np.ones(len(columns)), (columns, np.zeros(len(columns), dtype=np.int64))),
+            shape=(len(self.vocabulary), 1),
+        )
+        scores = (self.matrix @ query).toarray().ravel()
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Highest score first; ties go to the earlier (higher priority) entry
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(self.entries[i], float(scores[i]) / ideal) for i in top if scores[i] > 0]
@@ -0,0 +1,163 @@
+"""
+Incremental daily rollup of chatbot usage into ChatbotAnalytics
+
+Only days with chat activity since the last run are recomputed:
+
+    watermark   the newest ``rolled_up_through`` on ChatbotAnalytics; rows
+                are looked up from LOOKBACK before it, so late feedback
+                (``is_helpful``) and turns stamped just before the previous
+                run are picked up
+    touched     calendar days of messages, started sessions and ended
+                sessions newer than that point
+    rollup      per-day grouped SQL over those days only: sessions, average
+                session length, messages, helpful/not helpful votes and the
+                most common reply category
+    upsert      one INSERT ... ON CONFLICT (date) DO UPDATE for all of them
+
+Days before the oldest message still in the database are never
+recomputed: prune_chat_history rolls them up, then archives their messages
+and empty sessions, so their rows are final and a recount would erase them.
+
+Run it with ``manage.py rollup_chatbot_analytics`` (cron, every few
+minutes is fine); ``--full`` rebuilds every day.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ChatbotAnalytics, ChatMessage, ChatSession
+
+
+LOOKBACK = timedelta(days=2)
+ROLLUP_FIELDS = [
+    'total_sessions', 'total_messages', 'avg_session_length', 'most_common_category',
+    'satisfaction_rating', 'helpful_count', 'not_helpful_count', 'rolled_up_through',
+]
+
+
+def get_watermark():
+    """When the last rollup ran, or None before the first one"""
+    return ChatbotAnalytics.objects.aggregate(watermark=Max('rolled_up_through'))['watermark']
+
+
+def _days(queryset, field):
+    return set(queryset.annotate(day=TruncDate(field)).order_by().values_list('day', flat=True).distinct())
+
+
+def touched_days(since=None):
+    """Local dates whose rollup is affected by rows newer than ``since`` (all dates when None)"""
+    messages = ChatMessage.objects.all()
+    started = ChatSession.objects.all()
+    ended = ChatSession.objects.none()
+    if since is not None:
+        messages = messages.filter(timestamp__gte=since)
+        started = started.filter(started_at__gte=since)
+        # Ending a session changes the average length of the day it started
+        ended = ChatSession.objects.filter(ended_at__gte=since)
+    return _days(messages, 'timestamp') | _days(started, 'started_at') | _days(ended, 'started_at')
+
+
+def history_floor(now=None):
+    """
+    First local date whose chat rows are all still in the database
+
+    prune_chat_history archives whole days, oldest first, so every day
+    before the oldest remaining message may have lost rows.
+    """
+    oldest = ChatMessage.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+    return timezone.localdate(oldest or now or timezone.now())
+
+
+def _day_range(days):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(min(days), time.min), tz)
+    end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def compute_rollups(days, now=None):
+    """Unsaved ChatbotAnalytics rows for ``days``"""
+    now = now or timezone.now()
+    start, end = _day_range(days)
+
+    messages = (
+        ChatMessage.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(day=TruncDate('timestamp'))
+        .order_by()
+    )
+    message_stats = {
+        row['day']: row for row in messages.values('day').annotate(
+            total=Count('id'),
+            helpful=Count('id', filter=Q(is_helpful=True)),
+            not_helpful=Count('id', filter=Q(is_helpful=False)),
+        )
+    }
+    categories = defaultdict(Counter)
+    for row in messages.filter(message_type='bot').exclude(category='').values('day', 'category').annotate(count=Count('id')):
+        categories[row['day']][row['category']] = row['count']
+
+    # A session lasts until it was ended, or else until its last message
+    last_message = ChatMessage.objects.filter(session=OuterRef('pk')).order_by('-timestamp').values('timestamp')[:1]
+    session_stats = {
+        row['day']: row for row in (
+            ChatSession.objects.filter(started_at__gte=start, started_at__lt=end)
+            .annotate(day=TruncDate('started_at'), finished_at=Coalesce('ended_at', Subquery(last_message)))
+            .order_by()
+            .values('day')
+            .annotate(
+                total=Count('id'),
+                avg_length=Avg(ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField())),
+            )
+        )
+    }
+
+    rows = []
+    for day in sorted(days):
+        message_row = message_stats.get(day, {})
+        session_row = session_stats.get(day, {})
+        helpful = message_row.get('helpful', 0)
+        not_helpful = message_row.get('not_helpful', 0)
+        votes = helpful + not_helpful
+        avg_length = session_row.get('avg_length')
+        most_common = categories[day].most_common(1)
+        rows.append(ChatbotAnalytics(
+            date=day,
+            total_sessions=session_row.get('total', 0),
+            total_messages=message_row.get('total', 0),
+            avg_session_length=round(avg_length.total_seconds() / 60, 2) if avg_length else 0.0,
+            most_common_category=most_common[0][0] if most_common else '',
+            # Share of helpful votes on the 0-5 scale
+            satisfaction_rating=round(5 * helpful / votes, 2) if votes else 0.0,
+            helpful_count=helpful,
+            not_helpful_count=not_helpful,
+            rolled_up_through=now,
+        ))
+    return rows
+
+
+def rollup_chat_analytics(full=False, now=None):
+    """
+    Recompute and upsert the days touched since the watermark; returns the rows
+
+    Days before history_floor() (archived history) keep their rows.
+
+    Usage:
+        rows = rollup_chat_analytics()           # incremental
+        rows = rollup_chat_analytics(full=True)  # every day
+    """
+    now = now or timezone.now()
+    watermark = None if full else get_watermark()
+    floor = history_floor(now)
+    days = {day for day in touched_days(watermark - LOOKBACK if watermark else None) if day >= floor}
+    if not days:
+        return []
+
+    rows = compute_rollups(days, now)
+    ChatbotAnalytics.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['date'], update_fields=ROLLUP_FIELDS,
+    )
+    return rows
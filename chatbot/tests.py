@@ -0,0 +1,844 @@
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.testing import NoLoginHistoryMixin
+from barangay_portal.performance import invalidate_tags
+from .ai_engine import BarangayAIEngine
+from .context import CacheContextStore, MemoryContextStore, get_context_store
+from .knowledge_index import KNOWLEDGE_BASE_TAG, SubstringIndex, get_knowledge_index
+from .models import (
+    APIConfiguration, ChatbotAnalytics, ChatbotKnowledgeBase, ChatImageUpload, ChatMessage, ChatSession, ProactiveAlert, TranslatedText, WeatherSnapshot,
+)
+from .http_client import CircuitOpenError, HTTPClient, http_client
+from .rate_limit import CacheRateLimitStore, DatabaseRateLimitStore
+from .response_cache import ResponseCache, SimilarityIndex
+from .retrieval import bm25_available
+from .rollup import get_watermark, rollup_chat_analytics
+from .translation_memory import translation_memory
+from .api_services import (
+    SAMAR_LOCATIONS, WEATHER_SOURCES, APIServiceManager, SmartResponseService, TranslationService, WeatherService,
+    smart_response_service,
+)
+from .weather_cache import weather_cache, wttr_current
+
+
+class KnowledgeIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clearance = ChatbotKnowledgeBase.objects.create(
+            category='documents', question='How much is a barangay clearance?',
+            answer_en='A barangay clearance costs 50 pesos.', answer_fil='Ang barangay clearance ay 50 piso.',
+            keywords='clearance, bayad, fee', priority=10,
+        )
+        cls.hours = ChatbotKnowledgeBase.objects.create(
+            category='hours', question='What are the office hours?',
+            answer_en='The office is open 8AM-5PM.', answer_fil='Bukas ang opisina 8AM-5PM.',
+            keywords='office hours, oras, schedule', priority=9,
+        )
+
+    def setUp(self):
+        # The index lives for the whole process; start every test from the DB
+        invalidate_tags(KNOWLEDGE_BASE_TAG)
+        self.engine = BarangayAIEngine()
+
+    def search(self, message, language='en'):
+        return self.engine._search_knowledge_base(message, language).get('kb_item_id')
+
+    def test_matches_questions_keywords_and_substrings(self):
+        self.assertEqual(self.search('how much is clearance'), self.clearance.id)
+        self.assertEqual(self.search('ano ang schedule'), self.hours.id)
+        # 'fees' contains the keyword 'fee'
+        self.assertEqual(self.search('fees'), self.clearance.id)
+
+    def test_no_shared_term_no_match(self):
+        self.engine.conversation_context['s'] = {'last_category': 'documents'}
+        self.assertEqual(self.engine._search_knowledge_base('xyz', 'en', 's'), {'confidence': 0})
+
+    def test_built_once_and_rebuilt_on_change(self):
+        self.search('office hours')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('office hours'), self.hours.id)
+
+        self.hours.keywords = 'office hours, oras, schedule, tanggapan'
+        self.hours.save()
+        self.assertEqual(self.search('tanggapan'), self.hours.id)
+
+        hours_id = self.hours.id
+        self.hours.delete()
+        self.assertNotEqual(self.search('office hours'), hours_id)
+        self.assertEqual(len(get_knowledge_index()), 1)
+
+    def test_evaluation_rejects_zero_repeats(self):
+        with self.assertRaisesMessage(CommandError, '--repeat must be positive'):
+            call_command('evaluate_chatbot_retrieval', '--repeat', '0')
+
+    def test_substring_index(self):
+        index = SubstringIndex(['clearance', 'fee', 'id', 'office hours'])
+        self.assertEqual(sorted(index.containing('clear')), [0])
+        self.assertEqual(sorted(index.containing('ee')), [1])
+        self.assertEqual(sorted(index.within('what fees for my id')), [1, 2])
+        self.assertEqual(sorted(index.within('our office hours')), [3])
+
+
+class ConversationContextTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ChatbotKnowledgeBase.objects.create(
+            category='documents', question='How much is a barangay clearance?',
+            answer_en='A barangay clearance costs 50 pesos.', answer_fil='Ang barangay clearance ay 50 piso.',
+            keywords='clearance, bayad, fee', priority=10,
+        )
+
+    def setUp(self):
+        invalidate_tags(KNOWLEDGE_BASE_TAG)
+
+    def test_context_carries_across_messages(self):
+        engine = BarangayAIEngine()
+        engine.process_message('hello', session_id='s1')
+        engine.process_message('how much is clearance', session_id='s1')
+        context = engine.conversation_context['s1']
+        self.assertEqual(context['message_count'], 2)
+        self.assertEqual(context['last_category'], 'documents')
+        self.assertEqual(context['topics_discussed'], ['documents'])
+
+    @override_settings(CHATBOT_CONTEXT_STORE='cache')
+    def test_cache_store(self):
+        engine = BarangayAIEngine()
+        self.assertIsInstance(engine.conversation_context, CacheContextStore)
+        engine.process_message('how much is clearance', session_id='s2')
+        # A second engine (another worker) sees the same context
+        self.assertEqual(BarangayAIEngine().conversation_context['s2']['last_category'], 'documents')
+        del engine.conversation_context['s2']
+
+
+class MemoryContextStoreTests(SimpleTestCase):
+
+    def test_least_recently_used_session_is_evicted(self):
+        store = MemoryContextStore(max_sessions=2)
+        store['a'] = {'n': 1}
+        store['b'] = {'n': 2}
+        store.get('a')
+        store['c'] = {'n': 3}
+        self.assertNotIn('b', store)
+        self.assertEqual(store['a'], {'n': 1})
+        self.assertEqual(len(store), 2)
+
+    def test_idle_sessions_expire(self):
+        store = MemoryContextStore(ttl=60)
+        with mock.patch('chatbot.context.time.monotonic', return_value=1000):
+            store['a'] = {}
+        with mock.patch('chatbot.context.time.monotonic', return_value=1059):
+            self.assertIn('a', store)
+        with mock.patch('chatbot.context.time.monotonic', return_value=1200):
+            self.assertIsNone(store.get('a'))
+            self.assertEqual(len(store), 0)
+
+    @override_settings(CHATBOT_CONTEXT_STORE='memory', CHATBOT_CONTEXT_MAX_SESSIONS=5)
+    def test_store_from_settings(self):
+        self.assertEqual(get_context_store().max_sessions, 5)
+
+
+@skipUnless(bm25_available(), 'numpy/scipy not installed')
+class BM25RetrievalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clearance = ChatbotKnowledgeBase.objects.create(
+            category='documents', question='What documents are required for barangay clearance?',
+            answer_en='Bring a valid ID and 50 pesos.', answer_fil='Magdala ng valid ID at 50 piso.',
+            keywords='clearance requirements, kailangan', priority=10,
+        )
+        cls.password = ChatbotKnowledgeBase.objects.create(
+            category='navigation', question='I forgot my password, what should I do?',
+            answer_en='Use the password reset link.', answer_fil='Gamitin ang password reset link.',
+            keywords='forgot password, nakalimutan', priority=8,
+        )
+
+    def setUp(self):
+        invalidate_tags(KNOWLEDGE_BASE_TAG)
+
+    def test_ranks_matching_entry_first(self):
+        results = get_knowledge_index().bm25().search('nakalimutan ko ang password')
+        self.assertEqual(results[0][0].id, self.password.id)
+        self.assertTrue(0 < results[0][1] <= 1)
+        self.assertEqual(get_knowledge_index().bm25().search('zzzz'), [])
+
+    @override_settings(CHATBOT_RETRIEVAL='bm25')
+    def test_selected_by_setting(self):
+        engine = BarangayAIEngine()
+        with mock.patch.object(engine, '_heuristic_search') as heuristic:
+            result = engine._search_knowledge_base('clearance requirements', 'en')
+        heuristic.assert_not_called()
+        self.assertEqual(result['kb_item_id'], self.clearance.id)
+
+    @override_settings(CHATBOT_RETRIEVAL='bm25')
+    def test_falls_back_without_numpy(self):
+        engine = BarangayAIEngine()
+        with mock.patch('chatbot.ai_engine.bm25_available', return_value=False):
+            self.assertEqual(engine._retrieval_mode(), 'heuristic')
+
+
+def wttr_payload(description='Partly cloudy', wind_kmh=10):
+    return {
+        'current_condition': [{
+            'weatherDesc': [{'value': description}], 'windspeedKmph': str(wind_kmh),
+            'winddirDegree': '90', 'temp_C': '28', 'humidity': '80',
+            'pressure': '1008', 'visibility': '10',
+        }],
+        'weather': [{
+            'date': '2026-10-18', 'maxtempC': '31', 'mintempC': '24',
+            'hourly': [{'windspeedKmph': str(wind_kmh), 'weatherDesc': [{'value': description}]}],
+        }],
+    }
+
+
+class StubWeatherServer:
+    """
+    Local HTTP server standing in for wttr.in / OpenWeatherMap
+
+    ``routes`` maps a request path (query string ignored) to
+    ``(status, payload)``; ``default`` answers every other path. Each
+    response is delayed by ``delays[path]`` or ``delay`` seconds.
+    """
+
+    def __init__(self, routes=None, default=(200, None), delay=0, delays=None):
+        self.routes = dict(routes or {})
+        self.default = default
+        self.delay = delay
+        self.delays = dict(delays or {})
+        self.hits = Counter()
+        stub = self
+
+        self.ports = set()
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real APIs
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                stub.hits[path] += 1
+                stub.ports.add(self.client_address[1])
+                time.sleep(stub.delays.get(path, stub.delay))
+                status, payload = stub.routes.get(path, stub.default)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_POST = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.settings = override_settings(CHATBOT_WEATHER_BASE_URLS={'wttr': self.url, 'openweather': self.url})
+        self.settings.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        # Background refreshes read the base URL setting; let them finish first
+        weather_cache.wait()
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WeatherCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        http_client.reset()
+        self.source = wttr_current('Basey,Samar,Philippines')
+
+    def test_read_only_uses_cache_and_refreshes_in_background(self):
+        with StubWeatherServer(default=(200, wttr_payload('Sunny'))) as stub:
+            self.assertIsNone(weather_cache.read(self.source))
+            weather_cache.wait()
+            self.assertEqual(weather_cache.read(self.source)['weather_desc'], 'Sunny')
+            weather_cache.read(self.source)
+            self.assertEqual(stub.hits['/Basey,Samar,Philippines'], 1)
+
+    def test_stale_data_served_while_revalidating(self):
+        with StubWeatherServer(default=(200, wttr_payload('Sunny'))) as stub:
+            weather_cache.refresh(self.source)
+            key = weather_cache._key(self.source)
+            entry = cache.get(key)
+            entry['fetched_at'] -= self.source.ttl + 1
+            cache.set(key, entry)
+
+            stub.default = (200, wttr_payload('Thunderstorm'))
+            self.assertEqual(weather_cache.read(self.source)['weather_desc'], 'Sunny')
+            weather_cache.wait()
+            self.assertEqual(weather_cache.read(self.source)['weather_desc'], 'Thunderstorm')
+
+    def test_failing_source_is_negatively_cached(self):
+        with StubWeatherServer(default=(500, {})) as stub:
+            with self.assertLogs('chatbot.weather_cache', 'ERROR'):
+                self.assertIsNone(weather_cache.refresh(self.source))
+            self.assertIsNone(weather_cache.read(self.source))
+            weather_cache.wait()
+            self.assertIsNone(weather_cache.refresh(self.source))
+            # One attempt plus one retry, then nothing until failure_ttl passes
+            self.assertEqual(stub.hits['/Basey,Samar,Philippines'], 2)
+
+    def test_typhoon_report_never_waits_on_sources(self):
+        with StubWeatherServer(default=(200, wttr_payload('Heavy rain', wind_kmh=100)), delay=0.5):
+            start = time.perf_counter()
+            cold = WeatherService()._get_real_typhoon_status('en')
+            self.assertLess(time.perf_counter() - start, 0.25)
+            self.assertNotIn('TYPHOON ALERT', cold[0]['message'])
+
+            weather_cache.refresh_many([location['source'] for location in SAMAR_LOCATIONS])
+            warm = WeatherService()._get_real_typhoon_status('en')
+            self.assertIn('TYPHOON ALERT', warm[0]['message'])
+            self.assertEqual(warm[0]['priority'], 4)
+
+    def test_refresh_many_fetches_in_parallel(self):
+        sources = [wttr_current(place) for place in ('Basey', 'Cebu', 'Iloilo')]
+        with StubWeatherServer(default=(200, wttr_payload()), delay=0.3):
+            start = time.perf_counter()
+            results = weather_cache.refresh_many(sources, deadline=5)
+            # One timeout's worth of waiting, not three
+            self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(set(results), {source.name for source in sources})
+
+    def test_refresh_many_returns_what_arrived_by_deadline(self):
+        fast, slow = wttr_current('Basey'), wttr_current('Cebu')
+        with StubWeatherServer(default=(200, wttr_payload()), delays={'/Cebu': 1}):
+            start = time.perf_counter()
+            with self.assertLogs('chatbot.weather_cache', 'WARNING'):
+                results = weather_cache.refresh_many([fast, slow], deadline=0.3)
+            self.assertLess(time.perf_counter() - start, 0.6)
+            self.assertEqual(list(results), [fast.name])
+
+            # The late fetch still lands in the cache for the next read
+            weather_cache.wait()
+            self.assertIsNotNone(cache.get(weather_cache._key(slow)))
+
+    @override_settings(CHATBOT_WEATHER_REFRESH_ON_READ=False)
+    def test_reads_snapshots_persisted_by_another_process(self):
+        with StubWeatherServer(default=(200, wttr_payload('Sunny'))) as stub:
+            self.assertIsNone(weather_cache.read(self.source))
+            WeatherSnapshot.objects.create(
+                source=self.source.name, data={'weather_desc': 'Overcast'}, fetched_at=timezone.now(),
+            )
+            self.assertEqual(weather_cache.read(self.source)['weather_desc'], 'Overcast')
+            with self.assertNumQueries(0):
+                weather_cache.read(self.source)
+        self.assertEqual(sum(stub.hits.values()), 0)
+
+
+class PollWeatherCommandTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def poll(self):
+        call_command('poll_weather', stdout=io.StringIO())
+
+    def test_persists_snapshots_and_raises_alerts_once(self):
+        with StubWeatherServer(default=(200, wttr_payload('Heavy rain', wind_kmh=100))):
+            self.poll()
+            self.poll()
+
+        sources = set(WeatherSnapshot.objects.values_list('source', flat=True))
+        self.assertEqual(sources, {source.name for source in WEATHER_SOURCES} | {'storm-risk'})
+        alerts = ProactiveAlert.objects.filter(title='TYPHOON ALERT - Basey, Samar')
+        self.assertEqual(sorted(alerts.values_list('target_language', flat=True)), ['en', 'fil'])
+        self.assertEqual(alerts[0].created_by, self.admin)
+        self.assertTrue(ProactiveAlert.objects.filter(title__startswith='HIGH weather risk').exists())
+
+        response = self.client.get(reverse('chatbot:get_alerts_api'), {'language': 'fil'})
+        self.assertIn('TYPHOON ALERT - Basey, Samar', [alert['title'] for alert in response.json()['alerts']])
+
+    def test_calm_weather_raises_nothing(self):
+        with StubWeatherServer(default=(200, wttr_payload('Sunny', wind_kmh=15))):
+            self.poll()
+        self.assertFalse(ProactiveAlert.objects.exists())
+
+
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        invalidate_tags('chatbot.APIConfiguration')
+        self.config = APIConfiguration.objects.create(provider='openai', api_key='key', rate_limit=300)
+
+    def hammer(self, function, threads=16, calls=50):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return list(pool.map(lambda _: function(self.config), range(threads * calls)))
+
+    def test_cache_store_counts_exactly_under_threads(self):
+        store = CacheRateLimitStore()
+        with self.assertNumQueries(0):
+            granted = self.hammer(store.acquire)
+        self.assertEqual(granted.count(True), 300)
+        self.assertEqual(store.usage(self.config), 300)
+
+        self.config.provider = 'openweather'
+        self.hammer(store.record)
+        self.assertEqual(store.usage(self.config), 800)
+
+    def test_database_store_enforces_quota_in_one_update(self):
+        store = DatabaseRateLimitStore()
+        self.config.rate_limit = 2
+        self.config.save()
+        with self.assertNumQueries(3):
+            self.assertEqual([store.acquire(self.config) for _ in range(3)], [True, True, False])
+        self.assertEqual(store.usage(self.config), 2)
+
+        # A new day starts the count again
+        APIConfiguration.objects.filter(pk=self.config.pk).update(
+            last_request_date=timezone.localdate() - timedelta(days=1),
+        )
+        self.assertTrue(store.acquire(self.config))
+        self.assertEqual(store.usage(self.config), 1)
+
+    def test_config_lookup_is_cached_until_saved(self):
+        manager = APIServiceManager()
+        self.assertEqual(manager.get_api_config('openai'), self.config)
+        self.assertIsNone(manager.get_api_config('google_translate'))
+        with self.assertNumQueries(0):
+            manager.get_api_config('openai')
+            # Missing configurations are cached too
+            self.assertIsNone(manager.get_api_config('google_translate'))
+
+        self.config.is_active = False
+        self.config.save()
+        self.assertIsNone(manager.get_api_config('openai'))
+
+
+class HTTPClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = HTTPClient(backoff=0, failure_threshold=2, reset_timeout=60)
+
+    def test_reuses_connections(self):
+        with StubWeatherServer(default=(200, {'ok': True})) as stub:
+            for _ in range(3):
+                self.assertEqual(self.client.get(f"{stub.url}/a", provider='stub').json(), {'ok': True})
+        self.assertEqual(len(stub.ports), 1)
+        self.assertEqual(self.client.stats()['stub']['requests'], 3)
+
+    def test_retries_server_errors(self):
+        with StubWeatherServer(default=(503, {})) as stub:
+            response = self.client.get(f"{stub.url}/a", provider='stub', retries=2)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(stub.hits['/a'], 3)
+            # POST is not retried unless asked
+            self.client.request('POST', f"{stub.url}/b", provider='other')
+            self.assertEqual(stub.hits['/b'], 1)
+        stats = self.client.stats()['stub']
+        self.assertEqual((stats['requests'], stats['errors'], stats['retries']), (3, 3, 2))
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        with StubWeatherServer(default=(500, {})) as stub:
+            with self.assertLogs('chatbot.http_client', 'WARNING'):
+                for _ in range(2):
+                    self.client.get(f"{stub.url}/a", provider='stub', retries=0)
+            with self.assertRaises(CircuitOpenError):
+                self.client.get(f"{stub.url}/a", provider='stub')
+            self.assertEqual(stub.hits['/a'], 2)
+
+            # After reset_timeout one trial call is let through; success closes the circuit
+            stub.default = (200, {})
+            breaker = self.client.breaker('stub')
+            breaker.opened_at -= 61
+            self.assertEqual(breaker.state, 'half-open')
+            self.client.get(f"{stub.url}/a", provider='stub')
+            self.assertEqual(breaker.state, 'closed')
+        self.assertEqual(self.client.stats()['stub']['short_circuited'], 1)
+
+    def test_unexpected_error_in_trial_call_reopens_circuit(self):
+        breaker = self.client.breaker('stub')
+        breaker.failures, breaker.opened_at = 2, time.monotonic() - 61
+        session = self.client._session('stub.invalid')
+        with mock.patch.object(session, 'request', side_effect=ValueError('bad adapter')):
+            with self.assertRaises(ValueError):
+                self.client.get('http://stub.invalid/a', provider='stub')
+        self.assertEqual(breaker.state, 'open')
+
+        # The next trial after reset_timeout is let through again
+        breaker.opened_at -= 61
+        self.assertTrue(breaker.allow())
+
+
+def fake_translate(provider, url, method='GET', headers=None, data=None, params=None):
+    assert params == {'key': 'key'}, "only the API key belongs in the query string"
+    return {'data': {'translations': [{'translatedText': f"tl:{text}"} for text in data['q']]}}
+
+
+class TranslationMemoryTests(TestCase):
+
+    def setUp(self):
+        invalidate_tags('chatbot.APIConfiguration')
+        translation_memory.clear()
+        APIConfiguration.objects.create(provider='google_translate', api_key='key')
+        self.service = TranslationService()
+        # Warm the cached configuration lookup so query counts only see the memory
+        self.service.api_manager.get_api_config('google_translate')
+
+    def translate(self, texts):
+        with mock.patch.object(self.service.api_manager, 'make_api_request', side_effect=fake_translate) as api:
+            return self.service.translate_many(texts, 'fil'), api.call_count
+
+    def test_batches_misses_and_remembers_translations(self):
+        self.assertEqual(
+            self.translate(['Hello', 'Thanks', 'Hello', '']),
+            (['tl:Hello', 'tl:Thanks', 'tl:Hello', ''], 1),
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.translate(['Thanks', 'Hello']), (['tl:Thanks', 'tl:Hello'], 0))
+
+        # Another process: the in-process memory is empty, the database is not
+        translation_memory.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.translate(['Hello']), (['tl:Hello'], 0))
+        self.assertEqual(TranslatedText.objects.count(), 2)
+
+    def test_untranslatable_text_is_returned_and_not_remembered(self):
+        with mock.patch.object(self.service.api_manager, 'make_api_request', return_value=None):
+            self.assertEqual(self.service.translate_text('Hello', 'fil'), 'Hello')
+        self.assertFalse(TranslatedText.objects.exists())
+
+    def test_warm_translations_command(self):
+        ChatbotKnowledgeBase.objects.create(
+            category='hours', question='Office hours?', answer_en='Open 8AM-5PM.',
+            answer_fil='Bukas 8AM-5PM.', keywords='hours',
+        )
+        with mock.patch('chatbot.api_services.translation_service.api_manager.make_api_request', side_effect=fake_translate):
+            call_command('warm_translations', stdout=io.StringIO())
+        self.assertEqual(translation_memory.lookup(['Open 8AM-5PM.'], 'fil'), {'Open 8AM-5PM.': 'tl:Open 8AM-5PM.'})
+        # Knowledge base answer plus the four fallback replies, in each direction
+        self.assertEqual(TranslatedText.objects.count(), 10)
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        invalidate_tags('chatbot.APIConfiguration')
+        self.cache = ResponseCache()
+
+    def test_normalized_messages_share_a_reply(self):
+        self.assertIsNone(self.cache.get('How do I file a complaint?', 'en'))
+        self.cache.set('How do I file a complaint?', 'en', 'Use the complaint form.')
+        self.assertEqual(self.cache.get('how do i FILE complaints!!', 'en'), 'Use the complaint form.')
+        self.assertIsNone(self.cache.get('How do I file a complaint?', 'fil'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hit'], stats['miss'], stats['lookups']), (1, 2, 3))
+        self.assertAlmostEqual(stats['hit_rate'], 1 / 3)
+
+    @override_settings(CHATBOT_RESPONSE_CACHE_SIMILARITY=0.6)
+    def test_similar_message_reuses_nearest_reply(self):
+        self.cache.set('How do I file a complaint?', 'en', 'Use the complaint form.')
+        self.cache.set('What are the business permit requirements?', 'en', 'Bring a DTI certificate.')
+        self.assertEqual(self.cache.get('how to file complaints', 'en'), 'Use the complaint form.')
+        self.assertIsNone(self.cache.get('where is the health center', 'en'))
+        self.assertEqual(self.cache.stats()['near_hit'], 1)
+
+    @override_settings(CHATBOT_RESPONSE_CACHE_TTL=0)
+    def test_disabled(self):
+        self.cache.set('How do I file a complaint?', 'en', 'Use the complaint form.')
+        self.assertIsNone(self.cache.get('How do I file a complaint?', 'en'))
+
+    def test_similarity_index_drops_oldest(self):
+        index = SimilarityIndex(max_entries=2)
+        for normalized in ('file complaint', 'busines permit', 'health center'):
+            index.add(normalized)
+        self.assertEqual(index.nearest('file complaint'), (None, 0.0))
+        self.assertEqual(index.nearest('health center')[0], 'health center')
+
+    def test_openai_reply_is_cached(self):
+        APIConfiguration.objects.create(provider='openai', api_key='key')
+        service = SmartResponseService()
+        reply = {'choices': [{'message': {'content': ' File it online. '}}]}
+        with mock.patch.object(service.api_manager, 'make_api_request', return_value=reply) as api:
+            self.assertEqual(service._get_openai_response('How do I file a complaint?', 'en', None), 'File it online.')
+            self.assertEqual(service._get_openai_response('how do I file complaints', 'en', None), 'File it online.')
+        self.assertEqual(api.call_count, 1)
+
+
+class ChatStreamTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ChatbotKnowledgeBase.objects.create(
+            category='documents', question='How much is a barangay clearance?',
+            answer_en='A barangay clearance costs 50 pesos. Bring a valid ID.',
+            answer_fil='Ang barangay clearance ay 50 piso.',
+            keywords='clearance, bayad, fee', priority=10,
+        )
+
+    def setUp(self):
+        # Build the index here; the engine itself runs in a worker thread
+        invalidate_tags(KNOWLEDGE_BASE_TAG)
+        get_knowledge_index()
+
+    async def stream(self, **body):
+        response = await self.async_client.post(
+            reverse('chatbot:chat_stream_api'), json.dumps(body), content_type='application/json',
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    async def test_streams_reply_and_saves_messages(self):
+        events = await self.stream(message='how much is clearance', language='en')
+        self.assertEqual(events[0]['type'], 'meta')
+        self.assertEqual(events[-1]['type'], 'done')
+        deltas = [event['text'] for event in events if event['type'] == 'delta']
+        self.assertGreater(len(deltas), 1)
+        self.assertIn('50 pesos', ''.join(deltas))
+
+        session = await ChatSession.objects.aget(session_id=events[0]['session_id'])
+        bot_message = await ChatMessage.objects.aget(pk=events[-1]['message_id'])
+        self.assertEqual(bot_message.content, ''.join(deltas))
+        self.assertEqual(await session.messages.acount(), 2)
+
+        # The same session carries on
+        events = await self.stream(message='clearance fee', session_id=session.session_id, language='en')
+        self.assertEqual(events[0]['session_id'], session.session_id)
+        self.assertEqual(await session.messages.acount(), 4)
+
+    async def test_openai_pieces_are_sent_as_they_arrive(self):
+        first_delta_sent = threading.Event()
+        released = []
+
+        class OpenAIStream:
+            def iter_lines(self, decode_unicode=False):
+                yield 'data: ' + json.dumps({'choices': [{'delta': {'content': 'Dogs are registered'}}]})
+                # OpenAI holds the rest until the first piece has reached the
+                # client; a view that waits for the whole reply times out here
+                released.append(first_delta_sent.wait(timeout=5))
+                yield ''
+                yield 'data: ' + json.dumps({'choices': [{'delta': {'content': ' at the barangay hall.'}}]})
+                yield 'data: [DONE]'
+
+            def close(self):
+                pass
+
+        api_manager = smart_response_service.api_manager
+        with mock.patch.object(api_manager, 'get_api_config', return_value=mock.Mock(api_key='key')), \
+                mock.patch.object(api_manager, 'make_api_request', return_value=OpenAIStream()) as api:
+            response = await self.async_client.post(
+                reverse('chatbot:chat_stream_api'), json.dumps({'message': 'Where do I register my dog', 'language': 'en'}),
+                content_type='application/json',
+            )
+            events = []
+            async for chunk in response.streaming_content:
+                event = json.loads(chunk)
+                events.append(event)
+                if event['type'] == 'delta':
+                    first_delta_sent.set()
+
+        self.assertTrue(api.call_args.kwargs['stream'])
+        self.assertEqual(released, [True])
+        self.assertEqual(
+            [event['text'] for event in events if event['type'] == 'delta'],
+            ['Dogs are registered', ' at the barangay hall.'],
+        )
+        self.assertEqual(events[-1]['category'], 'ai_enhanced')
+        bot_message = await ChatMessage.objects.aget(pk=events[-1]['message_id'])
+        self.assertEqual(bot_message.content, 'Dogs are registered at the barangay hall.')
+
+    async def test_rejects_empty_message(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = await self.async_client.post(
+                reverse('chatbot:chat_stream_api'), json.dumps({'message': ' '}), content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 400)
+
+
+class ChatPersistenceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ChatbotKnowledgeBase.objects.create(
+            category='documents', question='How much is a barangay clearance?',
+            answer_en='A barangay clearance costs 50 pesos.', answer_fil='Ang barangay clearance ay 50 piso.',
+            keywords='clearance, bayad, fee', priority=10,
+        )
+        cls.session = ChatSession.objects.create(session_id='existing', language='en')
+
+    def setUp(self):
+        invalidate_tags(KNOWLEDGE_BASE_TAG)
+        get_knowledge_index()
+
+    def chat(self, **body):
+        response = self.client.post(reverse('chatbot:chat_api'), json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_one_turn_is_a_lookup_and_one_insert(self):
+        # SELECT the session, INSERT both messages
+        with self.assertNumQueries(2):
+            data = self.chat(message='how much is clearance', session_id='existing', language='en')
+
+        user_message, bot_message = self.session.messages.all()
+        self.assertEqual((user_message.message_type, user_message.content), ('user', 'how much is clearance'))
+        self.assertEqual(bot_message.pk, data['message_id'])
+        self.assertEqual(bot_message.content, data['response'])
+        self.assertLessEqual(user_message.timestamp, bot_message.timestamp)
+
+    def test_language_switch_updates_only_the_language(self):
+        with self.assertNumQueries(3):
+            self.chat(message='magkano ang clearance', session_id='existing', language='fil')
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.language, 'fil')
+
+    def test_new_session(self):
+        with self.assertNumQueries(3):
+            data = self.chat(message='how much is clearance', session_id='gone', language='fil')
+        session = ChatSession.objects.get(session_id=data['session_id'])
+        self.assertEqual((session.language, session.messages.count()), ('fil', 2))
+
+
+class AnalyticsRollupTests(NoLoginHistoryMixin, TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.week_ago = self.now - timedelta(days=7)
+        self.add_turn(self.week_ago, category='documents', is_helpful=True)
+        self.add_turn(self.week_ago + timedelta(minutes=1), category='documents', is_helpful=False, minutes=4)
+        self.add_turn(self.now - timedelta(minutes=5), category='hours')
+
+    def add_turn(self, started_at, category, is_helpful=None, minutes=2):
+        session = ChatSession.objects.create(session_id=f'session-{ChatSession.objects.count()}', started_at=started_at)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, message_type='user', content='hi', timestamp=started_at),
+            ChatMessage(
+                session=session, message_type='bot', content='hello', category=category,
+                is_helpful=is_helpful, timestamp=started_at + timedelta(minutes=minutes),
+            ),
+        ])
+        return session
+
+    def test_full_rollup(self):
+        call_command('rollup_chatbot_analytics', stdout=io.StringIO())
+        old = ChatbotAnalytics.objects.get(date=timezone.localdate(self.week_ago))
+        self.assertEqual((old.total_sessions, old.total_messages), (2, 4))
+        self.assertEqual((old.helpful_count, old.not_helpful_count, old.satisfaction_rating), (1, 1, 2.5))
+        self.assertEqual(old.most_common_category, 'documents')
+        self.assertEqual(old.avg_session_length, 3.0)
+
+    def test_incremental_rollup_only_touches_recent_days(self):
+        rollup_chat_analytics(now=self.now)
+        old = ChatbotAnalytics.objects.get(date=timezone.localdate(self.week_ago))
+
+        # New activity and late feedback on a recent reply
+        later = self.now + timedelta(minutes=10)
+        self.add_turn(self.now - timedelta(minutes=1), category='hours')
+        ChatMessage.objects.filter(category='hours').update(is_helpful=True)
+        # Watermark, oldest message, touched days, three grouped rollups and the upsert
+        with self.assertNumQueries(9):
+            rows = rollup_chat_analytics(now=later)
+
+        self.assertEqual([row.date for row in rows], [timezone.localdate(self.now)])
+        old.refresh_from_db()
+        self.assertEqual(old.rolled_up_through, self.now)
+        recent = ChatbotAnalytics.objects.get(date=timezone.localdate(self.now))
+        self.assertEqual((recent.total_sessions, recent.helpful_count, recent.satisfaction_rating), (2, 2, 5.0))
+        self.assertEqual(get_watermark(), later)
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_admin_page_shows_trends(self):
+        rollup_chat_analytics()
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('chatbot:knowledge_base_admin'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['trends']), 2)
+        self.assertEqual(response.context['totals']['sessions'], 3)
+
+
+class PruneChatHistoryTests(TestCase):
+
+    def setUp(self):
+        self.archive_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        now = timezone.now()
+        self.old = self.add_session('old', now - timedelta(days=400), active=False)
+        self.idle = self.add_session('idle', now - timedelta(hours=3))
+        self.live = self.add_session('live', now - timedelta(minutes=5))
+
+    def add_session(self, session_id, started_at, active=True):
+        session = ChatSession.objects.create(session_id=session_id, started_at=started_at, is_active=active)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, message_type='user', content='Magkano ang clearance?', timestamp=started_at),
+            ChatMessage(session=session, message_type='bot', content='50 piso', timestamp=started_at + timedelta(minutes=1)),
+        ])
+        return session
+
+    def prune(self, *args):
+        out = io.StringIO()
+        call_command('prune_chat_history', '--archive-dir', str(self.archive_dir), '--batch-size', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_ends_idle_sessions_and_archives_old_messages(self):
+        output = self.prune('--idle-minutes', '30', '--days', '180')
+
+        self.idle.refresh_from_db()
+        self.assertFalse(self.idle.is_active)
+        self.assertEqual(self.idle.ended_at, self.idle.messages.last().timestamp)
+        self.assertTrue(ChatSession.objects.get(pk=self.live.pk).is_active)
+
+        self.assertFalse(ChatSession.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(ChatMessage.objects.count(), 4)
+        archives = list(self.archive_dir.glob('chat-*.jsonl.gz'))
+        self.assertEqual(len(archives), 1)
+        with gzip.open(archives[0], 'rt', encoding='utf-8') as archive:
+            records = [json.loads(line) for line in archive]
+        self.assertEqual([record['content'] for record in records], ['Magkano ang clearance?', '50 piso'])
+        self.assertEqual(records[0]['session_id'], 'old')
+        self.assertIn('Archived and deleted 2 message(s)', output)
+        # The archived day was rolled up before its messages went
+        self.assertTrue(ChatbotAnalytics.objects.filter(date=timezone.localdate(self.old.started_at)).exists())
+
+    def test_rollup_after_prune_keeps_archived_days(self):
+        # A session of that day kept for its upload, ended only now
+        kept = self.add_session('kept', self.old.started_at + timedelta(minutes=30), active=True)
+        ChatImageUpload.objects.create(session=kept, image='chatbot/images/receipt.jpg', original_filename='receipt.jpg')
+        self.prune('--idle-minutes', '30', '--days', '180')
+        day = ChatbotAnalytics.objects.get(date=timezone.localdate(self.old.started_at))
+        self.assertEqual((day.total_sessions, day.total_messages), (2, 4))
+
+        ChatSession.objects.filter(pk=kept.pk).update(is_active=False, ended_at=timezone.now())
+        rollup_chat_analytics()
+        call_command('rollup_chatbot_analytics', '--full', stdout=io.StringIO())
+
+        day.refresh_from_db()
+        self.assertEqual((day.total_sessions, day.total_messages), (2, 4))
+        self.assertTrue(ChatbotAnalytics.objects.filter(date=timezone.localdate(self.live.started_at)).exists())
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn('archive 2 message(s)', self.prune('--dry-run'))
+        self.assertEqual(ChatMessage.objects.count(), 6)
+        self.assertFalse(any(self.archive_dir.iterdir()))
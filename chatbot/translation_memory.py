@@ -0,0 +1,91 @@
+"""
+Translation memory for the chatbot
+
+Upstream translation is slow and billed per character, and the chatbot
+keeps translating the same strings (knowledge base answers, canned
+replies). Every translation is remembered by a SHA-256 of
+(target language, source text):
+
+    memory    an in-process LRU, checked first
+    database  TranslatedText rows, shared by every process and restart
+
+Only strings found in neither go upstream, batched into as few API calls
+as possible. ``manage.py warm_translations`` fills the memory ahead of
+time.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .models import TranslatedText
+
+
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def translation_key(text, target_language):
+    return hashlib.sha256(f"{target_language}\0{text}".encode('utf-8')).hexdigest()
+
+
+class TranslationMemory:
+    """
+    Two-level (LRU, then database) store of translations
+
+    Usage:
+        found = translation_memory.lookup(texts, 'fil')  # {text: translation}
+        translation_memory.store({'Hello': 'Kumusta'}, 'fil')
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, translation):
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, texts, target_language):
+        """Known translations of ``texts``, as {text: translation}"""
+        keys = {text: translation_key(text, target_language) for text in set(texts)}
+        found = {}
+        with self._lock:
+            for text, key in keys.items():
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[text] = self._entries[key]
+
+        missing = {keys[text]: text for text in keys if text not in found}
+        if missing:
+            rows = TranslatedText.objects.filter(key__in=list(missing)).values_list('key', 'translated_text')
+            with self._lock:
+                for key, translation in rows:
+                    found[missing[key]] = translation
+                    self._remember(key, translation)
+        return found
+
+    def store(self, translations, target_language):
+        """Remember {text: translation} in memory and the database"""
+        rows = [
+            TranslatedText(
+                key=translation_key(text, target_language), target_language=target_language,
+                source_text=text, translated_text=translation,
+            )
+            for text, translation in translations.items()
+        ]
+        # Another process may have stored the same text meanwhile
+        TranslatedText.objects.bulk_create(rows, ignore_conflicts=True)
+        with self._lock:
+            for row in rows:
+                self._remember(row.key, row.translated_text)
+
+    def clear(self):
+        """Forget the in-process entries (the database is kept)"""
+        with self._lock:
+            self._entries.clear()
+
+
+translation_memory = TranslationMemory()
@@ -5,6 +5,7 @@ app_name = 'chatbot'
 
 urlpatterns = [
     path('api/chat/', views.chat_api, name='chat_api'),
+    path('api/chat/stream/', views.chat_stream_api, name='chat_stream_api'),
     path('api/session/start/', views.start_session, name='start_session'),
     path('api/session/end/', views.end_session, name='end_session'),
     path('api/feedback/', views.submit_feedback, name='submit_feedback'),
@@ -1,6 +1,11 @@
+import asyncio
 import json
+import logging
+import re
 import uuid
-from django.http import JsonResponse
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404
@@ -8,12 +13,18 @@ from django.utils import timezone
 from django.db.models import Avg, Count, Q
 from django.contrib.admin.views.decorators import staff_member_required
 from .models import ChatSession, ChatMessage, ChatbotKnowledgeBase, ChatbotAnalytics, ProactiveAlert, ChatImageUpload
-from .ai_engine import BarangayAIEngine
+from .ai_engine import ai_engine
+from .persistence import aget_or_start_session, get_or_start_session, record_turn
+from .response_cache import response_cache
+from .rollup import get_watermark
 from .api_services import weather_service, translation_service
 import os
 from PIL import Image
 
 
+logger = logging.getLogger(__name__)
+
+
 @require_http_methods(["POST"])
 def chat_api(request):
     """Main chat API endpoint"""
@@ -26,40 +37,15 @@ def chat_api(request):
         if not message:
             return JsonResponse({'error': 'Message is required'}, status=400)
         
-        # Get or create session
-        session = None
-        if session_id:
-            try:
-                session = ChatSession.objects.get(session_id=session_id, is_active=True)
-            except ChatSession.DoesNotExist:
-                pass
-        
-        if not session:
-            session_id = str(uuid.uuid4())
-            session = ChatSession.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                session_id=session_id,
-                language=language
-            )
-        
-        # Save user message
-        user_message = ChatMessage.objects.create(
-            session=session,
-            message_type='user',
-            content=message
+        session = get_or_start_session(
+            session_id, request.user if request.user.is_authenticated else None, language
         )
+        received_at = timezone.now()
         
         # Get user context for better responses
-        user_context = {}
-        if request.user.is_authenticated:
-            user_context = {
-                'role': getattr(request.user, 'role', 'resident'),
-                'is_verified': getattr(request.user, 'is_verified', False),
-                'username': request.user.username
-            }
+        user_context = _user_context(request.user)
         
         # Generate AI response with session context
-        ai_engine = BarangayAIEngine()
         ai_response = ai_engine.process_message(
             message=message, 
             language=language, 
@@ -67,24 +53,11 @@ def chat_api(request):
             session_id=session.session_id  # Pass session_id for context tracking
         )
         
-        # Update session language if detected language is different
-        detected_lang = ai_response.get('detected_language', language)
-        if detected_lang and detected_lang != session.language:
-            session.language = detected_lang
-            session.save()
-        
-        # Save bot response
-        bot_message = ChatMessage.objects.create(
-            session=session,
-            message_type='bot',
-            content=ai_response['response']
+        # Save the message and the reply together
+        bot_message = record_turn(
+            session, message, ai_response['response'], language, received_at, ai_response['category']
         )
         
-        # Update session language if different
-        if session.language != language:
-            session.language = language
-            session.save()
-        
         response_data = {
             'session_id': session.session_id,
             'response': ai_response['response'],
@@ -103,6 +76,127 @@ def chat_api(request):
         return JsonResponse({'error': 'Internal server error'}, status=500)
 
 
+# Sentence-sized pieces of a reply; joined back they give the reply unchanged
+STREAM_CHUNK_PATTERN = re.compile(r'[^.!?\n]*(?:[.!?]+|\n+|$)[ \t]*')
+
+
+def _user_context(user):
+    if not user.is_authenticated:
+        return {}
+    return {
+        'role': getattr(user, 'role', 'resident'),
+        'is_verified': getattr(user, 'is_verified', False),
+        'username': user.username
+    }
+
+
+def _stream_event(event_type, **data):
+    return json.dumps({'type': event_type, **data}) + '\n'
+
+
+async def chat_stream_api(request):
+    """
+    Streaming chat API endpoint (async)
+    
+    Takes the same JSON body as chat_api and answers with newline-delimited
+    JSON events, flushed as they are ready:
+    
+        {"type": "meta", "session_id": ...}           as soon as the session is known
+        {"type": "delta", "text": ...}                the reply, piece by piece
+        {"type": "done", "message_id": ..., ...}      confidence, category, suggestions
+        {"type": "error", "error": ...}               instead of done, if the reply failed
+    
+    The AI engine (knowledge base search, OpenAI and translation calls) runs
+    in a worker thread, so under ASGI a slow upstream call does not hold the
+    event loop. OpenAI replies are streamed (``stream=True``) and each piece
+    is sent on as OpenAI produces it; replies found locally arrive whole and
+    are sent in sentence-sized pieces. The session is looked up (or
+    started) with the async ORM; once the reply is complete the turn is
+    saved by chat_api's record_turn, run through sync_to_async because it
+    writes in a transaction.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    message = data.get('message', '').strip()
+    session_id = data.get('session_id')
+    language = data.get('language', 'en')
+    
+    if not message:
+        return JsonResponse({'error': 'Message is required'}, status=400)
+    
+    # request.user is resolved lazily through the (sync) session backend
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    
+    session = await aget_or_start_session(session_id, user, language)
+    received_at = timezone.now()
+    user_context = _user_context(user) if user else {}
+    
+    async def events():
+        yield _stream_event('meta', session_id=session.session_id)
+        
+        loop = asyncio.get_running_loop()
+        deltas = asyncio.Queue()
+        
+        def on_delta(text):
+            loop.call_soon_threadsafe(deltas.put_nowait, text)
+        
+        def respond():
+            try:
+                return ai_engine.process_message(
+                    message=message,
+                    language=language,
+                    user_context=user_context,
+                    session_id=session.session_id,
+                    on_delta=on_delta
+                )
+            finally:
+                # Queued after every delta, so it ends the loop below
+                loop.call_soon_threadsafe(deltas.put_nowait, None)
+        
+        engine = asyncio.ensure_future(sync_to_async(respond, thread_sensitive=False)())
+        streamed = False
+        while (text := await deltas.get()) is not None:
+            streamed = True
+            yield _stream_event('delta', text=text)
+        
+        try:
+            ai_response = await engine
+            # Django 4.2 has no async transactions, so the atomic write runs in a thread
+            bot_message = await sync_to_async(record_turn)(
+                session, message, ai_response['response'], language, received_at, ai_response['category']
+            )
+        except Exception:
+            logger.exception("Streaming chat reply failed")
+            yield _stream_event('error', error='Internal server error')
+            return
+        
+        if not streamed:
+            for chunk in STREAM_CHUNK_PATTERN.findall(ai_response['response']):
+                if chunk:
+                    yield _stream_event('delta', text=chunk)
+        
+        yield _stream_event(
+            'done',
+            message_id=bot_message.id,
+            confidence=ai_response['confidence'],
+            category=ai_response['category'],
+            suggestions=ai_response.get('suggestions', []),
+            timestamp=bot_message.timestamp.isoformat()
+        )
+    
+    response = StreamingHttpResponse(events(), content_type='application/x-ndjson')
+    # Keep proxies (nginx) from buffering the stream
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @require_http_methods(["POST"])
 def start_session(request):
     """Start a new chat session"""
@@ -118,7 +212,6 @@ def start_session(request):
         )
         
         # Create welcome message
-        ai_engine = BarangayAIEngine()
         welcome_response = ai_engine.process_message('hello', language)
         
         ChatMessage.objects.create(
@@ -196,14 +289,45 @@ def knowledge_base_admin(request):
     """Admin view for managing knowledge base"""
     knowledge_items = ChatbotKnowledgeBase.objects.all().order_by('-priority', 'category')
     
-    # Get analytics
-    today = timezone.now().date()
-    analytics = ChatbotAnalytics.objects.filter(date=today).first()
+    # Trends come from the daily rollup (manage.py rollup_chatbot_analytics),
+    # never from the raw chat history
+    try:
+        days = max(1, min(int(request.GET.get('days', 30)), 365))
+    except ValueError:
+        days = 30
+    today = timezone.localdate()
+    trends = list(
+        ChatbotAnalytics.objects.filter(date__gt=today - timedelta(days=days)).order_by('date')
+    )
+    analytics = next((row for row in trends if row.date == today), None)
+    
+    helpful = sum(row.helpful_count for row in trends)
+    votes = helpful + sum(row.not_helpful_count for row in trends)
+    totals = {
+        'sessions': sum(row.total_sessions for row in trends),
+        'messages': sum(row.total_messages for row in trends),
+        'helpful_rate': round(100 * helpful / votes, 1) if votes else None,
+        'votes': votes,
+    }
     
     context = {
         'knowledge_items': knowledge_items,
         'analytics': analytics,
         'categories': ChatbotKnowledgeBase.CATEGORY_CHOICES,
+        'days': days,
+        'trends': trends,
+        'totals': totals,
+        'trend_data': [
+            {
+                'date': row.date.isoformat(),
+                'sessions': row.total_sessions,
+                'messages': row.total_messages,
+                'satisfaction': row.satisfaction_rating,
+            }
+            for row in trends
+        ],
+        'last_rollup': get_watermark(),
+        'response_cache': response_cache.stats(),
     }
     
     return render(request, 'chatbot/knowledge_base_admin.html', context)
@@ -0,0 +1,338 @@
+"""
+Cached snapshots of the external weather sources used by the chatbot
+
+Answering a weather question used to call wttr.in and OpenWeatherMap one
+source after another inside the request. Every source is now read through
+``weather_cache``, which keeps the normalized result of the last fetch in
+the Django cache:
+
+    fresh     younger than the source's ttl - returned as is
+    stale     up to stale_ttl past that - returned, and refreshed in a
+              background thread (stale-while-revalidate)
+    missing   nothing returned; a background refresh is started
+    failing   a failed fetch is remembered for failure_ttl seconds, during
+              which the source is not contacted again (stale data is
+              still served)
+
+``read()`` never touches the network, so chat replies only wait on the
+cache (and, on expiry, the WeatherSnapshot rows written by poll_weather).
+With CHATBOT_WEATHER_REFRESH_ON_READ off, reads never start fetches either
+and the poller is the only thing that contacts the sources.
+
+``refresh_many()`` fetches a group of sources in parallel under one
+overall deadline for callers that need fresh data now.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .http_client import http_client
+from .models import WeatherSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+CURRENT_TTL = 10 * 60
+FORECAST_TTL = 60 * 60
+STALE_TTL = 6 * 60 * 60
+FAILURE_TTL = 5 * 60
+
+# Concurrent fetches per process, and how long refresh_many() waits for them
+FETCH_WORKERS = 6
+FETCH_DEADLINE = 10
+
+# Overridable per provider with the CHATBOT_WEATHER_BASE_URLS setting
+DEFAULT_BASE_URLS = {
+    'wttr': 'https://wttr.in',
+    'openweather': 'https://api.openweathermap.org',
+}
+
+
+class WeatherSourceError(Exception):
+    """A weather source answered with something other than usable JSON"""
+
+
+class WeatherSource:
+    """One upstream URL plus the function that normalizes its JSON"""
+
+    def __init__(self, name, provider, path, parse, ttl=CURRENT_TTL, stale_ttl=STALE_TTL, timeout=8):
+        self.name = name
+        self.provider = provider
+        self.path = path
+        self.parse = parse
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"<WeatherSource {self.name}>"
+
+    @property
+    def url(self):
+        base_urls = getattr(settings, 'CHATBOT_WEATHER_BASE_URLS', {})
+        return base_urls.get(self.provider, DEFAULT_BASE_URLS[self.provider]) + self.path
+
+
+# ============================================================================
+# NORMALIZERS
+# ============================================================================
+
+def parse_wttr_current(data):
+    """Current conditions from a wttr.in ``format=j1`` response"""
+    current = data['current_condition'][0]
+    return {
+        'weather_desc': current['weatherDesc'][0]['value'],
+        'wind_speed_kmh': int(current['windspeedKmph']),
+        'wind_dir': current['winddirDegree'],
+        'temperature': int(current['temp_C']),
+        'humidity': int(current['humidity']),
+        'pressure': int(current['pressure']),
+        'visibility': int(current['visibility']),
+        'observed_at': timezone.now().isoformat(),
+    }
+
+
+def parse_wttr_forecast(data):
+    """Daily summaries (up to 5 days) from a wttr.in ``format=j1`` response"""
+    days = []
+    for i, day_forecast in enumerate(data.get('weather', [])[:5]):
+        max_wind = 0
+        weather_conditions = []
+
+        # Check hourly data for the day
+        for hourly in day_forecast.get('hourly', []):
+            max_wind = max(max_wind, int(hourly.get('windspeedKmph', 0)))
+            weather_desc = hourly['weatherDesc'][0]['value']
+            if weather_desc not in weather_conditions:
+                weather_conditions.append(weather_desc)
+
+        days.append({
+            'date': day_forecast.get('date') or (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d'),
+            'max_wind': max_wind,
+            'weather_conditions': weather_conditions,
+            'max_temp': int(day_forecast['maxtempC']),
+            'min_temp': int(day_forecast['mintempC']),
+        })
+    return days
+
+
+def parse_openweather_forecast(data):
+    """Daily summaries from an OpenWeatherMap 3-hourly ``forecast`` response"""
+    daily_forecasts = {}
+    for item in data.get('list', []):
+        day_key = datetime.fromtimestamp(item['dt']).strftime('%Y-%m-%d')
+        temp = item['main']['temp']
+        day = daily_forecasts.setdefault(day_key, {
+            'date': day_key,
+            'max_wind': 0,
+            'max_temp': temp,
+            'min_temp': temp,
+            'weather_conditions': [],
+            'precipitation': 0,
+        })
+
+        day['max_wind'] = max(day['max_wind'], item['wind'].get('speed', 0) * 3.6)
+        day['max_temp'] = max(day['max_temp'], temp)
+        day['min_temp'] = min(day['min_temp'], temp)
+
+        weather_main = item['weather'][0]['main']
+        if weather_main not in day['weather_conditions']:
+            day['weather_conditions'].append(weather_main)
+
+        if 'rain' in item:
+            day['precipitation'] += item['rain'].get('3h', 0)
+
+    return list(daily_forecasts.values())
+
+
+def wttr_current(place, ttl=CURRENT_TTL, timeout=8):
+    return WeatherSource(f'wttr-current:{place}', 'wttr', f'/{place}?format=j1', parse_wttr_current, ttl=ttl, timeout=timeout)
+
+
+def wttr_forecast(place, ttl=FORECAST_TTL, timeout=10):
+    return WeatherSource(f'wttr-forecast:{place}', 'wttr', f'/{place}?format=j1', parse_wttr_forecast, ttl=ttl, timeout=timeout)
+
+
+def openweather_forecast(place, app_id, ttl=FORECAST_TTL, timeout=10):
+    return WeatherSource(
+        f'openweather-forecast:{place}', 'openweather',
+        f'/data/2.5/forecast?q={place}&appid={app_id}&units=metric',
+        parse_openweather_forecast, ttl=ttl, timeout=timeout,
+    )
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class WeatherCache:
+    """
+    Stale-while-revalidate cache of normalized weather source data
+
+    Fetches run on a bounded thread pool shared by the whole process, so a
+    burst of cold reads cannot start more than ``max_workers`` requests.
+
+    Usage:
+        basey = wttr_current('Basey,Samar,Philippines')
+        conditions = weather_cache.read(basey)  # None until first fetched
+        fresh = weather_cache.refresh_many(sources, deadline=5)
+    """
+
+    key_prefix = 'chatbot:weather'
+
+    def __init__(self, failure_ttl=FAILURE_TTL, max_workers=FETCH_WORKERS):
+        self.failure_ttl = failure_ttl
+        self.max_workers = max_workers
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _key(self, source, kind='data'):
+        return f"{self.key_prefix}:{kind}:{source.name}"
+
+    def _submit(self, function, source):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='weather')
+            future = self._executor.submit(function, source)
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def read(self, source):
+        """Cached data for a source, refreshing it in the background when old"""
+        return self.read_many([source])[0]
+
+    def read_many(self, sources):
+        """
+        Cached data for each source (None where missing)
+
+        Costs one cache round trip, plus one query for the sources whose
+        cached copy has expired, since a poll_weather process may have
+        stored newer snapshots in the database.
+        """
+        keys = [(self._key(source), self._key(source, 'failed')) for source in sources]
+        cached = cache.get_many([key for pair in keys for key in pair])
+        entries = [cached.get(data_key) for data_key, _ in keys]
+
+        now = time.time()
+        expired = [i for i, source in enumerate(sources) if self._expired(source, entries[i], now)]
+        if expired:
+            snapshots = self._load_snapshots([sources[i] for i in expired])
+            refresh_on_read = getattr(settings, 'CHATBOT_WEATHER_REFRESH_ON_READ', True)
+            for i in expired:
+                source, snapshot = sources[i], snapshots.get(sources[i].name)
+                if snapshot and (entries[i] is None or snapshot['fetched_at'] > entries[i]['fetched_at']):
+                    if self._store(source, snapshot, now):
+                        entries[i] = snapshot
+                if refresh_on_read and self._expired(source, entries[i], now) and keys[i][1] not in cached:
+                    self.refresh_in_background(source)
+
+        return [entry['data'] if entry else None for entry in entries]
+
+    def _expired(self, source, entry, now):
+        return entry is None or now - entry['fetched_at'] >= source.ttl
+
+    def _store(self, source, entry, now=None):
+        """Cache an entry until its stale window ends; False if already past it"""
+        remaining = source.ttl + source.stale_ttl - ((now or time.time()) - entry['fetched_at'])
+        if remaining <= 0:
+            return False
+        cache.set(self._key(source), entry, remaining)
+        return True
+
+    def _load_snapshots(self, sources):
+        snapshots = WeatherSnapshot.objects.filter(source__in=[source.name for source in sources])
+        return {
+            snapshot.source: {'data': snapshot.data, 'fetched_at': snapshot.fetched_at.timestamp()}
+            for snapshot in snapshots
+        }
+
+    def refresh(self, source):
+        """Fetch and store a source now; None if it fails or is marked failing"""
+        if cache.get(self._key(source, 'failed')):
+            return None
+
+        try:
+            response = http_client.get(source.url, provider=source.provider, timeout=source.timeout, retries=1)
+            if response.status_code != 200:
+                raise WeatherSourceError(f"HTTP {response.status_code}")
+            data = source.parse(response.json())
+        except Exception as e:
+            logger.error(f"Weather source {source.name} error: {e}")
+            cache.set(self._key(source, 'failed'), True, self.failure_ttl)
+            return None
+
+        self._store(source, {'data': data, 'fetched_at': time.time()})
+        return data
+
+    def refresh_many(self, sources, deadline=FETCH_DEADLINE, persist=False):
+        """
+        Fetch sources in parallel and return ``{source.name: data}`` for the
+        ones that succeeded within ``deadline`` seconds
+
+        Worst-case latency is the deadline rather than the sum of the
+        per-source timeouts. Fetches still running at the deadline are left
+        to finish in the pool and update the cache for the next read.
+        ``persist`` also saves the results as WeatherSnapshot rows, which
+        every process falls back to when its own cache has expired.
+        """
+        futures = {self._submit(self.refresh, source): source for source in sources}
+        done, late = wait_futures(futures, timeout=deadline)
+        if late:
+            logger.warning(
+                "Weather sources missed the %ss deadline: %s",
+                deadline, ', '.join(sorted(futures[future].name for future in late)),
+            )
+        results = {}
+        for future in done:
+            data = future.result()
+            if data is not None:
+                results[futures[future].name] = data
+        if persist:
+            self.persist(results)
+        return results
+
+    def persist(self, results, fetched_at=None):
+        """Save ``{source name: data}`` as WeatherSnapshot rows"""
+        fetched_at = fetched_at or timezone.now()
+        for name, data in results.items():
+            WeatherSnapshot.objects.update_or_create(
+                source=name, defaults={'data': data, 'fetched_at': fetched_at},
+            )
+
+    def refresh_in_background(self, source):
+        """Queue a refresh unless one is already running for the source"""
+        # cache.add is atomic, so only one process refreshes a source at a time
+        if not cache.add(self._key(source, 'refreshing'), True, source.timeout + 5):
+            return None
+        return self._submit(self._background_refresh, source)
+
+    def _background_refresh(self, source):
+        try:
+            return self.refresh(source)
+        finally:
+            cache.delete(self._key(source, 'refreshing'))
+
+    def wait(self, timeout=None):
+        """Block until this process's queued and running fetches have finished"""
+        with self._lock:
+            pending = list(self._pending)
+        wait_futures(pending, timeout=timeout)
+
+    def clear(self, source):
+        cache.delete_many([self._key(source, kind) for kind in ('data', 'failed', 'refreshing')])
+
+
+weather_cache = WeatherCache()
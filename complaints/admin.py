@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import ComplaintCategory, Complaint, ComplaintAttachment, ComplaintComment, CategoryAssignmentRule
+from .models import ComplaintCategory, Complaint, ComplaintAttachment, ComplaintComment, CategoryAssignmentRule, ComplaintCounter
 
 @admin.register(ComplaintCategory)
 class ComplaintCategoryAdmin(admin.ModelAdmin):
@@ -87,4 +87,17 @@ class ComplaintCommentAdmin(admin.ModelAdmin):
     
     def comment_preview(self, obj):
         return obj.comment[:50] + ('...' if len(obj.comment) > 50 else '')
-    comment_preview.short_description = 'Comment'
\ No newline at end of file
+    comment_preview.short_description = 'Comment'
+
+@admin.register(ComplaintCounter)
+class ComplaintCounterAdmin(admin.ModelAdmin):
+    list_display = ('day', 'category', 'status', 'priority', 'is_approved', 'count')
+    list_filter = ('status', 'priority', 'is_approved', 'category')
+    date_hierarchy = 'day'
+    ordering = ('-day',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ComplaintsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'complaints'
-    verbose_name = 'Complaints Management'
\ No newline at end of file
+    verbose_name = 'Complaints Management'
+    
+    def ready(self):
+        import complaints.signals
@@ -237,4 +237,13 @@ class ComplaintSearchForm(forms.Form):
             ).order_by('role', 'first_name', 'last_name')
         else:
             # Remove assignee field for residents
-            self.fields.pop('assigned_to')
\ No newline at end of file
+            self.fields.pop('assigned_to')
+    
+    def search_queryset(self, queryset):
+        """Apply the search box through the complaint search index (adds search_rank)"""
+        from .search import search_complaints
+        
+        search = self.cleaned_data.get('search')
+        if not search:
+            return queryset
+        return search_complaints(queryset, search)
@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from complaints.models import Complaint, ComplaintCategory
+from complaints.search import icontains_filter, index_complaints, search_backend, search_complaints
+
+
+WORDS = (
+    'baradong kanal basura ingay karaoke aso kalsada butas ilaw poste tubig baha '
+    'drainage garbage noise stray dog road pothole streetlight water flooding smoke '
+    'nagrereklamo reklamo kapitbahay gabi umaga tulong sunog puno nakaharang'
+).split()
+# Filler vocabulary so each real word appears in roughly 1% of complaints
+VOCABULARY = WORDS + [f'salita{i}' for i in range(3000)]
+QUERIES = ['kanal', 'baradong kanal', 'karaoke gabi', 'pothole', 'reklamo', 'nag-reklamo', 'streetlig', 'zzzz']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains and indexed complaint search latency on synthetic data (rolled back afterwards)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+    
+    def handle(self, *args, **options):
+        if not search_backend():
+            self.stdout.write(self.style.WARNING("This database engine has no search index to benchmark"))
+            return
+        
+        try:
+            with transaction.atomic():
+                self.run(options['sizes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Synthetic complaints rolled back")
+    
+    def run(self, sizes, repeat):
+        from accounts.models import User
+        
+        rng = random.Random(42)
+        category = ComplaintCategory.objects.create(name='Benchmark category')
+        user = User.objects.create_user('benchmark-user', first_name='Juan', last_name='Dela Cruz')
+        created = 0
+        
+        self.stdout.write(f"{'complaints':>10} {'query':<14} {'icontains ms':>13} {'index ms':>9} {'hits':>6}")
+        for size in sorted(sizes):
+            batch = [
+                Complaint(
+                    complainant=user, category=category,
+                    title=' '.join(rng.choices(VOCABULARY, k=4)),
+                    description=' '.join(rng.choices(VOCABULARY, k=40)),
+                    location=f"Purok {rng.randint(1, 7)}",
+                )
+                for _ in range(size - created)
+            ]
+            # bulk_create skips the save signals, so index the new rows directly
+            last_pk = Complaint.objects.filter(category=category).order_by('-pk').values_list('pk', flat=True).first() or 0
+            Complaint.objects.bulk_create(batch, batch_size=2000)
+            index_complaints(Complaint.objects.filter(category=category, pk__gt=last_pk))
+            created = size
+            
+            base = Complaint.objects.filter(category=category)
+            for query in QUERIES:
+                slow = self.time(lambda: list(base.filter(icontains_filter(query)).order_by('-created_at')[:15]), repeat)
+                fast = self.time(lambda: list(search_complaints(base, query).order_by('-search_rank', '-created_at')[:15]), repeat)
+                hits = search_complaints(base, query).count()
+                self.stdout.write(f"{size:>10} {query:<14} {slow:>13.1f} {fast:>9.1f} {hits:>6}")
+    
+    @staticmethod
+    def time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
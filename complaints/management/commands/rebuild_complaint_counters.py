@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from complaints.models import Complaint, ComplaintCounter
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ComplaintCounter rollup table from the complaints table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report whether the counters match the complaints table',
+        )
+    
+    def handle(self, *args, **options):
+        counted = ComplaintCounter.objects.aggregate(total=Sum('count'))['total'] or 0
+        actual = Complaint.objects.count()
+        
+        self.stdout.write(f"Complaints: {actual}, counted in rollup: {counted}")
+        
+        if options['check']:
+            if counted == actual:
+                self.stdout.write(self.style.SUCCESS("Counters are in sync"))
+            else:
+                self.stdout.write(self.style.WARNING(f"Counters are off by {counted - actual}"))
+            return
+        
+        buckets = ComplaintCounter.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} counter buckets for {actual} complaints"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from complaints.search import rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the complaint full-text search index (FTS5 on SQLite, tsvector on PostgreSQL)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if not backend:
+            self.stdout.write(self.style.WARNING("This database engine has no search index; searches use icontains"))
+            return
+        
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} complaints ({backend})"))
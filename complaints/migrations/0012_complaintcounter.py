@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_counters(apps, schema_editor):
+    from django.db.models import Count
+    from django.db.models.functions import TruncDate
+
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintCounter = apps.get_model('complaints', 'ComplaintCounter')
+    rows = (
+        Complaint.objects.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('status', 'category_id', 'priority', 'is_approved', 'day')
+        .annotate(total=Count('id'))
+    )
+    ComplaintCounter.objects.bulk_create(
+        [
+            ComplaintCounter(
+                status=row['status'],
+                category_id=row['category_id'],
+                priority=row['priority'],
+                is_approved=row['is_approved'],
+                day=row['day'],
+                count=row['total'],
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_complaint_anonymous_contact_complaint_is_anonymous_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'), ('closed', 'Closed')], max_length=20)),
+                ('priority', models.CharField(choices=[('normal', 'Normal'), ('high', 'High'), ('emergency', 'Emergency')], max_length=10)),
+                ('is_approved', models.BooleanField(blank=True, default=None, null=True)),
+                ('day', models.DateField(help_text='Local date the complaints were filed')),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to='complaints.complaintcategory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='complaints__day_30c263_idx')],
+                'unique_together': {('status', 'category', 'priority', 'is_approved', 'day')},
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
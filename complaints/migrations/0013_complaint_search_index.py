@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_and_populate(apps, schema_editor):
+    from complaints.search import create_search_table, index_complaints
+
+    create_search_table(schema_editor)
+    Complaint = apps.get_model('complaints', 'Complaint')
+    index_complaints(Complaint.objects.all())
+
+
+def drop(apps, schema_editor):
+    from complaints.search import drop_search_table
+
+    drop_search_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_complaintcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_and_populate, drop),
+    ]
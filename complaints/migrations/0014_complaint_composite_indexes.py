@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0013_complaint_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['status', 'created_at', 'id'], name='complaint_approved_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['complainant', 'created_at', 'id'], name='complaint_complainant_new_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['assigned_to', 'status', 'created_at', 'id'], name='complaint_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('is_approved__isnull', True)), fields=['created_at'], name='complaint_awaiting_review_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from django.conf import settings
@@ -125,6 +126,20 @@ class Complaint(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['complainant']),
             models.Index(fields=['created_at']),
+            # From manage.py index_advisor. Filters on True booleans reach
+            # SQLite as a bare column test, which no index column serves, so
+            # those are partial indexes. Ascending (created_at, id) read
+            # backwards gives the -created_at, -id order without a sort.
+            models.Index(
+                fields=['status', 'created_at', 'id'], condition=models.Q(is_approved=True),
+                name='complaint_approved_status_idx',
+            ),
+            models.Index(fields=['complainant', 'created_at', 'id'], name='complaint_complainant_new_idx'),
+            models.Index(fields=['assigned_to', 'status', 'created_at', 'id'], name='complaint_assignee_status_idx'),
+            models.Index(
+                fields=['created_at'], condition=models.Q(is_approved__isnull=True),
+                name='complaint_awaiting_review_idx',
+            ),
         ]
     
     def __str__(self):
@@ -139,6 +154,7 @@ class Complaint(models.Model):
         logger.info(f"Complaint.save() called for complaint {self.pk or 'new'}: {self.title}")
         
         is_new = not self.pk
+        original = None
         
         # Check if status changed
         if self.pk:
@@ -175,7 +191,18 @@ class Complaint(models.Model):
             self.set_sla_dates()
         
         logger.info(f"About to call super().save() for complaint {self.pk or 'new'}")
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Take the counter bucket from the locked stored row, not from
+            # ``original``: another save of this complaint may have moved it since
+            stored = None
+            if not is_new:
+                row = (
+                    Complaint.objects.select_for_update().filter(pk=self.pk)
+                    .values(*ComplaintCounter.BUCKET_FIELDS).first()
+                )
+                stored = Complaint(**row) if row else None
+            super().save(*args, **kwargs)
+            ComplaintCounter.apply_change(stored, self)
         logger.info(f"Successfully saved complaint {self.pk}: {self.title}")
     
     def auto_assign(self):
@@ -284,6 +311,105 @@ class Complaint(models.Model):
         except Exception as e:
             print(f"Failed to send email: {e}")
 
+class ComplaintCounter(models.Model):
+    """
+    Materialized complaint counts per (status, category, priority, approval, day)
+
+    Kept in step with Complaint by applying the delta between the old and new
+    row on every save and delete, so dashboards read one row per bucket instead
+    of scanning every complaint. A save locks the complaint row while it moves
+    it, so concurrent saves of one complaint apply its delta once. Run ``manage.py rebuild_complaint_counters``
+    to reconcile after raw SQL or ``QuerySet.update()`` changes.
+    """
+    status = models.CharField(max_length=20, choices=Complaint.STATUS_CHOICES)
+    category = models.ForeignKey(ComplaintCategory, on_delete=models.CASCADE, related_name='counters')
+    priority = models.CharField(max_length=10, choices=Complaint.PRIORITY_CHOICES)
+    is_approved = models.BooleanField(null=True, blank=True, default=None)
+    day = models.DateField(help_text="Local date the complaints were filed")
+    count = models.IntegerField(default=0)
+    
+    # Complaint fields bucket_for reads
+    BUCKET_FIELDS = ('status', 'category_id', 'priority', 'is_approved', 'created_at')
+    
+    class Meta:
+        unique_together = ['status', 'category', 'priority', 'is_approved', 'day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.category_id}/{self.status}/{self.priority}: {self.count}"
+    
+    @staticmethod
+    def bucket_for(complaint):
+        """Counter key for a complaint row, or None if it is not countable yet"""
+        from django.utils import timezone
+        
+        if complaint is None or complaint.created_at is None or complaint.category_id is None:
+            return None
+        return {
+            'status': complaint.status,
+            'category_id': complaint.category_id,
+            'priority': complaint.priority,
+            'is_approved': complaint.is_approved,
+            'day': timezone.localdate(complaint.created_at),
+        }
+    
+    @classmethod
+    def add(cls, bucket, delta):
+        """Atomically add ``delta`` to one bucket, creating the row if needed"""
+        if bucket is None or not delta:
+            return
+        # Update by primary key so a duplicate NULL-approval row can never be
+        # incremented twice
+        pk = cls.objects.filter(**bucket).values_list('pk', flat=True).first()
+        if pk is not None:
+            cls.objects.filter(pk=pk).update(count=F('count') + delta)
+        elif delta > 0:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(count=delta, **bucket)
+            except IntegrityError:
+                cls.objects.filter(**bucket).update(count=F('count') + delta)
+    
+    @classmethod
+    def apply_change(cls, old, new):
+        """Move a complaint from its old bucket to its new one (either may be None)"""
+        old_bucket = cls.bucket_for(old)
+        new_bucket = cls.bucket_for(new)
+        if old_bucket == new_bucket:
+            return
+        cls.add(old_bucket, -1)
+        cls.add(new_bucket, 1)
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every bucket from the complaints table; returns the bucket count"""
+        from django.db.models import Count
+        from django.db.models.functions import TruncDate
+        
+        rows = (
+            Complaint.objects.order_by()
+            .annotate(day=TruncDate('created_at'))
+            .values('status', 'category_id', 'priority', 'is_approved', 'day')
+            .annotate(total=Count('id'))
+        )
+        counters = [
+            cls(
+                status=row['status'],
+                category_id=row['category_id'],
+                priority=row['priority'],
+                is_approved=row['is_approved'],
+                day=row['day'],
+                count=row['total'],
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(counters, batch_size=500)
+        return len(counters)
+
 class ComplaintAttachment(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='attachments')
     file = models.FileField(upload_to='complaint_attachments/%Y/%m/')
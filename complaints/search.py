@@ -0,0 +1,230 @@
+"""
+Full-text search index for complaints
+
+Replaces the 7-way ``icontains`` OR in ``complaint_list`` with an indexed
+lookup. The searchable text (title, description, location, complainant name
+and anonymous contact) is normalized with ``barangay_portal.text`` so English
+and Filipino word forms match, then stored in:
+
+    SQLite      an FTS5 virtual table ranked with bm25()
+    PostgreSQL  a tsvector table with a GIN index ranked with ts_rank()
+
+Other database engines fall back to the original ``icontains`` filter. The
+index is kept in sync by the receivers in ``complaints.signals``; run
+``manage.py rebuild_complaint_search_index`` after bulk loads.
+"""
+
+from django.db import connection
+from django.db.models import Q
+
+from barangay_portal.text import stem, terms, tokenize
+
+
+SEARCH_TABLE = 'complaints_search'
+
+# bm25 column weights for (title, body, people)
+SQLITE_WEIGHTS = (10.0, 1.0, 3.0)
+
+
+def search_backend(conn=None):
+    """'sqlite', 'postgresql' or None when the engine has no index support"""
+    vendor = (conn or connection).vendor
+    return vendor if vendor in ('sqlite', 'postgresql') else None
+
+
+def _document_terms(text):
+    # FTS5 and the 'simple' tsvector parser split on hyphens, so index
+    # 'nag-reklamo' as one term
+    return ' '.join(term.replace('-', '') for term in terms(text))
+
+
+def complaint_documents(complaint):
+    """(title, body, people) index text for a complaint"""
+    people = [complaint.anonymous_contact or '']
+    if complaint.complainant_id and not complaint.is_anonymous:
+        complainant = complaint.complainant
+        people += [complainant.first_name, complainant.last_name, complainant.username]
+    return (
+        _document_terms(complaint.title),
+        _document_terms(f"{complaint.description} {complaint.location}"),
+        _document_terms(' '.join(filter(None, people))),
+    )
+
+
+# ----------------------------------------------------------------------------
+# Schema
+# ----------------------------------------------------------------------------
+
+def create_search_table(schema_editor):
+    backend = search_backend(schema_editor.connection)
+    if backend == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            f"USING fts5(title, body, people, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif backend == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            f"complaint_id bigint PRIMARY KEY REFERENCES complaints_complaint(id) ON DELETE CASCADE, "
+            f"document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)"
+        )
+
+
+def drop_search_table(schema_editor):
+    if search_backend(schema_editor.connection):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+# ----------------------------------------------------------------------------
+# Index maintenance
+# ----------------------------------------------------------------------------
+
+def _index_rows(cursor, backend, rows):
+    if backend == 'sqlite':
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(pk,) for pk, *_ in rows])
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, people) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+    elif backend == 'postgresql':
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (complaint_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'C') || "
+            f"setweight(to_tsvector('simple', %s), 'B')) "
+            f"ON CONFLICT (complaint_id) DO UPDATE SET document = EXCLUDED.document",
+            rows,
+        )
+
+
+def index_complaint(complaint):
+    """Insert or replace one complaint in the search index"""
+    backend = search_backend()
+    if not backend:
+        return
+    with connection.cursor() as cursor:
+        _index_rows(cursor, backend, [(complaint.pk, *complaint_documents(complaint))])
+
+
+def unindex_complaint(complaint_id):
+    """Remove one complaint from the search index"""
+    backend = search_backend()
+    key = 'rowid' if backend == 'sqlite' else 'complaint_id'
+    if backend:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = %s", [complaint_id])
+
+
+def index_complaints(queryset, batch_size=1000):
+    """Index many complaints in batches; returns the number indexed"""
+    backend = search_backend()
+    if not backend:
+        return 0
+    queryset = queryset.select_related('complainant').order_by('pk')
+    indexed = 0
+    batch = []
+    with connection.cursor() as cursor:
+        for complaint in queryset.iterator(chunk_size=batch_size):
+            batch.append((complaint.pk, *complaint_documents(complaint)))
+            if len(batch) >= batch_size:
+                _index_rows(cursor, backend, batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            _index_rows(cursor, backend, batch)
+            indexed += len(batch)
+    return indexed
+
+
+def rebuild_index(batch_size=1000):
+    """Drop every indexed row and index all complaints again"""
+    from .models import Complaint
+
+    if search_backend():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    return index_complaints(Complaint.objects.all(), batch_size=batch_size)
+
+
+# ----------------------------------------------------------------------------
+# Querying
+# ----------------------------------------------------------------------------
+
+def _query_terms(query):
+    """Distinct search terms, each with its stem as an alternative"""
+    groups = []
+    for token in tokenize(query):
+        alternatives = {token.replace('-', ''), stem(token)}
+        if alternatives not in groups:
+            groups.append(alternatives)
+    return groups
+
+
+def _sqlite_match(groups):
+    # Every word must match; each word may match as itself or its stem, and
+    # as a prefix so results update while the user is still typing
+    return ' AND '.join(
+        '(' + ' OR '.join(f'"{term}"*' for term in sorted(alternatives)) + ')'
+        for alternatives in groups
+    )
+
+
+def _postgres_tsquery(groups):
+    return ' & '.join(
+        '(' + ' | '.join(f"{term}:*" for term in sorted(alternatives)) + ')'
+        for alternatives in groups
+    )
+
+
+def icontains_filter(query):
+    """The original substring filter, used when no index is available"""
+    return (
+        Q(title__icontains=query) |
+        Q(description__icontains=query) |
+        Q(location__icontains=query) |
+        Q(complainant__first_name__icontains=query) |
+        Q(complainant__last_name__icontains=query) |
+        Q(complainant__username__icontains=query) |
+        Q(anonymous_contact__icontains=query)
+    )
+
+
+def search_complaints(queryset, query):
+    """
+    Filter a complaint queryset to index matches, annotated with ``search_rank``
+
+    Higher ``search_rank`` means a better match. On engines without an index
+    the icontains filter is applied and every row gets rank 0.
+    """
+    from django.db.models import FloatField, Value
+
+    backend = search_backend()
+    groups = _query_terms(query)
+    # Queries made only of stopwords have no index terms to look up
+    if not backend or not groups:
+        return queryset.filter(icontains_filter(query)).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    table = queryset.model._meta.db_table
+    # Join the index table (instead of a pk__in subquery with a correlated
+    # rank) so the engine evaluates the MATCH once and joins on the row id
+    if backend == 'sqlite':
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        return queryset.extra(
+            # bm25() is lower-is-better, so negate it
+            select={'search_rank': f"-bm25({SEARCH_TABLE}, {weights})"},
+            tables=[SEARCH_TABLE],
+            where=[f"{SEARCH_TABLE}.rowid = {table}.id", f"{SEARCH_TABLE} MATCH %s"],
+            params=[_sqlite_match(groups)],
+        )
+    return queryset.extra(
+        select={'search_rank': f"ts_rank({SEARCH_TABLE}.document, to_tsquery('simple', %s))"},
+        select_params=[_postgres_tsquery(groups)],
+        tables=[SEARCH_TABLE],
+        where=[f"{SEARCH_TABLE}.complaint_id = {table}.id", f"{SEARCH_TABLE}.document @@ to_tsquery('simple', %s)"],
+        params=[_postgres_tsquery(groups)],
+    )
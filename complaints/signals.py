@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Complaint, ComplaintCounter
+from .search import index_complaint, index_complaints, unindex_complaint
+
+User = get_user_model()
+
+# User fields that appear in the complaint search index
+INDEXED_USER_FIELDS = {'first_name', 'last_name', 'username'}
+
+
+@receiver(post_delete, sender=Complaint)
+def decrement_complaint_counter(sender, instance, **kwargs):
+    """Remove a deleted complaint from its counter bucket (covers cascades too)"""
+    ComplaintCounter.apply_change(instance, None)
+
+
+@receiver(post_save, sender=Complaint)
+def update_complaint_search_index(sender, instance, **kwargs):
+    """Keep the full-text search index in step with the complaint"""
+    index_complaint(instance)
+
+
+@receiver(post_delete, sender=Complaint)
+def remove_complaint_from_search_index(sender, instance, **kwargs):
+    unindex_complaint(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def reindex_complainant_complaints(sender, instance, created, update_fields=None, **kwargs):
+    """Re-index a user's complaints when their searchable name changes"""
+    if created:
+        return
+    if update_fields is not None and not INDEXED_USER_FIELDS & set(update_fields):
+        return
+    index_complaints(Complaint.objects.filter(complainant=instance))
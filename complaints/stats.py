@@ -0,0 +1,200 @@
+"""
+Single-pass complaint statistics
+
+Dashboards, reports and the statistics API used to fire one COUNT(*) per
+status, per category and per priority. ``complaint_stats`` replaces all of
+those with a single grouped ``values().annotate(Count)`` query over any
+complaint queryset and returns a ``ComplaintStats`` object that can answer
+every breakdown from memory.
+
+``counter_stats`` returns the same object from the ComplaintCounter rollup
+table, reading one row per bucket instead of one row per complaint.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db.models import Count, Sum
+
+
+GROUP_FIELDS = ('status', 'category_id', 'category__name', 'priority', 'is_approved')
+
+
+@dataclass(frozen=True)
+class StatsBucket:
+    """One (status, category, priority, approval) group and its row count"""
+    status: str
+    category_id: int
+    category_name: str
+    priority: str
+    is_approved: object  # None = pending review, True = approved, False = rejected
+    count: int
+    extra: dict = field(default_factory=dict)
+
+
+@dataclass
+class ComplaintStats:
+    """
+    Status x category x priority x approval breakdown of a complaint queryset
+
+    Built by ``complaint_stats()``; every accessor works on the in-memory
+    buckets so no further queries are issued.
+    """
+    buckets: list = field(default_factory=list)
+
+    @property
+    def total(self):
+        return sum(bucket.count for bucket in self.buckets)
+
+    def _group(self, attr, **filters):
+        counts = defaultdict(int)
+        for bucket in self._filtered(**filters):
+            counts[getattr(bucket, attr)] += bucket.count
+        return dict(counts)
+
+    def _filtered(self, **filters):
+        for bucket in self.buckets:
+            if all(getattr(bucket, name) == value for name, value in filters.items()):
+                yield bucket
+
+    def count(self, **filters):
+        """
+        Count complaints matching exact bucket attributes
+
+        Usage:
+            stats.count(status='pending')
+            stats.count(priority='high', is_approved=True)
+        """
+        return sum(bucket.count for bucket in self._filtered(**filters))
+
+    def extra(self, name):
+        """Total of a conditional count passed to ``complaint_stats(extra=...)``"""
+        return sum(bucket.extra.get(name, 0) for bucket in self.buckets)
+
+    @property
+    def by_status(self):
+        """{status code: count} including zero entries for every status choice"""
+        from .models import Complaint
+        counts = self._group('status')
+        return {code: counts.get(code, 0) for code, _ in Complaint.STATUS_CHOICES}
+
+    @property
+    def by_priority(self):
+        """{priority code: count} including zero entries for every priority choice"""
+        from .models import Complaint
+        counts = self._group('priority')
+        return {code: counts.get(code, 0) for code, _ in Complaint.PRIORITY_CHOICES}
+
+    @property
+    def by_category(self):
+        """{category name: count} for categories that have complaints"""
+        return self._group('category_name')
+
+    @property
+    def by_approval(self):
+        """{None/True/False: count} keyed like ``Complaint.is_approved``"""
+        return self._group('is_approved')
+
+    def status_display(self):
+        """{status label: count} for templates that show the display names"""
+        from .models import Complaint
+        counts = self.by_status
+        return {label: counts[code] for code, label in Complaint.STATUS_CHOICES}
+
+    def priority_display(self):
+        """{priority label: count} for templates that show the display names"""
+        from .models import Complaint
+        counts = self.by_priority
+        return {label: counts[code] for code, label in Complaint.PRIORITY_CHOICES}
+
+    def category_breakdown(self, categories, include_empty=True):
+        """
+        {category name: count} in the order of ``categories``
+
+        ``categories`` is an iterable of ComplaintCategory objects (e.g. the
+        active ones); empty categories are kept unless ``include_empty`` is False.
+        """
+        counts = self._group('category_id')
+        breakdown = {}
+        for category in categories:
+            count = counts.get(category.pk, 0)
+            if count or include_empty:
+                breakdown[category.name] = count
+        return breakdown
+
+
+def complaint_stats(queryset=None, extra=None):
+    """
+    Compute every complaint breakdown in one grouped query
+
+    Args:
+        queryset: Complaint queryset to summarise (defaults to all complaints)
+        extra: Optional {name: Q} of conditional counts evaluated in the same
+            pass, e.g. {'assigned_to_me': Q(assigned_to=request.user)}
+
+    Returns: ComplaintStats
+    """
+    from .models import Complaint
+
+    if queryset is None:
+        queryset = Complaint.objects.all()
+    extra = extra or {}
+
+    annotations = {'row_count': Count('id')}
+    for name, condition in extra.items():
+        annotations[f'extra_{name}'] = Count('id', filter=condition)
+
+    # order_by() clears Meta.ordering so it does not leak into GROUP BY, and
+    # prefetches from optimize_complaints_query() do not apply to values()
+    rows = (
+        queryset.order_by()
+        .prefetch_related(None)
+        .values(*GROUP_FIELDS)
+        .annotate(**annotations)
+    )
+
+    return _stats_from_rows(rows, extra)
+
+
+def counter_stats(condition=None, extra=None):
+    """
+    Same breakdowns as ``complaint_stats`` read from the ComplaintCounter rollup
+
+    Args:
+        condition: Optional Q over counter fields (status, category, priority,
+            is_approved, day), e.g. ~Q(is_approved=False)
+        extra: Optional {name: Q} of conditional sums over counter fields,
+            e.g. {'recent': Q(day__gte=thirty_days_ago)}
+
+    Returns: ComplaintStats
+    """
+    from .models import ComplaintCounter
+
+    extra = extra or {}
+    queryset = ComplaintCounter.objects.all()
+    if condition is not None:
+        queryset = queryset.filter(condition)
+
+    annotations = {'row_count': Sum('count')}
+    for name, extra_condition in extra.items():
+        annotations[f'extra_{name}'] = Sum('count', filter=extra_condition)
+
+    rows = queryset.order_by().values(*GROUP_FIELDS).annotate(**annotations)
+    # Buckets whose complaints were all moved elsewhere stay behind at zero
+    return _stats_from_rows((row for row in rows if row['row_count']), extra)
+
+
+def _stats_from_rows(rows, extra):
+    buckets = [
+        StatsBucket(
+            status=row['status'],
+            category_id=row['category_id'],
+            category_name=row['category__name'],
+            priority=row['priority'],
+            is_approved=row['is_approved'],
+            count=row['row_count'],
+            extra={name: row[f'extra_{name}'] or 0 for name in extra},
+        )
+        for row in rows
+    ]
+    return ComplaintStats(buckets=buckets)
@@ -0,0 +1,300 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from accounts.testing import NoLoginHistoryMixin
+from barangay_portal.performance import COMPLAINT_QUERY_PROFILES, QueryProfile, check_query_profiles
+from .forms import ComplaintSearchForm
+from .models import Complaint, ComplaintCategory, ComplaintComment, ComplaintCounter
+from .search import search_complaints
+from .stats import complaint_stats, counter_stats
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ComplaintStatsTests(NoLoginHistoryMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.resident = User.objects.create_user('resident1', password='x', role='resident', is_approved=True)
+        cls.secretary = User.objects.create_user('secretary1', password='x', role='secretary', is_approved=True)
+        cls.chairman = User.objects.create_user('chairman1', password='x', role='chairman', is_approved=True)
+        cls.add_categories(3)
+
+    @classmethod
+    def add_categories(cls, count):
+        start = ComplaintCategory.objects.count()
+        for i in range(start, start + count):
+            category = ComplaintCategory.objects.create(name=f'Category {i}')
+            for status, priority, approved in (
+                ('pending', 'normal', None),
+                ('in_progress', 'high', True),
+                ('resolved', 'emergency', True),
+                ('closed', 'normal', False),
+            ):
+                Complaint.objects.create(
+                    complainant=cls.resident, category=category, title=f'{category.name} {status}',
+                    description='-', status=status, priority=priority, is_approved=approved,
+                )
+
+    def test_breakdowns_match_per_choice_counts(self):
+        stats = complaint_stats()
+        self.assertEqual(stats.total, Complaint.objects.count())
+        for code, _ in Complaint.STATUS_CHOICES:
+            self.assertEqual(stats.by_status[code], Complaint.objects.filter(status=code).count())
+        for code, _ in Complaint.PRIORITY_CHOICES:
+            self.assertEqual(stats.by_priority[code], Complaint.objects.filter(priority=code).count())
+        for category in ComplaintCategory.objects.all():
+            self.assertEqual(stats.by_category[category.name], Complaint.objects.filter(category=category).count())
+        self.assertEqual(stats.by_approval[None], Complaint.objects.filter(is_approved__isnull=True).count())
+        self.assertEqual(stats.count(status='resolved', is_approved=True), 3)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            stats = complaint_stats(Complaint.objects.exclude(is_approved=False))
+            stats.by_status, stats.by_priority, stats.by_category, stats.total
+
+    def assertQueriesIndependentOfCategories(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as before:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.add_categories(10)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before), len(after), f'{url} issues one query per category')
+
+    def test_home_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.resident, reverse('home'))
+
+    def test_quick_stats_api_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.resident, reverse('quick_stats_api'))
+
+    def test_complaint_list_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.secretary, reverse('complaints:complaint_list'))
+
+    def test_statistics_api_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.secretary, reverse('complaints:statistics_api'))
+
+    def test_resident_dashboard_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.resident, reverse('dashboard:resident_dashboard'))
+
+    def test_secretary_dashboard_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.secretary, reverse('dashboard:secretary_dashboard'))
+
+    def test_chairman_dashboard_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.chairman, reverse('dashboard:chairman_dashboard'))
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', {
+            'dashboard/reports.html': '{{ report_data.total_complaints }}',
+        })]},
+    }])
+    def test_reports_query_count(self):
+        self.assertQueriesIndependentOfCategories(self.chairman, reverse('dashboard:reports'))
+
+
+class ComplaintCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.resident = User.objects.create_user('resident1', password='x', role='resident', is_approved=True)
+        cls.roads = ComplaintCategory.objects.create(name='Roads')
+        cls.noise = ComplaintCategory.objects.create(name='Noise')
+
+    def snapshot(self):
+        return sorted(
+            (c.status, c.category_id, c.priority, c.is_approved, c.day, c.count)
+            for c in ComplaintCounter.objects.exclude(count=0)
+        )
+
+    def assertCountersMatchRebuild(self):
+        incremental = self.snapshot()
+        ComplaintCounter.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_save_and_delete_apply_deltas(self):
+        complaint = Complaint.objects.create(complainant=self.resident, category=self.roads, title='Pothole', description='-')
+        Complaint.objects.create(complainant=self.resident, category=self.noise, title='Karaoke', description='-', priority='high')
+        self.assertCountersMatchRebuild()
+
+        complaint.is_approved = True
+        complaint.status = 'in_progress'
+        complaint.category = self.noise
+        complaint.save()
+        self.assertCountersMatchRebuild()
+
+        complaint.is_approved = False
+        complaint.save(update_fields=['is_approved'])
+        self.assertCountersMatchRebuild()
+
+        complaint.delete()
+        self.assertCountersMatchRebuild()
+        self.assertEqual(counter_stats().total, 1)
+
+    def test_concurrent_saves_apply_the_delta_once(self):
+        complaint = Complaint.objects.create(complainant=self.resident, category=self.roads, title='Pothole', description='-')
+        first, second = Complaint.objects.get(pk=complaint.pk), Complaint.objects.get(pk=complaint.pk)
+
+        def other_staff_saves():
+            # Runs after ``first`` read its original row, before it writes
+            second.status = 'in_progress'
+            with mock.patch.object(Complaint, 'send_status_update_email'):
+                second.save()
+
+        first.status = 'in_progress'
+        with mock.patch.object(Complaint, 'send_status_update_email', side_effect=other_staff_saves):
+            first.save()
+        self.assertCountersMatchRebuild()
+
+    def test_category_cascade_delete(self):
+        Complaint.objects.create(complainant=self.resident, category=self.roads, title='Pothole', description='-')
+        Complaint.objects.create(complainant=self.resident, category=self.noise, title='Karaoke', description='-')
+        self.roads.delete()
+        self.assertCountersMatchRebuild()
+
+    def test_counter_stats_match_complaint_stats(self):
+        for status in ('pending', 'resolved'):
+            Complaint.objects.create(complainant=self.resident, category=self.roads, title=status, description='-', status=status)
+        from_table = complaint_stats()
+        from_counters = counter_stats()
+        self.assertEqual(from_counters.total, from_table.total)
+        self.assertEqual(from_counters.by_status, from_table.by_status)
+        self.assertEqual(from_counters.by_category, from_table.by_category)
+        with self.assertNumQueries(1):
+            counter_stats().by_status
+
+
+class ComplaintSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.resident = User.objects.create_user('jdelacruz', first_name='Juan', last_name='Dela Cruz', role='resident')
+        category = ComplaintCategory.objects.create(name='Sanitation')
+        cls.drain = Complaint.objects.create(
+            complainant=cls.resident, category=category, title='Baradong kanal sa Purok 3',
+            description='Nag-reklamo na ang mga kapitbahay dahil sa baha', location='Purok 3',
+        )
+        cls.noise = Complaint.objects.create(
+            complainant=cls.resident, category=category, title='Loud karaoke at night',
+            description='Neighbors singing until 2am, kanal is fine', location='Purok 5',
+        )
+        cls.anonymous = Complaint.objects.create(
+            is_anonymous=True, anonymous_contact='09171234567', category=category,
+            title='Stray dogs', description='Dogs roaming the streets',
+        )
+
+    def search(self, query):
+        return list(search_complaints(Complaint.objects.all(), query).order_by('-search_rank', '-created_at'))
+
+    def test_matches_words_prefixes_and_people(self):
+        self.assertEqual(self.search('karaoke'), [self.noise])
+        self.assertEqual(self.search('kara'), [self.noise])
+        self.assertEqual(self.search('dela cruz baradong'), [self.drain])
+        self.assertEqual(self.search('09171234567'), [self.anonymous])
+        self.assertEqual(self.search('nonexistent'), [])
+
+    def test_bilingual_stemming(self):
+        # 'reklamo' finds 'Nag-reklamo', 'dog' finds 'Dogs'
+        self.assertEqual(self.search('reklamo'), [self.drain])
+        self.assertEqual(self.search('dog'), [self.anonymous])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('kanal'), [self.drain, self.noise])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.noise.title = 'Videoke every night'
+        self.noise.save()
+        self.assertEqual(self.search('videoke'), [self.noise])
+
+        self.resident.last_name = 'Santos'
+        self.resident.save()
+        self.assertCountEqual(self.search('santos'), [self.drain, self.noise])
+
+        self.noise.delete()
+        self.assertEqual(self.search('videoke'), [])
+
+    def test_search_form_uses_index(self):
+        form = ComplaintSearchForm(user=self.resident, data={'search': 'kanal'})
+        self.assertTrue(form.is_valid())
+        results = form.search_queryset(Complaint.objects.all()).order_by('-search_rank')
+        self.assertEqual(list(results), [self.drain, self.noise])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ComplaintQueryProfileTests(NoLoginHistoryMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.resident = User.objects.create_user('resident1', password='x', role='resident', is_approved=True)
+        cls.chairman = User.objects.create_user('chairman1', password='x', role='chairman', is_approved=True)
+        category = ComplaintCategory.objects.create(name='Sanitation')
+        cls.complaint = Complaint.objects.create(
+            complainant=cls.resident, category=category, title='Baradong kanal',
+            description='x' * 500, is_approved=True,
+        )
+
+    def add_comments(self, count):
+        ComplaintComment.objects.bulk_create(
+            ComplaintComment(complaint=self.complaint, author=self.chairman, comment=f'Update {i}')
+            for i in range(count)
+        )
+
+    def test_profiles_match_models(self):
+        self.assertEqual(check_query_profiles(), [])
+
+    def test_invalid_profiles_are_reported(self):
+        self.assertEqual(len(QueryProfile('complaints.Complaint', only=['nonexistent']).errors()), 1)
+        # Crossing a relation that is not joined loads each row's category separately
+        self.assertEqual(len(QueryProfile('complaints.Complaint', only=['category__name']).errors()), 1)
+        self.assertEqual(len(QueryProfile('complaints.Complaint', select_related=['comments']).errors()), 1)
+        self.assertEqual(len(QueryProfile('complaints.Complaint', prefetch={
+            'comments': QueryProfile('complaints.ComplaintComment', select_related=['user']),
+        }).errors()), 1)
+        self.assertEqual(len(QueryProfile('complaints.Complaint', prefetch={
+            'comments': QueryProfile('complaints.ComplaintComment', only=['comment']),
+        }).errors()), 1)
+
+    def test_list_profile_skips_description(self):
+        complaint = COMPLAINT_QUERY_PROFILES['list'].apply().get()
+        self.assertIn('description', complaint.get_deferred_fields())
+        self.assertEqual(len(complaint.description_excerpt), 121)
+
+    def test_complaint_list_query_count_independent_of_comments(self):
+        self.client.force_login(self.chairman)
+        url = reverse('complaints:complaint_list')
+        with CaptureQueriesContext(connection) as before:
+            response = self.client.get(url)
+        self.assertContains(response, 'Baradong kanal')
+
+        self.add_comments(5)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before), len(after))
+        self.assertFalse(any('complaints_complaintcomment' in query['sql'] for query in after))
+
+    def test_complaint_detail_query_count_independent_of_comments(self):
+        self.client.force_login(self.chairman)
+        url = reverse('complaints:complaint_detail', args=[self.complaint.id])
+        self.add_comments(1)
+        with CaptureQueriesContext(connection) as before:
+            response = self.client.get(url)
+        self.assertContains(response, 'Update 0')
+
+        self.add_comments(5)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before), len(after))
+
+    def test_export_rows(self):
+        self.client.force_login(self.chairman)
+        response = self.client.get(reverse('analytics:export'), {'type': 'complaints'})
+        self.assertEqual(response.status_code, 200)
+        row = response.json()[0]
+        self.assertEqual(row['category__name'], 'Sanitation')
+        self.assertIsNone(row['resolved_at'])
@@ -1,23 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.db.models import Q, Prefetch
 from django.utils import timezone
 from django.http import JsonResponse
 from .models import Complaint, ComplaintAttachment, ComplaintComment, ComplaintCategory
 from .forms import ComplaintForm, ComplaintUpdateForm, ComplaintCommentForm, ComplaintSearchForm
+from .stats import complaint_stats, counter_stats
+from barangay_portal.pagination import KeysetPaginator
 from barangay_portal.performance import optimize_complaints_query, lazy_load_data
 
 @login_required
 def complaint_list(request):
     form = ComplaintSearchForm(user=request.user, data=request.GET)
     
-    # Use optimized query with proper prefetching to reduce N+1 queries
-    complaints = optimize_complaints_query(
-        user=request.user,
-        base_queryset=Complaint.objects.all()
-    )
+    complaints = Complaint.objects.all()
     
     # Filter based on user role for the base queryset
     if request.user.is_resident():
@@ -34,11 +31,12 @@ def complaint_list(request):
         base_complaints = complaints.exclude(is_approved=False)
     
     # Get statistics for display - calculate from ALL user-accessible complaints (not filtered by search)
+    complaint_summary = complaint_stats(base_complaints)
     stats = {
-        'total': base_complaints.count(),
-        'pending': base_complaints.filter(status='pending').count(),
-        'in_progress': base_complaints.filter(status='in_progress').count(),
-        'resolved': base_complaints.filter(status='resolved').count(),
+        'total': complaint_summary.total,
+        'pending': complaint_summary.by_status['pending'],
+        'in_progress': complaint_summary.by_status['in_progress'],
+        'resolved': complaint_summary.by_status['resolved'],
     }
     
     # Start with base complaints for filtering
@@ -56,15 +54,8 @@ def complaint_list(request):
         sort_by = form.cleaned_data.get('sort_by')
         
         if search:
-            complaints = complaints.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(location__icontains=search) |
-                Q(complainant__first_name__icontains=search) |
-                Q(complainant__last_name__icontains=search) |
-                Q(complainant__username__icontains=search) |
-                Q(anonymous_contact__icontains=search)  # Allow searching anonymous contact
-            )
+            # Indexed full-text search (FTS5 / tsvector) ranked by relevance
+            complaints = form.search_queryset(complaints)
         
         if category:
             complaints = complaints.filter(category=category)
@@ -87,18 +78,23 @@ def complaint_list(request):
         # Apply sorting
         if sort_by:
             complaints = complaints.order_by(sort_by)
+        elif search:
+            complaints = complaints.order_by('-search_rank', '-created_at')
         else:
             complaints = complaints.order_by('-created_at')
     else:
         # Default sorting when form is not valid
         complaints = complaints.order_by('-created_at')
     
-    paginator = Paginator(complaints, 15)  # Increased page size
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Only the columns the list cards show - no description text, no comments
+    complaints = optimize_complaints_query(request.user, complaints, profile='list')
+    
+    paginator = KeysetPaginator(complaints, 15)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'complaints': page_obj,
+        'page_obj': page_obj,
         'form': form,
         'stats': stats,
         'has_filters': any([
@@ -116,7 +112,9 @@ def complaint_list(request):
 
 @login_required
 def complaint_detail(request, complaint_id):
-    complaint = get_object_or_404(Complaint, id=complaint_id)
+    complaint = get_object_or_404(
+        optimize_complaints_query(request.user, profile='detail'), id=complaint_id
+    )
     
     # Check permissions
     if request.user.is_resident() and complaint.complainant != request.user:
@@ -146,9 +144,9 @@ def complaint_detail(request, complaint_id):
             comment_form = ComplaintCommentForm(request.user)
     
     # Get comments (filter internal comments for residents)
-    comments = complaint.comments.select_related('author')
+    comments = complaint.comments.all()
     if request.user.is_resident():
-        comments = comments.filter(is_internal=False)
+        comments = complaint.comments.select_related('author').filter(is_internal=False)
     
     context = {
         'complaint': complaint,
@@ -214,11 +212,12 @@ def create_complaint(request):
             # Residents see all their own complaints (approved or not, but NOT rejected)
             user_complaints = user_complaints.exclude(is_approved=False)
         
+        complaint_summary = complaint_stats(user_complaints)
         stats = {
-            'total': user_complaints.count(),
-            'pending': user_complaints.filter(status='pending').count(),
-            'in_progress': user_complaints.filter(status='in_progress').count(),
-            'resolved': user_complaints.filter(status='resolved').count(),
+            'total': complaint_summary.total,
+            'pending': complaint_summary.by_status['pending'],
+            'in_progress': complaint_summary.by_status['in_progress'],
+            'resolved': complaint_summary.by_status['resolved'],
         }
     
     context = {
@@ -495,20 +494,12 @@ def complaint_statistics_api(request):
     if not request.user.can_manage_complaints():
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    stats = {
-        'total': Complaint.objects.count(),
-        'pending': Complaint.objects.filter(status='pending').count(),
-        'in_progress': Complaint.objects.filter(status='in_progress').count(),
-        'resolved': Complaint.objects.filter(status='resolved').count(),
-        'closed': Complaint.objects.filter(status='closed').count(),
-    }
+    complaint_summary = counter_stats()
+    stats = {'total': complaint_summary.total}
+    stats.update(complaint_summary.by_status)
     
     # Category breakdown
-    categories = {}
-    for category in ComplaintCategory.objects.all():
-        categories[category.name] = Complaint.objects.filter(category=category).count()
-    
-    stats['categories'] = categories
+    stats['categories'] = complaint_summary.category_breakdown(ComplaintCategory.objects.all())
     
     return JsonResponse(stats)
 
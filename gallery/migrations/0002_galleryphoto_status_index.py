@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='galleryphoto',
+            index=models.Index(fields=['status', 'uploaded_at', 'id'], name='galleryphoto_status_new_idx'),
+        ),
+    ]
@@ -92,6 +92,13 @@ class GalleryPhoto(models.Model):
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Not partial on is_public: manage_gallery lists and counts by
+            # status alone, and the public status IN (...) listing could not
+            # use a partial index anyway (SQLite does not match one against
+            # bound IN parameters).
+            models.Index(fields=['status', 'uploaded_at', 'id'], name='galleryphoto_status_new_idx'),
+        ]
         
     def __str__(self):
         return self.title
@@ -9,10 +9,16 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth import get_user_model
 from .models import GalleryPhoto, GalleryCategory, GalleryLike, GalleryComment
 from .forms import PhotoUploadForm, PhotoFilterForm, CommentForm
+from barangay_portal.pagination import KeysetPaginator
+from barangay_portal.performance import cache_view
 
 User = get_user_model()
 
 
+@cache_view(timeout=3600, key_prefix='gallery', tags=[
+    'gallery.GalleryPhoto', 'gallery.GalleryCategory', 'gallery.GalleryLike',
+    'gallery.GalleryComment', 'accounts.User',
+])
 def gallery_list(request):
     """Main gallery page with photo grid"""
     photos = GalleryPhoto.objects.filter(status__in=['approved', 'featured'], is_public=True)
@@ -209,9 +215,8 @@ def manage_gallery(request):
         photos = photos.filter(category_id=category_filter)
     
     # Pagination
-    paginator = Paginator(photos, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(photos, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     categories = GalleryCategory.objects.filter(is_active=True)
     
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_related_announcement'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at', 'id'], name='notification_recipient_new_idx'),
+        ),
+    ]
@@ -59,6 +59,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notification_recipient_new_idx'),
         ]
     
     def __str__(self):
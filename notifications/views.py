@@ -2,8 +2,8 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, Http404
-from django.core.paginator import Paginator
 from django.utils import timezone
+from barangay_portal.pagination import KeysetPaginator
 from .models import Notification, NotificationPreference
 from .utils import create_notification
 
@@ -18,9 +18,8 @@ def notification_list(request):
         messages.success(request, "All notifications marked as read.")
     
     # Pagination
-    paginator = Paginator(notifications, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(notifications, 20, approximate_total=True)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'notifications': page_obj,
@@ -11,6 +11,7 @@ class BarangayChatbot {
         this.languagePrefix = this.getLanguagePrefix();
         this.apiEndpoints = {
             chat: `${this.languagePrefix}/chatbot/api/chat/`,
+            chatStream: `${this.languagePrefix}/chatbot/api/chat/stream/`,
             startSession: `${this.languagePrefix}/chatbot/api/session/start/`,
             endSession: `${this.languagePrefix}/chatbot/api/session/end/`,
             feedback: `${this.languagePrefix}/chatbot/api/feedback/`,
@@ -346,43 +347,11 @@ class BarangayChatbot {
         this.showTyping();
         
         try {
-            console.log('Sending message to URL:', this.apiEndpoints.chat);
-            const response = await fetch(this.apiEndpoints.chat, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': this.getCSRFToken()
-                },
-                body: JSON.stringify({
-                    message: message,
-                    session_id: this.sessionId,
-                    language: this.currentLanguage
-                })
-            });
-            
-            if (response.ok) {
-                const data = await response.json();
-                
-                // Update session ID if new
-                if (data.session_id && data.session_id !== this.sessionId) {
-                    this.sessionId = data.session_id;
-                    localStorage.setItem('chatbot_session_id', this.sessionId);
-                }
-                
-                // Hide typing and add bot response
-                this.hideTyping();
-                const messageElement = this.addMessage('bot', data.response, data.message_id);
-                
-                // Add feedback buttons
-                this.addFeedbackButtons(messageElement, data.message_id);
-                
-                // Only show suggestions if conversation hasn't started yet
-                if (data.suggestions && data.suggestions.length > 0 && !this.hasStartedConversation) {
-                    this.showSuggestions(data.suggestions);
-                }
-                
+            // Stream the reply where the browser can read response bodies incrementally
+            if (window.ReadableStream && window.TextDecoder) {
+                await this.sendStreamingMessage(message);
             } else {
-                throw new Error('Network response was not ok');
+                await this.sendJsonMessage(message);
             }
         } catch (error) {
             console.error('Chat error:', error);
@@ -395,6 +364,111 @@ class BarangayChatbot {
         }
     }
     
+    getChatRequest(message) {
+        return {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.getCSRFToken()
+            },
+            body: JSON.stringify({
+                message: message,
+                session_id: this.sessionId,
+                language: this.currentLanguage
+            })
+        };
+    }
+    
+    updateSessionId(sessionId) {
+        if (sessionId && sessionId !== this.sessionId) {
+            this.sessionId = sessionId;
+            localStorage.setItem('chatbot_session_id', this.sessionId);
+        }
+    }
+    
+    async sendJsonMessage(message) {
+        console.log('Sending message to URL:', this.apiEndpoints.chat);
+        const response = await fetch(this.apiEndpoints.chat, this.getChatRequest(message));
+        
+        if (!response.ok) {
+            throw new Error('Network response was not ok');
+        }
+        
+        const data = await response.json();
+        this.updateSessionId(data.session_id);
+        
+        // Hide typing and add bot response
+        this.hideTyping();
+        const messageElement = this.addMessage('bot', data.response, data.message_id);
+        
+        // Add feedback buttons
+        this.addFeedbackButtons(messageElement, data.message_id);
+        
+        // Only show suggestions if conversation hasn't started yet
+        if (data.suggestions && data.suggestions.length > 0 && !this.hasStartedConversation) {
+            this.showSuggestions(data.suggestions);
+        }
+    }
+    
+    async sendStreamingMessage(message) {
+        // The stream endpoint answers with one JSON event per line: meta, delta..., done (or error)
+        const response = await fetch(this.apiEndpoints.chatStream, this.getChatRequest(message));
+        
+        if (!response.ok || !response.body) {
+            throw new Error('Network response was not ok');
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let messageElement = null;
+        let finished = false;
+        
+        const showReplyText = (text) => {
+            if (!messageElement) {
+                this.hideTyping();
+                messageElement = this.addMessage('bot', '');
+            }
+            messageElement.querySelector('.message-content').textContent += text;
+            this.scrollToBottom();
+        };
+        
+        const handleEvent = (event) => {
+            if (event.type === 'meta') {
+                this.updateSessionId(event.session_id);
+            } else if (event.type === 'delta') {
+                showReplyText(event.text);
+            } else if (event.type === 'done') {
+                showReplyText('');
+                messageElement.dataset.messageId = event.message_id;
+                this.addFeedbackButtons(messageElement, event.message_id);
+                if (event.suggestions && event.suggestions.length > 0 && !this.hasStartedConversation) {
+                    this.showSuggestions(event.suggestions);
+                }
+                finished = true;
+            } else if (event.type === 'error') {
+                throw new Error(event.error);
+            }
+        };
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) {
+            handleEvent(JSON.parse(buffer));
+        }
+        
+        if (!finished) {
+            throw new Error('Chat stream ended early');
+        }
+    }
+    
     addMessage(type, content, messageId = null, messageClass = null) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `chatbot-message ${type}`;
@@ -558,6 +632,7 @@ class BarangayChatbot {
         const newPrefix = `/${newLang}`;
         this.apiEndpoints = {
             chat: `${newPrefix}/chatbot/api/chat/`,
+            chatStream: `${newPrefix}/chatbot/api/chat/stream/`,
             startSession: `${newPrefix}/chatbot/api/session/start/`,
             endSession: `${newPrefix}/chatbot/api/session/end/`,
             feedback: `${newPrefix}/chatbot/api/feedback/`
@@ -276,11 +276,13 @@ class InfiniteScroll {
         this.options = {
             container: '#content-container',
             nextPageSelector: '.pagination .next',
+            cursorParam: 'cursor',
             threshold: 300, // pixels from bottom
             ...options
         };
         this.loading = false;
-        this.hasMore = true;
+        this.nextUrl = this.getNextUrl(document);
+        this.hasMore = this.nextUrl !== null;
         this.init();
     }
 
@@ -302,6 +304,21 @@ class InfiniteScroll {
         });
     }
 
+    // Next page URL: the current URL (filters kept) with the next link's
+    // cursor token, or null on the last page
+    getNextUrl(root) {
+        const nextLink = root.querySelector(this.options.nextPageSelector);
+        if (!nextLink) return null;
+
+        const cursor = nextLink.dataset.cursor;
+        if (!cursor) return nextLink.href;
+
+        const url = new URL(window.location.href);
+        url.searchParams.delete('page');
+        url.searchParams.set(this.options.cursorParam, cursor);
+        return url.toString();
+    }
+
     checkScroll() {
         if (this.loading || !this.hasMore) return;
 
@@ -314,8 +331,7 @@ class InfiniteScroll {
     }
 
     async loadMore() {
-        const nextLink = document.querySelector(this.options.nextPageSelector);
-        if (!nextLink) {
+        if (!this.nextUrl) {
             this.hasMore = false;
             return;
         }
@@ -324,7 +340,7 @@ class InfiniteScroll {
         const loaderId = loading.show('Loading more...', this.options.container);
 
         try {
-            const response = await fetch(nextLink.href, {
+            const response = await fetch(this.nextUrl, {
                 headers: {
                     'X-Requested-With': 'XMLHttpRequest'
                 }
@@ -345,10 +361,14 @@ class InfiniteScroll {
                     container.appendChild(child);
                 });
 
-                // Check if there are more pages
-                const newNextLink = tempDiv.querySelector(this.options.nextPageSelector);
-                if (!newNextLink) {
-                    this.hasMore = false;
+                // Continue from the loaded page's cursor
+                this.nextUrl = this.getNextUrl(tempDiv);
+                this.hasMore = this.nextUrl !== null;
+
+                // Keep the page's own links pointing past what is shown
+                const nextLink = document.querySelector(this.options.nextPageSelector);
+                if (nextLink && this.nextUrl) {
+                    nextLink.href = this.nextUrl;
                 }
 
                 // Refresh lazy loader
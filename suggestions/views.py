@@ -6,6 +6,7 @@ from django.db.models import Q
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 
+from barangay_portal.pagination import KeysetPaginator
 from .models import Suggestion, SuggestionVote
 from .forms import SuggestionForm, SuggestionReviewForm, SuggestionFilterForm
 
@@ -169,9 +170,8 @@ def manage_suggestions(request):
             suggestions = suggestions.filter(status=status)
     
     # Pagination
-    paginator = Paginator(suggestions, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(suggestions, 15)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     # Stats
     stats = {